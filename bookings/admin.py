@@ -1,34 +1,168 @@
+import json
+
 from django.contrib import admin
-from .models import BookableItem, BookingTimeSlot, Booking
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils.functional import cached_property
+from .models import (
+    Venue, BookableItem, BookingTimeSlot, Booking, WaitlistEntry, BlackoutWindow, ArchivedSlot, ArchivedBooking,
+    AuditEvent,
+)
+from .blackouts import lift_blackout
+from .slot_status import free_slots
+from .tenancy import current_venue_id, is_venue_staff, recompute_slot_local_times
+from .waitlist import cancel_booking
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids COUNT(*) on large PostgreSQL tables when a list is
+    unfiltered. The whole table's estimate is read from pg_class; a list
+    only scoped to the current venue by its manager gets the planner's
+    estimate for that venue instead. Filtered lists and small tables still
+    get an exact count.
+    """
+    estimate_threshold = 100000
+
+    def _estimate(self, queryset, connection):
+        if not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples FROM pg_class WHERE relname = %s",
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+        if queryset.query.where == queryset.model._default_manager.all().query.where:
+            # Nothing but the venue filter: ask the planner, which estimates
+            # from the venue column's statistics without reading the rows
+            plan = json.loads(queryset.order_by().values('pk').explain(format='json'))
+            return plan[0]['Plan']['Plan Rows']
+        return None
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql':
+            estimate = self._estimate(queryset, connection)
+            if estimate is not None and estimate >= self.estimate_threshold:
+                return int(estimate)
+        return super().count
+
+
+class ActiveBookableItemFilter(admin.SimpleListFilter):
+    """
+    Filter by bookable item without building choices from every row in the
+    table: only active items are offered, via a single id/name query.
+    """
+    title = 'bookable item'
+    parameter_name = 'bookable_item'
+    field_path = 'bookable_item_id'
+
+    def lookups(self, request, model_admin):
+        return BookableItem.objects.filter(is_active=True).values_list('id', 'name')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.field_path: self.value()})
+        return queryset
+
+
+class BookingBookableItemFilter(ActiveBookableItemFilter):
+    field_path = 'time_slot__bookable_item_id'
+
+
+class VenueStaffAdminMixin:
+    """
+    Rows are scoped to the venue the admin is served for (see
+    VenueMiddleware); only that venue's staff, or superusers, may use them.
+    """
+
+    def _is_venue_staff(self, request):
+        if not hasattr(request, '_is_venue_staff'):
+            request._is_venue_staff = is_venue_staff(request.user)
+        return request._is_venue_staff
+
+    def has_module_permission(self, request):
+        return self._is_venue_staff(request) and super().has_module_permission(request)
+
+    def has_view_permission(self, request, obj=None):
+        return self._is_venue_staff(request) and super().has_view_permission(request, obj)
+
+    def has_add_permission(self, request):
+        return self._is_venue_staff(request) and super().has_add_permission(request)
+
+    def has_change_permission(self, request, obj=None):
+        return self._is_venue_staff(request) and super().has_change_permission(request, obj)
+
+    def has_delete_permission(self, request, obj=None):
+        return self._is_venue_staff(request) and super().has_delete_permission(request, obj)
+
+
+@admin.register(Venue)
+class VenueAdmin(admin.ModelAdmin):
+    list_display = ['name', 'slug', 'domain', 'timezone', 'is_active', 'created_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'slug', 'domain']
+    prepopulated_fields = {'slug': ('name',)}
+    filter_horizontal = ['staff']
+
+    # Staff see only the venues they belong to and can't change who does
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(staff=request.user)
+
+    def get_readonly_fields(self, request, obj=None):
+        if request.user.is_superuser:
+            return super().get_readonly_fields(request, obj)
+        return ['staff']
+
+    def has_add_permission(self, request):
+        return request.user.is_superuser
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change and 'timezone' in form.changed_data:
+            recompute_slot_local_times(obj.id)
 
 
 @admin.register(BookableItem)
-class BookableItemAdmin(admin.ModelAdmin):
+class BookableItemAdmin(VenueStaffAdminMixin, admin.ModelAdmin):
     list_display = ['name', 'capacity', 'is_active', 'created_at']
     list_filter = ['is_active', 'created_at']
     search_fields = ['name', 'info']
     list_editable = ['is_active']
     ordering = ['name']
+    filter_horizontal = ['adjacent_items']
     
     fieldsets = (
         (None, {
             'fields': ('name', 'capacity', 'is_active')
         }),
         ('Additional Information', {
-            'fields': ('info',),
+            'fields': ('info', 'adjacent_items'),
             'classes': ('collapse',)
         }),
     )
 
 
 @admin.register(BookingTimeSlot)
-class BookingTimeSlotAdmin(admin.ModelAdmin):
+class BookingTimeSlotAdmin(VenueStaffAdminMixin, admin.ModelAdmin):
     list_display = ['bookable_item', 'time_start', 'time_length', 'status', 'time_end']
-    list_filter = ['status', 'bookable_item', 'time_start']
+    list_filter = ['status', ActiveBookableItemFilter, 'time_start']
+    list_select_related = ['bookable_item']
     search_fields = ['bookable_item__name']
     list_editable = ['status']
     ordering = ['time_start']
-    date_hierarchy = 'time_start'
+    # No date_hierarchy: its year links need a MIN/MAX over the whole table
+    # on every load; the time_start filter gives date-bounded ranges instead
+    autocomplete_fields = ['bookable_item']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         (None, {
@@ -45,17 +179,24 @@ class BookingTimeSlotAdmin(admin.ModelAdmin):
 
 
 @admin.register(Booking)
-class BookingAdmin(admin.ModelAdmin):
-    list_display = ['user', 'bookable_item', 'start_time', 'created_at']
-    list_filter = ['time_slot__bookable_item', 'created_at', 'time_slot__time_start']
-    search_fields = ['user__username', 'user__email', 'time_slot__bookable_item__name']
+class BookingAdmin(VenueStaffAdminMixin, admin.ModelAdmin):
+    list_display = ['customer_name', 'user', 'bookable_item', 'start_time', 'party_size', 'created_at']
+    list_filter = [BookingBookableItemFilter, 'created_at', 'time_slot__time_start']
+    list_select_related = ['user', 'time_slot__bookable_item']
+    search_fields = ['customer_name', 'customer_email', 'user__username', 'user__email', 'time_slot__bookable_item__name']
     ordering = ['-created_at']
-    date_hierarchy = 'created_at'
+    # No date_hierarchy, for the same reason as BookingTimeSlotAdmin
+    autocomplete_fields = ['user', 'time_slot']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
     
     fieldsets = (
         (None, {
             'fields': ('user', 'time_slot')
         }),
+        ('Customer', {
+            'fields': ('customer_name', 'customer_phone', 'customer_email', 'party_size')
+        }),
         ('Additional Information', {
             'fields': ('notes',),
             'classes': ('collapse',)
@@ -65,7 +206,126 @@ class BookingAdmin(admin.ModelAdmin):
     def bookable_item(self, obj):
         return obj.time_slot.bookable_item.name
     bookable_item.short_description = 'Bookable Item'
+    bookable_item.admin_order_field = 'time_slot__bookable_item__name'
     
     def start_time(self, obj):
         return obj.time_slot.time_start
-    start_time.short_description = 'Start Time'
\ No newline at end of file
+    start_time.short_description = 'Start Time'
+    start_time.admin_order_field = 'time_slot__time_start'
+
+    # Keep slot status in step with the booking rows edited here
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            if 'time_slot' in form.changed_data:
+                # Quotas count bookings by the slot_start copied from the slot
+                obj.slot_start = obj.time_slot.time_start
+            super().save_model(request, obj, form, change)
+            if change and 'time_slot' in form.changed_data:
+                free_slots(BookingTimeSlot.all_venues.filter(id=form.initial['time_slot']))
+            if not change or 'time_slot' in form.changed_data:
+                BookingTimeSlot.all_venues.filter(id=obj.time_slot_id).update(
+                    status='booked', version=F('version') + 1
+                )
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            cancel_booking(obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            for booking in queryset.select_related('time_slot'):
+                cancel_booking(booking)
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(VenueStaffAdminMixin, admin.ModelAdmin):
+    list_display = ['user', 'time_slot', 'party_size', 'priority', 'created_at']
+    list_editable = ['priority']
+    list_select_related = ['user', 'time_slot__bookable_item']
+    search_fields = ['user__username', 'user__email', 'time_slot__bookable_item__name']
+    ordering = ['time_slot__time_start', '-priority', 'created_at']
+    autocomplete_fields = ['user', 'time_slot']
+
+
+@admin.register(BlackoutWindow)
+class BlackoutWindowAdmin(VenueStaffAdminMixin, admin.ModelAdmin):
+    list_display = ['reason', 'starts_at', 'ends_at', 'created_by', 'lifted_at']
+    list_filter = ['lifted_at']
+    filter_horizontal = ['items']
+    readonly_fields = ['created_by', 'lifted_at']
+    actions = ['lift']
+
+    # Slots are blocked when a window is created through staff-blackouts/,
+    # so adding or editing one here would leave them out of step
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description='Lift selected blackouts')
+    def lift(self, request, queryset):
+        windows = list(queryset.filter(lifted_at__isnull=True))
+        unblocked = sum(lift_blackout(window) for window in windows)
+        self.message_user(request, f'Lifted {len(windows)} blackouts; {unblocked} slots are available again')
+
+
+class ArchiveAdminMixin:
+    """Archived rows are history: viewable, never edited by hand."""
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ArchivedSlot)
+class ArchivedSlotAdmin(VenueStaffAdminMixin, ArchiveAdminMixin, admin.ModelAdmin):
+    list_display = ['item_name', 'time_start', 'time_length', 'status', 'archived_at']
+    list_filter = ['status', 'time_start']
+    search_fields = ['item_name']
+    ordering = ['-time_start']
+    # No date_hierarchy, for the same reason as BookingTimeSlotAdmin
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(VenueStaffAdminMixin, ArchiveAdminMixin, admin.ModelAdmin):
+    list_display = ['customer_name', 'user', 'item_name', 'start_time', 'party_size', 'created_at']
+    list_select_related = ['user', 'time_slot']
+    search_fields = ['customer_name', 'customer_email', 'user__username', 'time_slot__item_name']
+    ordering = ['-created_at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def item_name(self, obj):
+        return obj.time_slot.item_name
+    item_name.short_description = 'Bookable Item'
+    item_name.admin_order_field = 'time_slot__item_name'
+
+    def start_time(self, obj):
+        return obj.time_slot.time_start
+    start_time.short_description = 'Start Time'
+    start_time.admin_order_field = 'time_slot__time_start'
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(VenueStaffAdminMixin, ArchiveAdminMixin, admin.ModelAdmin):
+    list_display = ['at', 'event', 'slot_id', 'booking_id', 'actor_id', 'venue_id']
+    list_filter = ['event']
+    ordering = ['-at']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        # Events carry a plain venue id rather than the venue-scoped manager
+        queryset = super().get_queryset(request)
+        if request.user.is_superuser:
+            return queryset
+        return queryset.filter(venue_id=current_venue_id())
+
+    def has_delete_permission(self, request, obj=None):
+        # The log is append-only; prune_audit_log rotates old events out
+        return False
@@ -0,0 +1,252 @@
+import contextvars
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import timedelta
+from types import SimpleNamespace
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import ArchivedBooking, ArchivedSlot, Booking, BookingTimeSlot, UsageRollup
+
+ROLLUP_FIELDS = [
+    'slot_count', 'slot_minutes', 'booked_count', 'booked_minutes',
+    'party_total', 'lead_minutes_total', 'cancellations',
+]
+
+_paused = contextvars.ContextVar('analytics_paused', default=False)
+
+
+@contextmanager
+def paused():
+    """
+    Don't touch the rollups for changes made inside this block, e.g. while
+    archive_slots moves rows that should keep counting.
+    """
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+def week_start(day):
+    return day - timedelta(days=day.weekday())
+
+
+def rollup_keys(local_date, local_minute):
+    """The (period, date, hour) buckets a slot at this local time counts towards."""
+    return [
+        ('hour', local_date, local_minute // 60),
+        ('day', local_date, 0),
+        ('week', week_start(local_date), 0),
+    ]
+
+
+def _minutes(duration):
+    return int(duration.total_seconds() // 60)
+
+
+class RollupDeltas:
+    """
+    Collects counter changes for many slots and bookings, then applies them
+    in three queries however many buckets they touch: insert missing rows,
+    lock the touched rows, and write the new totals with one bulk_update.
+    Call apply() inside the transaction making the change, so the rollups
+    commit or roll back with it.
+    """
+
+    def __init__(self):
+        self.deltas = defaultdict(Counter)
+
+    def add(self, venue_id, item_id, local_date, local_minute, **fields):
+        for period, date, hour in rollup_keys(local_date, local_minute):
+            self.deltas[(venue_id, item_id, period, date, hour)].update(fields)
+
+    def slot(self, slot, sign=1):
+        self.add(
+            slot.venue_id, slot.bookable_item_id, slot.local_date, slot.local_minute,
+            slot_count=sign, slot_minutes=sign * _minutes(slot.time_length)
+        )
+
+    def booking(self, booking, slot, sign=1):
+        lead_minutes = max(_minutes(slot.time_start - booking.created_at), 0)
+        self.add(
+            slot.venue_id, slot.bookable_item_id, slot.local_date, slot.local_minute,
+            booked_count=sign, booked_minutes=sign * _minutes(slot.time_length),
+            party_total=sign * booking.party_size, lead_minutes_total=sign * lead_minutes
+        )
+
+    def cancellation(self, slot):
+        self.add(slot.venue_id, slot.bookable_item_id, slot.local_date, slot.local_minute, cancellations=1)
+
+    def apply(self):
+        if _paused.get() or not self.deltas:
+            return
+        with transaction.atomic():
+            UsageRollup.all_venues.bulk_create([
+                UsageRollup(venue_id=venue_id, bookable_item_id=item_id, period=period, date=date, hour=hour)
+                for venue_id, item_id, period, date, hour in self.deltas
+            ], ignore_conflicts=True)
+            # One range query covers every touched bucket; rows in the range
+            # that weren't touched are skipped below
+            dates = [key[3] for key in self.deltas]
+            candidates = UsageRollup.all_venues.select_for_update().filter(
+                bookable_item_id__in={key[1] for key in self.deltas},
+                date__gte=min(dates),
+                date__lte=max(dates)
+            ).order_by('id')
+            rollups = []
+            for rollup in candidates:
+                counts = self.deltas.get((rollup.venue_id, rollup.bookable_item_id, rollup.period, rollup.date, rollup.hour))
+                if counts:
+                    for field, value in counts.items():
+                        setattr(rollup, field, getattr(rollup, field) + value)
+                    rollups.append(rollup)
+            UsageRollup.all_venues.bulk_update(rollups, ROLLUP_FIELDS)
+        self.deltas.clear()
+
+
+def record_slots(slots, sign=1):
+    deltas = RollupDeltas()
+    for slot in slots:
+        deltas.slot(slot, sign)
+    deltas.apply()
+
+
+def record_bookings(bookings, sign=1):
+    deltas = RollupDeltas()
+    for booking in bookings:
+        deltas.booking(booking, booking.time_slot, sign)
+    deltas.apply()
+
+
+def record_cancellations(bookings):
+    """Move deleted bookings from booked to cancelled, however they were deleted."""
+    deltas = RollupDeltas()
+    for booking in bookings:
+        deltas.booking(booking, booking.time_slot, sign=-1)
+        deltas.cancellation(booking.time_slot)
+    deltas.apply()
+
+
+# The slot columns its rollup buckets are worked out from
+SLOT_BUCKET_FIELDS = ('venue_id', 'bookable_item_id', 'local_date', 'local_minute', 'time_start', 'time_length')
+
+
+def record_slot_move(slot, before):
+    """
+    Move a slot's counts, and its booking's, out of the buckets it was
+    counted in when saved with new times. ``before`` maps SLOT_BUCKET_FIELDS
+    to the slot's previous values.
+    """
+    if all(getattr(slot, field) == before[field] for field in SLOT_BUCKET_FIELDS):
+        return
+    old = SimpleNamespace(**before)
+    deltas = RollupDeltas()
+    deltas.slot(old, sign=-1)
+    deltas.slot(slot)
+    booking = Booking.all_venues.filter(time_slot_id=slot.pk).first()
+    if booking is not None:
+        deltas.booking(booking, old, sign=-1)
+        deltas.booking(booking, slot)
+    deltas.apply()
+
+
+def _rebuild_week(monday):
+    """Recompute every rollup for one local week from live and archived rows."""
+    week_end = monday + timedelta(days=7)
+    deltas = RollupDeltas()
+
+    for model in (BookingTimeSlot, ArchivedSlot):
+        rows = model.all_venues.filter(local_date__gte=monday, local_date__lt=week_end).values_list(
+            'venue_id', 'bookable_item_id', 'local_date', 'local_minute', 'time_length'
+        )
+        for venue_id, item_id, local_date, local_minute, time_length in rows.iterator(chunk_size=2000):
+            if item_id is not None:
+                deltas.add(venue_id, item_id, local_date, local_minute,
+                           slot_count=1, slot_minutes=_minutes(time_length))
+
+    for model in (Booking, ArchivedBooking):
+        rows = model.all_venues.filter(
+            time_slot__local_date__gte=monday, time_slot__local_date__lt=week_end
+        ).values_list(
+            'venue_id', 'time_slot__bookable_item_id', 'time_slot__local_date', 'time_slot__local_minute',
+            'time_slot__time_length', 'time_slot__time_start', 'created_at', 'party_size'
+        )
+        for venue_id, item_id, local_date, local_minute, time_length, time_start, created_at, party_size in rows.iterator(chunk_size=2000):
+            if item_id is not None:
+                deltas.add(
+                    venue_id, item_id, local_date, local_minute,
+                    booked_count=1, booked_minutes=_minutes(time_length), party_total=party_size,
+                    lead_minutes_total=max(_minutes(time_start - created_at), 0)
+                )
+
+    week_rollups = UsageRollup.all_venues.filter(date__gte=monday, date__lt=week_end)
+    # Cancelled bookings no longer exist, so their counts can only be carried over
+    for venue_id, item_id, period, date, hour, cancellations in week_rollups.filter(cancellations__gt=0).values_list(
+        'venue_id', 'bookable_item_id', 'period', 'date', 'hour', 'cancellations'
+    ):
+        deltas.deltas[(venue_id, item_id, period, date, hour)]['cancellations'] += cancellations
+
+    week_rollups.delete()
+    UsageRollup.all_venues.bulk_create([
+        UsageRollup(
+            venue_id=venue_id, bookable_item_id=item_id, period=period, date=date, hour=hour,
+            **{field: counts.get(field, 0) for field in ROLLUP_FIELDS}
+        )
+        for (venue_id, item_id, period, date, hour), counts in deltas.deltas.items()
+    ], batch_size=1000)
+    return len(deltas.deltas)
+
+
+def rebuild_rollups(since, until, progress=None):
+    """
+    Recompute rollups for the local weeks covering [since, until], one week
+    per transaction so the rebuild never holds locks for long. Returns the
+    number of rollup rows written.
+    """
+    monday = week_start(since)
+    total = 0
+    while monday <= until:
+        with transaction.atomic():
+            total += _rebuild_week(monday)
+        if progress:
+            progress(monday, total)
+        monday += timedelta(days=7)
+    return total
+
+
+def utilization_by_item_week(since, until):
+    """[(item name, week start, booked minutes, slot minutes)] for the current venue."""
+    return list(
+        UsageRollup.objects.filter(period='week', date__gte=week_start(since), date__lte=until)
+        .order_by('bookable_item__name', 'date')
+        .values_list('bookable_item__name', 'date', 'booked_minutes', 'slot_minutes')
+    )
+
+
+def bookings_by_hour(since, until):
+    """{local hour: (bookings, slots)} summed over items and days."""
+    rows = (
+        UsageRollup.objects.filter(period='hour', date__gte=since, date__lte=until)
+        .values('hour')
+        .annotate(booked=Sum('booked_count'), slots=Sum('slot_count'))
+        .values_list('hour', 'booked', 'slots')
+    )
+    return {hour: (booked, slots) for hour, booked, slots in rows}
+
+
+def weekly_totals(since, until):
+    """[(week start, booked, cancellations, lead minutes total)] across items."""
+    return list(
+        UsageRollup.objects.filter(period='week', date__gte=week_start(since), date__lte=until)
+        .values('date')
+        .annotate(
+            booked=Sum('booked_count'),
+            cancelled=Sum('cancellations'),
+            lead_minutes=Sum('lead_minutes_total'),
+        )
+        .order_by('date')
+        .values_list('date', 'booked', 'cancelled', 'lead_minutes')
+    )
@@ -0,0 +1,214 @@
+import base64
+import json
+from datetime import datetime, time
+
+from django.db.models import Q
+from django.http import JsonResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import BookableItem, Booking, BookingTimeSlot
+
+API_DEFAULT_LIMIT = 100
+API_MAX_LIMIT = 500
+COMPACT_JSON = {'separators': (',', ':')}
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _minutes(value):
+    return int(value.total_seconds() // 60)
+
+
+class ValuesSerializer:
+    """
+    Serialize rows straight from values_list() without building model
+    instances. ``fields`` maps each public field name to its ORM lookup and
+    an optional encoder. The lookups and encoders for each ``fields=``
+    selection are worked out once and reused for every later request.
+    """
+
+    def __init__(self, fields, default):
+        self.fields = fields
+        self.default = tuple(default)
+        self._compiled = {}
+
+    def compile(self, requested=None):
+        """Return (names, lookups, encoders) for a fields= value. Raises ValueError."""
+        names = tuple(name.strip() for name in requested.split(',') if name.strip()) if requested else self.default
+        compiled = self._compiled.get(names)
+        if compiled is None:
+            unknown = [name for name in names if name not in self.fields]
+            if unknown or not names:
+                raise ValueError(f'Unknown field(s): {", ".join(unknown)}. Available: {", ".join(self.fields)}')
+            if len(set(names)) != len(names):
+                raise ValueError('Each field may only be requested once')
+            compiled = (
+                names,
+                tuple(self.fields[name][0] for name in names),
+                tuple(self.fields[name][1] for name in names),
+            )
+            self._compiled[names] = compiled
+        return compiled
+
+    def encode(self, row, encoders):
+        return [value if encoder is None or value is None else encoder(value) for value, encoder in zip(row, encoders)]
+
+
+ITEM_SERIALIZER = ValuesSerializer({
+    'id': ('id', None),
+    'name': ('name', None),
+    'capacity': ('capacity', None),
+    'info': ('info', None),
+}, default=['id', 'name', 'capacity'])
+
+SLOT_SERIALIZER = ValuesSerializer({
+    'id': ('id', None),
+    'item_id': ('bookable_item_id', None),
+    'item_name': ('bookable_item__name', None),
+    'start': ('time_start', _iso),
+    'minutes': ('time_length', _minutes),
+    'status': ('status', None),
+    'local_date': ('local_date', _iso),
+    'local_minute': ('local_minute', None),
+    'version': ('version', None),
+}, default=['id', 'item_id', 'start', 'minutes', 'status'])
+
+BOOKING_SERIALIZER = ValuesSerializer({
+    'id': ('id', None),
+    'slot_id': ('time_slot_id', None),
+    'item_name': ('time_slot__bookable_item__name', None),
+    'start': ('time_slot__time_start', _iso),
+    'minutes': ('time_slot__time_length', _minutes),
+    'party_size': ('party_size', None),
+    'customer_name': ('customer_name', None),
+    'notes': ('notes', None),
+    'created_at': ('created_at', _iso),
+}, default=['id', 'slot_id', 'start', 'minutes', 'party_size'])
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values, separators=(',', ':')).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return the [sort value, id] pair in a cursor. Raises ValueError."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return value, int(pk)
+    except (TypeError, ValueError, json.JSONDecodeError):
+        raise ValueError('Invalid cursor')
+
+
+def parse_api_time(value, name):
+    """
+    Accept an ISO 8601 datetime or a plain date (midnight in the venue's
+    timezone). Raises ValueError.
+    """
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'{name} must be an ISO 8601 date or datetime')
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_limit(value):
+    try:
+        limit = int(value) if value else API_DEFAULT_LIMIT
+    except ValueError:
+        raise ValueError('limit must be a number')
+    if not 1 <= limit <= API_MAX_LIMIT:
+        raise ValueError(f'limit must be between 1 and {API_MAX_LIMIT}')
+    return limit
+
+
+def keyset_page(queryset, serializer, request, order_field, parse_order_value=None):
+    """
+    One page of ``queryset`` ordered by (order_field, id), continuing after
+    the ``cursor`` parameter. Keyset pagination keeps every page an index
+    range scan however deep the client pages. Raises ValueError for bad
+    parameters.
+    """
+    names, lookups, encoders = serializer.compile(request.GET.get('fields'))
+    limit = parse_limit(request.GET.get('limit'))
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        value, pk = decode_cursor(cursor)
+        if parse_order_value:
+            try:
+                value = parse_order_value(value)
+            except (TypeError, ValueError):
+                value = None
+            if value is None:
+                raise ValueError('Invalid cursor')
+        queryset = queryset.filter(Q(**{f'{order_field}__gt': value}) | Q(**{order_field: value, 'id__gt': pk}))
+
+    # The sort columns ride along at the end of each row to build the next cursor
+    rows = list(queryset.order_by(order_field, 'id').values_list(*lookups, order_field, 'id')[:limit + 1])
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_value, last_pk = rows[-1][-2:]
+        next_cursor = encode_cursor([_iso(last_value) if hasattr(last_value, 'isoformat') else last_value, last_pk])
+
+    data = [serializer.encode(row[:len(names)], encoders) for row in rows]
+    if request.GET.get('shape') == 'rows':
+        # Field names once instead of in every object: roughly half the bytes
+        return {'success': True, 'fields': list(names), 'rows': data, 'next_cursor': next_cursor}
+    return {'success': True, 'data': [dict(zip(names, row)) for row in data], 'next_cursor': next_cursor}
+
+
+def api_response(payload, status=200):
+    return JsonResponse(payload, status=status, json_dumps_params=COMPACT_JSON)
+
+
+def api_error(message, status=400):
+    return api_response({'success': False, 'error': message}, status=status)
+
+
+def item_queryset(request):
+    return BookableItem.objects.filter(is_active=True)
+
+
+def slot_queryset(request):
+    """Slots for the current venue, filtered by from/to, status and item."""
+    slots = BookingTimeSlot.objects.filter(bookable_item__is_active=True)
+    range_start = request.GET.get('from')
+    range_end = request.GET.get('to')
+    slots = slots.filter(time_start__gte=parse_api_time(range_start, 'from') if range_start else timezone.now())
+    if range_end:
+        slots = slots.filter(time_start__lt=parse_api_time(range_end, 'to'))
+
+    statuses = request.GET.getlist('status')
+    valid_statuses = {choice for choice, _ in BookingTimeSlot.STATUS_CHOICES}
+    if not set(statuses) <= valid_statuses:
+        raise ValueError(f'status must be one of: {", ".join(sorted(valid_statuses))}')
+    if statuses:
+        slots = slots.filter(status__in=statuses)
+    try:
+        item_ids = [int(item_id) for item_id in request.GET.getlist('item')]
+    except ValueError:
+        raise ValueError('item must be a bookable item id')
+    if item_ids:
+        slots = slots.filter(bookable_item_id__in=item_ids)
+    return slots
+
+
+def booking_queryset(request):
+    """The requesting user's bookings, optionally limited to a from/to range."""
+    bookings = Booking.objects.filter(user=request.user)
+    range_start = request.GET.get('from')
+    range_end = request.GET.get('to')
+    if range_start:
+        bookings = bookings.filter(time_slot__time_start__gte=parse_api_time(range_start, 'from'))
+    if range_end:
+        bookings = bookings.filter(time_slot__time_start__lt=parse_api_time(range_end, 'to'))
+    return bookings
@@ -0,0 +1,92 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics, audit
+from .models import ArchivedBooking, AuditEvent, ArchivedSlot, Booking, BookingTimeSlot
+
+ARCHIVE_BATCH_SIZE = 1000
+DEFAULT_ARCHIVE_AFTER = timedelta(days=90)
+
+
+def _archive_batch(cutoff, batch_size):
+    """
+    Move one batch of slots that start before cutoff, and their bookings,
+    into the archive tables. Each batch is its own short transaction so
+    live booking traffic is never blocked for long.
+    """
+    # Archived rows still count towards the rollups, so deleting them here
+    # mustn't take them out, and they're logged as archived, not deleted
+    with transaction.atomic(), analytics.paused():
+        slots = list(
+            BookingTimeSlot.all_venues.select_for_update(skip_locked=True, of=('self',))
+            .filter(time_start__lt=cutoff)
+            .select_related('bookable_item')
+            .order_by('time_start', 'id')[:batch_size]
+        )
+        if not slots:
+            return 0, 0
+        slot_ids = [slot.id for slot in slots]
+        bookings = list(Booking.all_venues.filter(time_slot_id__in=slot_ids))
+
+        ArchivedSlot.all_venues.bulk_create([
+            ArchivedSlot(
+                id=slot.id,
+                venue_id=slot.venue_id,
+                bookable_item_id=slot.bookable_item_id,
+                item_name=slot.bookable_item.name,
+                time_start=slot.time_start,
+                time_length=slot.time_length,
+                status=slot.status,
+                local_date=slot.local_date,
+                local_minute=slot.local_minute,
+                created_at=slot.created_at,
+                updated_at=slot.updated_at,
+            )
+            for slot in slots
+        ], ignore_conflicts=True)
+        ArchivedBooking.all_venues.bulk_create([
+            ArchivedBooking(
+                id=booking.id,
+                venue_id=booking.venue_id,
+                user_id=booking.user_id,
+                time_slot_id=booking.time_slot_id,
+                customer_name=booking.customer_name,
+                customer_phone=booking.customer_phone,
+                customer_email=booking.customer_email,
+                party_size=booking.party_size,
+                notes=booking.notes,
+                created_at=booking.created_at,
+                updated_at=booking.updated_at,
+            )
+            for booking in bookings
+        ], ignore_conflicts=True)
+
+        with audit.paused():
+            Booking.all_venues.filter(id__in=[booking.id for booking in bookings]).delete()
+            BookingTimeSlot.all_venues.filter(id__in=slot_ids).delete()
+        audit.record_many(AuditEvent.ARCHIVED, [(slot.id, None, slot.venue_id) for slot in slots])
+    return len(slots), len(bookings)
+
+
+def archive_slots_before(cutoff, batch_size=ARCHIVE_BATCH_SIZE, progress=None):
+    """
+    Archive every slot starting before cutoff in bounded batches. Returns
+    (slots archived, bookings archived). ``progress`` is called with the
+    running totals after each batch.
+    """
+    total_slots = total_bookings = 0
+    while True:
+        slots, bookings = _archive_batch(cutoff, batch_size)
+        if not slots:
+            return total_slots, total_bookings
+        total_slots += slots
+        total_bookings += bookings
+        if progress:
+            progress(total_slots, total_bookings)
+
+
+def default_archive_cutoff():
+    return timezone.now() - getattr(settings, 'ARCHIVE_SLOTS_AFTER', DEFAULT_ARCHIVE_AFTER)
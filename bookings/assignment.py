@@ -0,0 +1,97 @@
+from collections import namedtuple
+
+from .group_booking import GroupBookingError, book_slots
+from .models import BookableItem, BookingTimeSlot
+
+MAX_COMBINED_ITEMS = 3
+ASSIGNMENT_ATTEMPTS = 3
+
+Candidate = namedtuple('Candidate', ['slot_id', 'item_id', 'capacity', 'name'])
+
+
+def load_candidates(time_start, exclude_slot_ids=()):
+    """Free slots on active items starting at time_start, in one query."""
+    rows = (
+        BookingTimeSlot.objects.filter(
+            time_start=time_start,
+            status='available',
+            bookable_item__is_active=True
+        ).exclude(id__in=exclude_slot_ids)
+        .values_list('id', 'bookable_item_id', 'bookable_item__capacity', 'bookable_item__name')
+    )
+    return [Candidate(*row) for row in rows]
+
+
+def load_adjacency(item_ids):
+    """{item id: set of adjacent item ids} restricted to ``item_ids``."""
+    item_ids = set(item_ids)
+    adjacency = {item_id: set() for item_id in item_ids}
+    pairs = BookableItem.adjacent_items.through.objects.filter(
+        from_bookableitem_id__in=item_ids,
+        to_bookableitem_id__in=item_ids
+    ).values_list('from_bookableitem_id', 'to_bookableitem_id')
+    for from_id, to_id in pairs:
+        adjacency[from_id].add(to_id)
+    return adjacency
+
+
+def _fit_key(candidates):
+    # Least spare seats first, then fewest items pushed together, then by name
+    # so the same request always gets the same answer
+    return (sum(c.capacity for c in candidates), len(candidates), sorted(c.name for c in candidates))
+
+
+def best_fit(candidates, party_size, adjacency=None, max_items=MAX_COMBINED_ITEMS):
+    """
+    Pick the free item, or group of adjacent free items, that seats the
+    party with the fewest empty seats. A single item always wins over a
+    combination. Returns a list of candidates, or None if nothing fits.
+    """
+    singles = [c for c in candidates if c.capacity >= party_size]
+    if singles:
+        return [min(singles, key=lambda c: _fit_key([c]))]
+    if not adjacency or max_items < 2:
+        return None
+
+    by_item = {c.item_id: c for c in candidates}
+    best = None
+    # Grow connected groups one adjacent item at a time. The free items at
+    # one time are a venue's tables, so this stays small
+    groups = {frozenset([item_id]) for item_id in by_item}
+    for _ in range(max_items - 1):
+        grown = set()
+        for group in groups:
+            for item_id in group:
+                for neighbour in adjacency.get(item_id, ()):
+                    if neighbour in by_item and neighbour not in group:
+                        grown.add(group | {neighbour})
+        for group in grown:
+            combination = [by_item[item_id] for item_id in group]
+            if sum(c.capacity for c in combination) >= party_size:
+                if best is None or _fit_key(combination) < _fit_key(best):
+                    best = combination
+        groups = grown
+    return sorted(best, key=lambda c: c.name) if best else None
+
+
+def assign_and_book(user, party_size, time_start, notes=''):
+    """
+    Book the best-fit item(s) for a party at time_start. If another request
+    takes a chosen slot first, pick again without it. Raises
+    GroupBookingError when nothing fits.
+    """
+    taken = set()
+    for _ in range(ASSIGNMENT_ATTEMPTS):
+        candidates = load_candidates(time_start, exclude_slot_ids=taken)
+        choice = best_fit(candidates, party_size)
+        if choice is None:
+            choice = best_fit(candidates, party_size, load_adjacency(c.item_id for c in candidates))
+        if choice is None:
+            raise GroupBookingError(f'No table for {party_size} is free at that time', status=409)
+        try:
+            return book_slots(user, [c.slot_id for c in choice], party_size=party_size, notes=notes)
+        except GroupBookingError as e:
+            if e.status != 409:
+                raise
+            taken.update(e.slot_ids)
+    raise GroupBookingError('Those tables were just taken, please try again', status=409)
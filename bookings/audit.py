@@ -0,0 +1,183 @@
+import atexit
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AuditEvent
+
+DEFAULT_AUDIT_BATCH_SIZE = 200
+DEFAULT_AUDIT_FLUSH_SECONDS = 2.0
+DEFAULT_AUDIT_RETENTION = timedelta(days=365)
+PRUNE_BATCH_SIZE = 5000
+
+EVENT_NAMES = dict(AuditEvent.EVENT_CHOICES)
+# State of a slot after each kind of event, for replaying its history
+EVENT_STATES = {
+    AuditEvent.SLOT_CREATED: 'available',
+    AuditEvent.SLOT_DELETED: 'deleted',
+    AuditEvent.BOOKED: 'booked',
+    AuditEvent.CANCELLED: 'available',
+    AuditEvent.ARCHIVED: 'archived',
+    AuditEvent.BLOCKED: 'blocked',
+    AuditEvent.UNBLOCKED: 'available',
+}
+
+_actor = contextvars.ContextVar('audit_actor', default=None)
+_paused = contextvars.ContextVar('audit_paused', default=False)
+
+
+def set_actor(user):
+    """Attribute events in this context to ``user``. Returns a token for reset_actor()."""
+    return _actor.set(user)
+
+
+def reset_actor(token):
+    _actor.reset(token)
+
+
+def _actor_id():
+    user = _actor.get()
+    if user is None or not user.is_authenticated:
+        return None
+    return user.id
+
+
+@contextmanager
+def paused():
+    """Don't log changes made inside this block, e.g. while archiving logs its own event."""
+    token = _paused.set(True)
+    try:
+        yield
+    finally:
+        _paused.reset(token)
+
+
+class AuditBuffer:
+    """
+    Events waiting to be written. Recording an event only appends a tuple;
+    the rows go to the database in one bulk insert once ``batch_size``
+    events are waiting or the oldest has waited ``flush_seconds``. A process
+    that is killed outright loses what is still buffered.
+    """
+
+    def __init__(self):
+        self._rows = []
+        self._oldest = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def append(self, row):
+        with self._lock:
+            if not self._rows:
+                self._oldest = time.monotonic()
+            self._rows.append(row)
+            due = len(self._rows) >= getattr(settings, 'AUDIT_BATCH_SIZE', DEFAULT_AUDIT_BATCH_SIZE)
+        if due:
+            self.flush()
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def flush_if_stale(self):
+        oldest = self._oldest
+        max_age = getattr(settings, 'AUDIT_FLUSH_SECONDS', DEFAULT_AUDIT_FLUSH_SECONDS)
+        if self._rows and oldest is not None and time.monotonic() - oldest >= max_age:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered event. Returns the number written."""
+        with self._lock:
+            rows, self._rows, self._oldest = self._rows, [], None
+        if rows:
+            AuditEvent.objects.bulk_create([
+                AuditEvent(event=event, slot_id=slot_id, booking_id=booking_id,
+                           actor_id=actor_id, venue_id=venue_id, at=at)
+                for event, slot_id, booking_id, actor_id, venue_id, at in rows
+            ])
+        return len(rows)
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def record(event, slot_id, booking_id=None, venue_id=None):
+    """
+    Log one event. It is buffered when the surrounding transaction commits,
+    so rolled back changes are never logged.
+    """
+    if _paused.get():
+        return
+    row = (event, slot_id, booking_id, _actor_id(), venue_id, timezone.now())
+    transaction.on_commit(lambda: buffer.append(row))
+
+
+def record_many(event, changes):
+    """record() for many (slot id, booking id, venue id) changes at once."""
+    if _paused.get():
+        return
+    actor_id = _actor_id()
+    now = timezone.now()
+    rows = [(event, slot_id, booking_id, actor_id, venue_id, now) for slot_id, booking_id, venue_id in changes]
+    if rows:
+        transaction.on_commit(lambda: buffer.extend(rows))
+
+
+def flush():
+    return buffer.flush()
+
+
+def slot_history(slot_id, venue_id=None):
+    """
+    Every logged event for one slot in order, each with the slot's state
+    after it, optionally only if logged for ``venue_id``. Flushes this
+    process's buffer first; events still buffered in other processes show up
+    within AUDIT_FLUSH_SECONDS.
+    """
+    buffer.flush()
+    events = AuditEvent.objects.filter(slot_id=slot_id)
+    if venue_id is not None:
+        events = events.filter(venue_id=venue_id)
+    history = []
+    for event, booking_id, actor_id, at in (
+        events.order_by('at', 'id').values_list('event', 'booking_id', 'actor_id', 'at')
+    ):
+        history.append({
+            'event': EVENT_NAMES[event],
+            'at': at,
+            'booking_id': booking_id,
+            'actor_id': actor_id,
+            'state': EVENT_STATES[event],
+        })
+    return history
+
+
+def get_audit_retention():
+    return getattr(settings, 'AUDIT_RETENTION', DEFAULT_AUDIT_RETENTION)
+
+
+def prune_audit_log(before=None, batch_size=PRUNE_BATCH_SIZE):
+    """
+    Delete events logged before ``before`` (default: older than
+    AUDIT_RETENTION) in batches taken off the front of the time index.
+    Returns the number deleted.
+    """
+    before = before or timezone.now() - get_audit_retention()
+    total = 0
+    while True:
+        ids = list(
+            AuditEvent.objects.filter(at__lt=before).order_by('at', 'id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return total
+        AuditEvent.objects.filter(id__in=ids).delete()
+        total += len(ids)
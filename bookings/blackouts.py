@@ -0,0 +1,146 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import DateTimeField, ExpressionWrapper, F
+from django.utils import timezone
+
+from . import audit
+from .models import AuditEvent, BlackoutWindow, BookableItem, BookingTimeSlot
+
+MAX_BLACKOUT_LENGTH = timedelta(days=90)
+# Slots are at most this long, so anything overlapping the window starts
+# after window start minus this: keeps the lookup a time_start range scan
+MAX_SLOT_LENGTH = timedelta(days=1)
+
+
+def overlapping_slots(item_ids, starts_at, ends_at):
+    """Slots on ``item_ids`` that overlap [starts_at, ends_at)."""
+    return (
+        BookingTimeSlot.objects.filter(
+            bookable_item_id__in=item_ids,
+            time_start__gt=starts_at - MAX_SLOT_LENGTH,
+            time_start__lt=ends_at,
+        )
+        .alias(time_end=ExpressionWrapper(F('time_start') + F('time_length'), output_field=DateTimeField()))
+        .filter(time_end__gt=starts_at)
+    )
+
+
+def clash_report(slots):
+    """The bookings on ``slots``, for staff to contact or move."""
+    rows = slots.filter(status='booked', booking__isnull=False).order_by('time_start', 'id').values(
+        'id', 'time_start', 'bookable_item__name', 'booking__id',
+        'booking__customer_name', 'booking__customer_email', 'booking__customer_phone'
+    )
+    return [{
+        'slot_id': row['id'],
+        'booking_id': row['booking__id'],
+        'bookable_item': row['bookable_item__name'],
+        'slot_time': timezone.localtime(row['time_start']).strftime('%Y-%m-%d %H:%M'),
+        'customer_name': row['booking__customer_name'],
+        'customer_email': row['booking__customer_email'],
+        'customer_phone': row['booking__customer_phone'],
+    } for row in rows]
+
+
+def windows_in_force(item_ids, starts_at, ends_at):
+    """Unlifted windows over any of ``item_ids`` that overlap [starts_at, ends_at), oldest first."""
+    return (
+        BlackoutWindow.all_venues.filter(
+            lifted_at__isnull=True, items__in=item_ids, starts_at__lt=ends_at, ends_at__gt=starts_at
+        )
+        .distinct()
+        .order_by('starts_at', 'id')
+    )
+
+
+def block_new_slots(slots):
+    """
+    Block unsaved ``slots`` that fall in a window in force and tag them with
+    it, as create_blackout() would have if they had existed then. One query
+    however many slots there are; only available, untagged slots change.
+    """
+    slots = [slot for slot in slots if slot.status == 'available' and slot.blackout_id is None]
+    if not slots:
+        return
+    covering = BlackoutWindow.items.through.objects.filter(
+        bookableitem_id__in={slot.bookable_item_id for slot in slots},
+        blackoutwindow__lifted_at__isnull=True,
+        blackoutwindow__starts_at__lt=max(slot.time_end for slot in slots),
+        blackoutwindow__ends_at__gt=min(slot.time_start for slot in slots),
+    ).order_by('blackoutwindow__starts_at', 'blackoutwindow_id').values_list(
+        'bookableitem_id', 'blackoutwindow_id', 'blackoutwindow__starts_at', 'blackoutwindow__ends_at'
+    )
+    windows = defaultdict(list)
+    for item_id, window_id, starts_at, ends_at in covering:
+        windows[item_id].append((window_id, starts_at, ends_at))
+    for slot in slots:
+        for window_id, starts_at, ends_at in windows[slot.bookable_item_id]:
+            if starts_at < slot.time_end and ends_at > slot.time_start:
+                slot.status = 'blocked'
+                slot.blackout_id = window_id
+                break
+
+
+def create_blackout(item_ids, starts_at, ends_at, reason='', user=None):
+    """
+    Take items out of service between starts_at and ends_at. Available
+    slots in the window are blocked with one UPDATE; booked slots keep
+    their booking, are tagged so they are blocked if it is cancelled, and
+    are reported as clashes. Returns (window, blocked count, clashes).
+    Raises ValueError for a bad range or unknown items.
+    """
+    if ends_at <= starts_at:
+        raise ValueError('end must be after start')
+    if ends_at - starts_at > MAX_BLACKOUT_LENGTH:
+        raise ValueError(f'A blackout can be at most {MAX_BLACKOUT_LENGTH.days} days long')
+    item_ids = set(item_ids)
+    items = list(BookableItem.objects.filter(id__in=item_ids))
+    if not items or len(items) != len(item_ids):
+        raise ValueError('item_ids must be bookable items of this venue')
+
+    now = timezone.now()
+    with transaction.atomic():
+        window = BlackoutWindow.objects.create(
+            venue_id=items[0].venue_id, starts_at=starts_at, ends_at=ends_at, reason=reason, created_by=user
+        )
+        window.items.set(items)
+        slots = overlapping_slots(item_ids, starts_at, ends_at).filter(blackout__isnull=True)
+        clashes = clash_report(slots)
+
+        blocked = slots.filter(status='available').update(
+            status='blocked', blackout=window, version=F('version') + 1, updated_at=now
+        )
+        slots.filter(status='booked').update(blackout=window, version=F('version') + 1, updated_at=now)
+        audit.record_many(AuditEvent.BLOCKED, [
+            (slot_id, None, window.venue_id)
+            for slot_id in window.slots.filter(status='blocked').values_list('id', flat=True)
+        ])
+    return window, blocked, clashes
+
+
+def lift_blackout(window):
+    """
+    Put a window's items back in service with one UPDATE: blocked slots
+    become available again. Slots another window in force also covers stay
+    as they are, tagged with that window instead, one UPDATE per window.
+    Returns the number of slots unblocked.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        window.lifted_at = now
+        window.save(update_fields=['lifted_at'])
+        others = windows_in_force(window.items.all(), window.starts_at, window.ends_at).prefetch_related('items')
+        for other in others:
+            overlapping_slots([item.id for item in other.items.all()], other.starts_at, other.ends_at).filter(
+                blackout=window
+            ).update(blackout=other, version=F('version') + 1, updated_at=now)
+
+        unblocked_ids = list(window.slots.filter(status='blocked').values_list('id', flat=True))
+        unblocked = BookingTimeSlot.objects.filter(id__in=unblocked_ids, blackout=window, status='blocked').update(
+            status='available', blackout=None, version=F('version') + 1, updated_at=now
+        )
+        window.slots.update(blackout=None, version=F('version') + 1, updated_at=now)
+        audit.record_many(AuditEvent.UNBLOCKED, [(slot_id, None, window.venue_id) for slot_id in unblocked_ids])
+    return unblocked
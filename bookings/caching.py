@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Backends whose entries live in one process, so other workers never see them
+PROCESS_LOCAL_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+def is_shared(alias='default'):
+    """
+    Whether every worker sees the same cache ``alias``, guessed from its
+    backend. settings.CACHE_IS_SHARED overrides the guess, e.g. True for a
+    single-process server using the in-memory cache.
+    """
+    shared = getattr(settings, 'CACHE_IS_SHARED', None)
+    if shared is not None:
+        return shared
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PROCESS_LOCAL_BACKENDS
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """`manage.py check --deploy` warns when the cache is per process."""
+    if is_shared():
+        return []
+    return [Warning(
+        'The default cache is per process, so the item catalog is reloaded on every request and the booking '
+        'write concurrency cap is off.',
+        hint='Set REDIS_URL so every worker shares one cache.',
+        id='bookings.W001',
+    )]
@@ -0,0 +1,108 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .caching import is_shared
+from .tenancy import current_venue_id
+
+CATALOG_VERSION_KEY = 'bookable-item-catalog-version'
+
+
+class Catalog:
+    """
+    One venue's bookable items by id and by name, as they were at
+    ``version``. Shared between requests in a process, so treat the items
+    as read-only.
+    """
+
+    def __init__(self, venue_id, version, items):
+        self.venue_id = venue_id
+        self.version = version
+        self.by_id = {}
+        self.by_name = {}
+        for item in sorted(items, key=lambda item: item.id):
+            self._add(item)
+
+    def _add(self, item):
+        self.by_id[item.id] = item
+        # Names aren't unique; the oldest item wins, as a lookup by name would
+        self.by_name.setdefault(item.name, item)
+
+    def item(self, item_id):
+        """The item with ``item_id``, read from the database if it is newer than the catalog."""
+        item = self.by_id.get(item_id)
+        if item is None:
+            from .models import BookableItem
+
+            item = BookableItem.objects.filter(id=item_id).first()
+            if item is not None:
+                self._add(item)
+        return item
+
+    def get_or_create(self, name, **defaults):
+        """The item called ``name``, created with ``defaults`` if there is none. Returns (item, created)."""
+        item = self.by_name.get(name)
+        if item is not None:
+            return item, False
+        from .models import BookableItem
+
+        item, created = BookableItem.objects.get_or_create(name=name, defaults=defaults)
+        self._add(item)
+        return item, created
+
+
+# venue id (None outside a venue scope) -> Catalog. Cleared in this process
+# when an item is saved; other workers reload when the shared version moves.
+_catalogs = {}
+
+
+def _fresh_version():
+    # Never a value an earlier key held, so an evicted key can't come back
+    # at a version some worker has already cached
+    return time.time_ns()
+
+
+def _shared_version():
+    return cache.get_or_set(CATALOG_VERSION_KEY, _fresh_version, None)
+
+
+def get_catalog():
+    """
+    The current venue's item catalog. Costs one cache read to check the
+    shared version, and one query only when the catalog has changed. With a
+    per-process cache other workers' changes can't be seen, so the catalog
+    is loaded afresh on every call instead.
+    """
+    venue_id = current_venue_id()
+    if not is_shared():
+        from .models import BookableItem
+
+        return Catalog(venue_id, None, BookableItem.objects.all())
+    version = _shared_version()
+    catalog = _catalogs.get(venue_id)
+    if catalog is None or catalog.version != version:
+        from .models import BookableItem
+
+        catalog = Catalog(venue_id, version, BookableItem.objects.all())
+        _catalogs[venue_id] = catalog
+    return catalog
+
+
+def _bump_version():
+    _catalogs.clear()
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Evicted: start again from a version no worker can be holding
+        cache.set(CATALOG_VERSION_KEY, _fresh_version(), None)
+
+
+def invalidate_catalog():
+    """
+    Drop this process's catalogs now, and every worker's once the change
+    commits: bumping the shared version before then would let another
+    worker cache the old rows under the new version.
+    """
+    _catalogs.clear()
+    transaction.on_commit(_bump_version)
@@ -0,0 +1,85 @@
+from django.db import transaction
+from django.http import JsonResponse
+
+from .models import BookingTimeSlot
+
+
+class SlotConflict(Exception):
+    """The slot changed since it was read; nothing has been written."""
+
+    def __init__(self, slot_id, message='This time slot was changed by someone else'):
+        super().__init__(message)
+        self.slot_id = slot_id
+
+
+def expected_version(data):
+    """
+    The slot version a client says it last saw, from the request's JSON
+    body, or None if it didn't send one. Raises ValueError.
+    """
+    version = data.get('version')
+    if version is None:
+        return None
+    try:
+        return int(version)
+    except (TypeError, ValueError):
+        raise ValueError('version must be a whole number')
+
+
+def update_slot(time_slot, expected=None, **changes):
+    """
+    Write ``changes`` to a slot with time_slot.save_if_unchanged(). Raises
+    SlotConflict if the client's ``expected`` version is out of date or
+    anyone changed the slot since it was read in this request.
+    """
+    if expected is not None and expected != time_slot.version:
+        raise SlotConflict(time_slot.id)
+    if not time_slot.save_if_unchanged(**changes):
+        raise SlotConflict(time_slot.id)
+
+
+def lock_slot_if_unchanged(time_slot, expected=None):
+    """
+    Lock and return the slot's row if it is still at the version it was
+    read at, or raise SlotConflict. Call inside a transaction; nobody can
+    change the slot until it ends.
+    """
+    if expected is not None and expected != time_slot.version:
+        raise SlotConflict(time_slot.id)
+    locked = BookingTimeSlot.objects.select_for_update().filter(id=time_slot.id, version=time_slot.version).first()
+    if locked is None:
+        raise SlotConflict(time_slot.id)
+    return locked
+
+
+def delete_slot_if_unchanged(time_slot, expected=None):
+    """Delete a slot, and its booking, only if it is still at the version it was read at."""
+    with transaction.atomic():
+        lock_slot_if_unchanged(time_slot, expected).delete()
+
+
+def slot_state(slot_id):
+    """The slot as it is now, for clients to refresh from, or None if it was deleted."""
+    row = (
+        BookingTimeSlot.objects.filter(id=slot_id)
+        .values('id', 'status', 'version', 'updated_at', 'bookable_item__name', 'booking__customer_name')
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        'slot_id': row['id'],
+        'status': row['status'],
+        'version': row['version'],
+        'updated_at': row['updated_at'].isoformat(),
+        'bookable_item': row['bookable_item__name'],
+        'booking_user': row['booking__customer_name'],
+    }
+
+
+def conflict_response(error):
+    return JsonResponse({
+        'success': False,
+        'error': f'{error}. Reload to see its current state.',
+        'slot': slot_state(error.slot_id)
+    }, status=409)
@@ -0,0 +1,191 @@
+import csv
+import heapq
+from datetime import datetime, timedelta
+
+from django.core import signing
+from django.utils import timezone
+
+EXPORT_CHUNK_SIZE = 2000
+CALENDAR_FEED_SALT = 'bookings.calendar-feed'
+
+SLOT_CSV_HEADER = ['slot_id', 'bookable_item', 'time_start', 'time_end', 'status', 'booked_by', 'notes']
+BOOKING_CSV_HEADER = [
+    'booking_id', 'bookable_item', 'time_start', 'time_end', 'user', 'customer_name',
+    'customer_phone', 'customer_email', 'party_size', 'notes', 'created_at',
+]
+
+
+class Echo:
+    """File-like object that hands back whatever is written, for streaming csv.writer output."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows):
+    """Yield CSV encoded lines one at a time so the response never holds the whole file."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _iterate(rows):
+    if hasattr(rows, 'iterator'):
+        return rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    return rows
+
+
+def _item_name(slot):
+    # Archived slots keep a copy of the name; live slots read it from the item
+    return getattr(slot, 'item_name', None) or slot.bookable_item.name
+
+
+def with_archive(live, archived, key):
+    """
+    Merge a live queryset with its archive counterpart into one stream.
+    Both must already be ordered by ``key`` so the merge stays lazy.
+    """
+    return heapq.merge(_iterate(live), _iterate(archived), key=key)
+
+
+def slot_csv_rows(slots):
+    for slot in _iterate(slots):
+        booking = getattr(slot, 'booking', None)
+        yield [
+            slot.id,
+            _item_name(slot),
+            slot.time_start.isoformat(),
+            slot.time_end.isoformat(),
+            slot.status,
+            booking.customer_name if booking else '',
+            booking.notes if booking else '',
+        ]
+
+
+def booking_csv_rows(bookings):
+    for booking in _iterate(bookings):
+        slot = booking.time_slot
+        yield [
+            booking.id,
+            _item_name(slot),
+            slot.time_start.isoformat(),
+            slot.time_end.isoformat(),
+            booking.user.username,
+            booking.customer_name,
+            booking.customer_phone,
+            booking.customer_email,
+            booking.party_size,
+            booking.notes,
+            booking.created_at.isoformat(),
+        ]
+
+
+def _ics_datetime(value):
+    return value.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _ics_text(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _ics_line(line):
+    """Fold a content line at 75 octets as required by RFC 5545."""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Never split a multi-byte character across two lines
+        while cut > 0 and (encoded[cut] & 0xC0) == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode('utf-8'))
+        encoded = encoded[cut:]
+    parts.append(encoded.decode('utf-8'))
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def _ics_event(uid, start, end, summary, description, stamp):
+    yield _ics_line('BEGIN:VEVENT')
+    yield _ics_line(f'UID:{uid}')
+    yield _ics_line(f'DTSTAMP:{_ics_datetime(stamp)}')
+    yield _ics_line(f'DTSTART:{_ics_datetime(start)}')
+    yield _ics_line(f'DTEND:{_ics_datetime(end)}')
+    yield _ics_line(f'SUMMARY:{_ics_text(summary)}')
+    if description:
+        yield _ics_line(f'DESCRIPTION:{_ics_text(description)}')
+    yield _ics_line('END:VEVENT')
+
+
+def stream_ics(events, calendar_name):
+    """Wrap a generator of VEVENT lines in a VCALENDAR."""
+    yield _ics_line('BEGIN:VCALENDAR')
+    yield _ics_line('VERSION:2.0')
+    yield _ics_line('PRODID:-//White Label Booking System//EN')
+    yield _ics_line('CALSCALE:GREGORIAN')
+    yield _ics_line(f'X-WR-CALNAME:{_ics_text(calendar_name)}')
+    yield from events
+    yield _ics_line('END:VCALENDAR')
+
+
+def slot_ics_events(slots, host):
+    for slot in _iterate(slots):
+        booking = getattr(slot, 'booking', None)
+        description = f'Booked by {booking.customer_name}' if booking else ''
+        yield from _ics_event(
+            f'slot-{slot.id}@{host}',
+            slot.time_start,
+            slot.time_end,
+            f'{_item_name(slot)} ({slot.get_status_display()})',
+            description,
+            slot.updated_at,
+        )
+
+
+def booking_ics_events(bookings, host):
+    for booking in _iterate(bookings):
+        slot = booking.time_slot
+        yield from _ics_event(
+            f'booking-{booking.id}@{host}',
+            slot.time_start,
+            slot.time_end,
+            _item_name(slot),
+            booking.notes,
+            booking.updated_at,
+        )
+
+
+def parse_export_range(start_str, end_str, today=None):
+    """
+    Turn YYYY-MM-DD query parameters into an aware [start, end) datetime range.
+    The end date is inclusive; defaults to the next 30 days. Raises ValueError.
+    """
+    today = today or timezone.localdate()
+    start_date = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else today
+    end_date = datetime.strptime(end_str, '%Y-%m-%d').date() if end_str else start_date + timedelta(days=30)
+    if end_date < start_date:
+        raise ValueError('End date must be on or after start date')
+    range_start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+    range_end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+    return range_start, range_end
+
+
+def calendar_feed_token(user):
+    """Signed, unguessable token identifying a user's calendar feed."""
+    return signing.dumps(user.pk, salt=CALENDAR_FEED_SALT)
+
+
+def user_id_from_feed_token(token):
+    """Return the user id for a feed token, or None if it was tampered with."""
+    try:
+        return signing.loads(token, salt=CALENDAR_FEED_SALT)
+    except signing.BadSignature:
+        return None
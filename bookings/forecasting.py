@@ -0,0 +1,139 @@
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+
+from .importer import import_slot_rows
+from .models import BookableItem, UsageRollup
+
+HISTORY_WEEKS = 52
+HALF_LIFE_WEEKS = 8
+# Cells that sold out only show a lower bound on demand
+SELL_OUT_UPLIFT = 1.25
+DEFAULT_HEADROOM = 0.2
+MIN_OPEN_SHARE = 0.25
+
+DemandHistory = namedtuple('DemandHistory', ['item_ids', 'booked', 'opened'])
+ProposedSlot = namedtuple('ProposedSlot', ['item_id', 'item_name', 'date', 'hour', 'expected'])
+
+
+def load_history(end_date, weeks=HISTORY_WEEKS):
+    """
+    Hourly booked and opened slot counts for the current venue's items over
+    the ``weeks`` weeks before end_date, read from the hourly rollups in one
+    query. Returns arrays shaped (items, weeks, 7 days, 24 hours).
+    """
+    start_date = end_date - timedelta(weeks=weeks)
+    rows = list(
+        UsageRollup.objects.filter(period='hour', date__gte=start_date, date__lt=end_date)
+        .values_list('bookable_item_id', 'date', 'hour', 'booked_count', 'slot_count')
+    )
+    item_ids = sorted({row[0] for row in rows})
+    booked = np.zeros((len(item_ids), weeks, 7, 24))
+    opened = np.zeros_like(booked)
+    if not rows:
+        return DemandHistory(item_ids, booked, opened)
+
+    item_index = {item_id: index for index, item_id in enumerate(item_ids)}
+    start_ordinal = start_date.toordinal()
+    columns = np.array(
+        [(item_index[item_id], date.toordinal() - start_ordinal, hour, booked_count, slot_count)
+         for item_id, date, hour, booked_count, slot_count in rows],
+        dtype=np.int64
+    )
+    days = columns[:, 1]
+    # toordinal() 1 is a Monday, so (ordinal - 1) % 7 is the weekday
+    weekdays = (days + start_ordinal - 1) % 7
+    index = (columns[:, 0], days // 7, weekdays, columns[:, 2])
+    np.add.at(booked, index, columns[:, 3])
+    np.add.at(opened, index, columns[:, 4])
+    return DemandHistory(item_ids, booked, opened)
+
+
+def fit_demand(history, half_life_weeks=HALF_LIFE_WEEKS):
+    """
+    Seasonal day-of-week x hour-of-day model: an exponentially weighted
+    average over the weeks, so recent weeks count most. Returns
+    (expected bookings, booking rate when open, share of weeks open), each
+    shaped (items, 7, 24).
+    """
+    # Weeks before the first slot was ever opened say nothing about demand
+    first_week = int(np.argmax(history.opened.sum(axis=(0, 2, 3)) > 0))
+    booked = history.booked[:, first_week:]
+    opened = history.opened[:, first_week:]
+
+    weeks = booked.shape[1]
+    weights = 0.5 ** ((weeks - 1 - np.arange(weeks)) / half_life_weeks)
+    weights /= weights.sum()
+
+    sold_out = (opened > 0) & (booked >= opened)
+    booked = np.where(sold_out, booked * SELL_OUT_UPLIFT, booked)
+    expected = np.einsum('w,iwdh->idh', weights, booked)
+    open_share = np.einsum('w,iwdh->idh', weights, (opened > 0).astype(float))
+    opened = np.einsum('w,iwdh->idh', weights, opened)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(opened > 0, expected / opened, 0.0)
+    return expected, rate, open_share
+
+
+def propose_schedule(start_date, days, headroom=DEFAULT_HEADROOM, history=None):
+    """
+    Slots to open for ``days`` days from start_date. For each weekday and
+    hour the venue has usually been open, open enough items to cover the
+    forecast bookings plus headroom, taking the items most often booked at
+    that time first. Returns a list of ProposedSlot.
+    """
+    history = history or load_history(start_date)
+    if not history.item_ids:
+        return []
+    expected, rate, open_share = fit_demand(history)
+
+    total = expected.sum(axis=0)
+    open_hours = open_share.max(axis=0) >= MIN_OPEN_SHARE
+    needed = np.where(open_hours, np.ceil(total * (1 + headroom)), 0).astype(int)
+    # Items ranked per (weekday, hour), most often booked first
+    ranking = np.argsort(-rate, axis=0, kind='stable')
+
+    active = dict(
+        BookableItem.objects.filter(id__in=history.item_ids, is_active=True).values_list('id', 'name')
+    )
+    proposal = []
+    for offset in range(days):
+        date = start_date + timedelta(days=offset)
+        weekday = date.weekday()
+        for hour in np.flatnonzero(needed[weekday]):
+            chosen = 0
+            for item_index in ranking[:, weekday, hour]:
+                item_id = history.item_ids[item_index]
+                if item_id not in active:
+                    continue
+                proposal.append(ProposedSlot(
+                    item_id, active[item_id], date, int(hour), round(float(expected[item_index, weekday, hour]), 2)
+                ))
+                chosen += 1
+                if chosen >= needed[weekday, hour]:
+                    break
+    return proposal
+
+
+def create_proposed_slots(proposal, slot_minutes=60):
+    """Create the proposed slots through the chunked slot importer."""
+    rows = (
+        {
+            'table': slot.item_name,
+            'date': slot.date.isoformat(),
+            'start_time': f'{slot.hour:02d}:00',
+            'duration': slot_minutes,
+        }
+        for slot in proposal
+    )
+    return import_slot_rows(rows, create_items=False)
+
+
+def summarize(proposal):
+    """{date: {hour: number of slots}} for showing a proposal to staff."""
+    summary = {}
+    for slot in proposal:
+        hours = summary.setdefault(slot.date.isoformat(), {})
+        hours[slot.hour] = hours.get(slot.hour, 0) + 1
+    return summary
@@ -0,0 +1,127 @@
+import uuid
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import analytics, audit, reminders
+from .models import AuditEvent, Booking, BookingTimeSlot
+from .outbox import enqueue_booking_events
+from .quotas import QuotaExceeded, check_quota
+
+MAX_GROUP_SLOTS = 12
+
+
+class GroupBookingError(Exception):
+    """A group booking that can't go ahead; nothing has been written."""
+
+    def __init__(self, message, status=400, slot_ids=None):
+        super().__init__(message)
+        self.status = status
+        self.slot_ids = slot_ids or []
+
+
+def contiguous_slot_ids(bookable_item_id, time_start, duration):
+    """
+    Ids of the slots on one item that exactly cover [time_start,
+    time_start + duration) back to back. Raises GroupBookingError if there
+    is a gap, an overlap or the run doesn't line up with the requested times.
+    """
+    time_end = time_start + duration
+    slots = list(
+        BookingTimeSlot.objects.filter(
+            bookable_item_id=bookable_item_id,
+            time_start__gte=time_start,
+            time_start__lt=time_end
+        ).order_by('time_start').values_list('id', 'time_start', 'time_length')
+    )
+    cursor = time_start
+    for slot_id, slot_start, slot_length in slots:
+        if slot_start != cursor:
+            break
+        cursor = slot_start + slot_length
+    if not slots or cursor != time_end:
+        raise GroupBookingError('No run of back-to-back slots covers that time on this item')
+    return [slot_id for slot_id, _, _ in slots]
+
+
+def book_slots(user, slot_ids, party_size=1, notes=''):
+    """
+    Book every slot in ``slot_ids`` for ``user`` or none of them. Returns
+    the created bookings, which share a ``group`` id.
+
+    Slots are locked in primary key order, so two requests for overlapping
+    sets always queue behind each other rather than deadlocking. One
+    conditional UPDATE then claims all the slots that are still available;
+    if it claims fewer than asked for, the transaction rolls back.
+    """
+    slot_ids = sorted(set(slot_ids))
+    if not slot_ids:
+        raise GroupBookingError('At least one slot is required')
+    if len(slot_ids) > MAX_GROUP_SLOTS:
+        raise GroupBookingError(f'At most {MAX_GROUP_SLOTS} slots can be booked at once')
+
+    group = uuid.uuid4()
+    with transaction.atomic():
+        # Quotas are checked before any slot is locked or claimed; each
+        # start time counts once, on whichever day it falls
+        starts = BookingTimeSlot.objects.filter(id__in=slot_ids).values_list('time_start', flat=True)
+        try:
+            check_quota(user, set(starts))
+        except QuotaExceeded as e:
+            raise GroupBookingError(str(e), status=403)
+
+        slots = list(
+            BookingTimeSlot.objects.select_for_update(of=('self',))
+            .filter(id__in=slot_ids)
+            .select_related('bookable_item')
+            .order_by('id')
+        )
+        missing = sorted(set(slot_ids) - {slot.id for slot in slots})
+        if missing:
+            raise GroupBookingError('Time slot not found', status=404, slot_ids=missing)
+
+        now = timezone.now()
+        claimed = BookingTimeSlot.objects.filter(id__in=slot_ids, status='available').update(
+            status='booked', version=F('version') + 1, updated_at=now
+        )
+        if claimed != len(slot_ids):
+            unavailable = [slot.id for slot in slots if slot.status != 'available']
+            # Raising inside atomic() rolls the partial claim back
+            raise GroupBookingError(
+                'Some of these time slots are no longer available', status=409, slot_ids=unavailable
+            )
+
+        # bulk_create skips save(), so fill in what save() would derive
+        bookings = Booking.objects.bulk_create([
+            Booking(
+                venue_id=slot.venue_id,
+                user=user,
+                time_slot=slot,
+                customer_name=user.get_full_name() or user.username,
+                customer_email=user.email,
+                party_size=party_size,
+                notes=notes,
+                group=group,
+                slot_start=slot.time_start,
+            )
+            for slot in slots
+        ])
+        for slot in slots:
+            slot.status = 'booked'
+            slot.version += 1
+        analytics.record_bookings(bookings)
+        audit.record_many(AuditEvent.BOOKED, [(slot.id, booking.id, slot.venue_id) for slot, booking in zip(slots, bookings)])
+        enqueue_booking_events('booking.confirmed', [(booking, booking.time_slot) for booking in bookings])
+
+        # bulk_create doesn't send post_save either, so schedule reminders here
+        scheduler = reminders.active_scheduler
+        if scheduler is not None:
+            reminder_times = [(booking.id, booking.time_slot.time_start) for booking in bookings]
+
+            def schedule_reminders():
+                for booking_id, time_start in reminder_times:
+                    scheduler.schedule(booking_id, time_start)
+
+            transaction.on_commit(schedule_reminders)
+    return bookings
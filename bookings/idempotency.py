@@ -0,0 +1,102 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import IdempotencyKey
+
+IDEMPOTENCY_HEADER = 'HTTP_IDEMPOTENCY_KEY'
+DEFAULT_TTL = timedelta(hours=24)
+
+
+def get_idempotency_ttl():
+    """Return how long stored responses are replayed for."""
+    return getattr(settings, 'IDEMPOTENCY_KEY_TTL', DEFAULT_TTL)
+
+
+def purge_expired_keys(now=None):
+    """Delete stored responses older than the TTL. Returns the number removed."""
+    cutoff = (now or timezone.now()) - get_idempotency_ttl()
+    deleted, _ = IdempotencyKey.objects.filter(created_at__lt=cutoff).delete()
+    return deleted
+
+
+def _replay(stored):
+    response = JsonResponse(json.loads(stored.response_body), status=stored.response_status)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def idempotent(view_func):
+    """
+    Honour an Idempotency-Key header on mutating requests.
+
+    The first request with a given key runs the view and stores its JSON
+    response. Retries with the same key and body get the stored response back
+    without touching any slot or booking rows. Reusing a key with a different
+    body is rejected with 422. Server errors are not stored so they can be
+    retried.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        key = request.META.get(IDEMPOTENCY_HEADER, '').strip()
+        if not key or request.method in ('GET', 'HEAD', 'OPTIONS') or not request.user.is_authenticated:
+            return view_func(request, *args, **kwargs)
+
+        if len(key) > 255:
+            return JsonResponse({
+                'success': False,
+                'error': 'Idempotency-Key must be 255 characters or fewer'
+            }, status=400)
+
+        endpoint = view_func.__name__
+        request_hash = hashlib.sha256(request.body).hexdigest()
+        cutoff = timezone.now() - get_idempotency_ttl()
+
+        stored = IdempotencyKey.objects.filter(
+            user=request.user,
+            endpoint=endpoint,
+            key=key,
+        ).first()
+        if stored and stored.created_at < cutoff:
+            stored.delete()
+            stored = None
+        if stored:
+            if stored.request_hash != request_hash:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'Idempotency-Key was already used with a different request'
+                }, status=422)
+            return _replay(stored)
+
+        response = view_func(request, *args, **kwargs)
+
+        if isinstance(response, JsonResponse) and response.status_code < 500:
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.create(
+                        user=request.user,
+                        endpoint=endpoint,
+                        key=key,
+                        request_hash=request_hash,
+                        response_status=response.status_code,
+                        response_body=response.content.decode(response.charset),
+                    )
+            except IntegrityError:
+                # A concurrent retry finished first; answer with its result so
+                # both callers see the same outcome.
+                stored = IdempotencyKey.objects.filter(
+                    user=request.user,
+                    endpoint=endpoint,
+                    key=key,
+                ).first()
+                if stored:
+                    return _replay(stored)
+        return response
+
+    return wrapper
@@ -0,0 +1,199 @@
+import csv
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import analytics, audit
+from .blackouts import block_new_slots
+from .catalog import get_catalog
+from .models import AuditEvent, BookableItem, BookingTimeSlot
+from .tenancy import get_venue_timezone
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+# 'booked' means a Booking exists, which an import can't create
+VALID_STATUSES = {choice for choice, _ in BookingTimeSlot.STATUS_CHOICES} - {'booked'}
+
+
+class SlotImportResult:
+    """
+    Running totals for an import. Only the first MAX_REPORTED_ERRORS row errors
+    are kept so a badly formatted file can't grow memory without bound.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': message})
+
+    def as_dict(self):
+        return {
+            'rows': self.rows,
+            'created_count': self.created,
+            'skipped_count': self.skipped,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+class BookableItemCache:
+    """
+    Name -> (id, venue id) lookup for the current venue's bookable items,
+    read from the process catalog. Unknown names are created once and
+    remembered, so large imports don't issue a query per row.
+    """
+
+    def __init__(self, create_missing=True, info='Created via slot import'):
+        self.create_missing = create_missing
+        self.info = info
+        self.catalog = get_catalog()
+        self.items = {}
+
+    def get(self, name):
+        if name not in self.items:
+            item = self.catalog.by_name.get(name)
+            if item is None:
+                if not self.create_missing:
+                    return None
+                item, _ = self.catalog.get_or_create(name, capacity=1, info=self.info, is_active=True)
+            self.items[name] = (item.id, item.venue_id)
+        return self.items[name]
+
+
+def parse_slot_row(row, item_cache):
+    """
+    Validate one row (keys: table or item, date, start_time, duration, optional
+    status) and return an unsaved BookingTimeSlot. Raises ValueError.
+    """
+    table_name = (row.get('table') or row.get('item') or '').strip()
+    date_str = (row.get('date') or '').strip()
+    start_time = (row.get('start_time') or '').strip()
+    if not all([table_name, date_str, start_time]):
+        raise ValueError('Table name, date, and start time are required')
+
+    try:
+        start_datetime = datetime.fromisoformat(f"{date_str}T{start_time}")
+    except ValueError:
+        raise ValueError('Invalid date or time format')
+
+    try:
+        duration_minutes = int(row.get('duration') or 60)
+    except (TypeError, ValueError):
+        raise ValueError('Duration must be a whole number of minutes')
+    if duration_minutes <= 0:
+        raise ValueError('Duration must be positive')
+
+    status = (row.get('status') or 'available').strip()
+    if status not in VALID_STATUSES:
+        raise ValueError(f'Unknown status "{status}"')
+
+    item = item_cache.get(table_name)
+    if item is None:
+        raise ValueError(f'Unknown bookable item "{table_name}"')
+    item_id, venue_id = item
+
+    # Times in the file are the venue's local wall clock time
+    venue_tz = get_venue_timezone(venue_id)
+    if timezone.is_naive(start_datetime):
+        start_datetime = timezone.make_aware(start_datetime, venue_tz)
+
+    # bulk_create skips save(), so venue and local time are set here
+    slot = BookingTimeSlot(
+        venue_id=venue_id,
+        bookable_item_id=item_id,
+        time_start=start_datetime,
+        time_length=timedelta(minutes=duration_minutes),
+        status=status,
+    )
+    slot.set_local_time(venue_tz)
+    return slot
+
+
+def _flush_chunk(chunk, result):
+    """
+    Insert one chunk of slots. Rows that already exist are counted as skipped,
+    and so are rows another process inserts first, which
+    bulk_create(ignore_conflicts=True) leaves alone: only the rows read back
+    that weren't there before the insert are counted, logged and added to
+    the rollups.
+    """
+    item_ids = {slot.bookable_item_id for slot in chunk}
+    matching = BookingTimeSlot.objects.filter(
+        bookable_item_id__in=item_ids,
+        time_start__in={slot.time_start for slot in chunk},
+    )
+    with transaction.atomic():
+        # Other imports of these items wait here, so nothing they insert can
+        # land between reading ``existing`` and reading the rows back
+        list(BookableItem.objects.select_for_update().filter(id__in=item_ids).values_list('id', flat=True))
+        existing = set(matching.values_list('bookable_item_id', 'time_start'))
+        new_slots = {}
+        for slot in chunk:
+            key = (slot.bookable_item_id, slot.time_start)
+            if key in existing or key in new_slots:
+                result.skipped += 1
+                continue
+            new_slots[key] = slot
+        if not new_slots:
+            return
+
+        # bulk_create doesn't call save(), so block slots in blackouts here
+        block_new_slots(new_slots.values())
+        BookingTimeSlot.objects.bulk_create(new_slots.values(), ignore_conflicts=True)
+        # ignore_conflicts means the new ids aren't returned, so read them back
+        inserted = []
+        for slot_id, item_id, time_start in matching.values_list('id', 'bookable_item_id', 'time_start'):
+            key = (item_id, time_start)
+            if key in new_slots and key not in existing:
+                slot = new_slots[key]
+                slot.id = slot_id
+                inserted.append(slot)
+        # bulk_create doesn't send post_save, so count and log the slots here
+        analytics.record_slots(inserted)
+        audit.record_many(AuditEvent.SLOT_CREATED, [(slot.id, None, slot.venue_id) for slot in inserted])
+    result.created += len(inserted)
+    result.skipped += len(new_slots) - len(inserted)
+
+
+def import_slot_rows(rows, chunk_size=IMPORT_CHUNK_SIZE, create_items=True,
+                     item_info='Created via slot import', progress=None, first_line=1):
+    """
+    Create slots from an iterable of dict rows, inserting in fixed-size
+    chunks. Rows are consumed lazily so memory use depends on chunk_size, not
+    on the number of rows. ``progress`` is called with the running result
+    after each chunk.
+    """
+    result = SlotImportResult()
+    item_cache = BookableItemCache(create_missing=create_items, info=item_info)
+    chunk = []
+    for line_number, row in enumerate(rows, start=first_line):
+        result.rows += 1
+        try:
+            chunk.append(parse_slot_row(row, item_cache))
+        except ValueError as e:
+            result.add_error(line_number, str(e))
+            continue
+        if len(chunk) >= chunk_size:
+            _flush_chunk(chunk, result)
+            chunk = []
+            if progress:
+                progress(result)
+    if chunk:
+        _flush_chunk(chunk, result)
+    if progress:
+        progress(result)
+    return result
+
+
+def import_slots_csv(text_file, **kwargs):
+    """Import slots from an open text-mode CSV file with a header row."""
+    # The header is line 1, so data rows start at line 2
+    return import_slot_rows(csv.DictReader(text_file), first_line=2, **kwargs)
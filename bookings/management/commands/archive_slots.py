@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bookings.archive import ARCHIVE_BATCH_SIZE, archive_slots_before, default_archive_cutoff
+
+
+class Command(BaseCommand):
+    help = (
+        "Move past time slots and their bookings into the archive tables "
+        "in small batches. Safe to run while the site is live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--before', default=None,
+            help="Archive slots starting before this date, YYYY-MM-DD (default: now - ARCHIVE_SLOTS_AFTER)"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+            help=f"Slots moved per transaction (default {ARCHIVE_BATCH_SIZE})"
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        if options['before']:
+            try:
+                before = datetime.strptime(options['before'], '%Y-%m-%d')
+            except ValueError:
+                raise CommandError("--before must be a date in YYYY-MM-DD format")
+            cutoff = timezone.make_aware(before)
+        else:
+            cutoff = default_archive_cutoff()
+        if cutoff > timezone.now():
+            raise CommandError("--before must not be in the future")
+
+        def report_progress(slots, bookings):
+            self.stdout.write(f"{slots} slots and {bookings} bookings archived")
+
+        slots, bookings = archive_slots_before(
+            cutoff, batch_size=options['batch_size'], progress=report_progress
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {slots} slots and {bookings} bookings starting before {cutoff:%Y-%m-%d %H:%M}"
+        ))
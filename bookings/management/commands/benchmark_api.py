@@ -0,0 +1,88 @@
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from bookings.api import COMPACT_JSON, SLOT_SERIALIZER
+from bookings.models import BookableItem, BookingTimeSlot, Venue
+from bookings.tenancy import use_venue
+
+
+def _model_instance_payload(slots):
+    return json.dumps({'success': True, 'data': [
+        {
+            'id': slot.id,
+            'item_id': slot.bookable_item_id,
+            'item_name': slot.bookable_item.name,
+            'start': slot.time_start.isoformat(),
+            'minutes': int(slot.time_length.total_seconds() // 60),
+            'status': slot.status,
+        }
+        for slot in slots.select_related('bookable_item')
+    ]})
+
+
+def _values_payload(slots, shape):
+    names, lookups, encoders = SLOT_SERIALIZER.compile('id,item_id,item_name,start,minutes,status')
+    data = [SLOT_SERIALIZER.encode(row, encoders) for row in slots.values_list(*lookups)]
+    if shape == 'rows':
+        payload = {'success': True, 'fields': list(names), 'rows': data}
+    else:
+        payload = {'success': True, 'data': [dict(zip(names, row)) for row in data]}
+    return json.dumps(payload, **COMPACT_JSON)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare payload size and serialization time of the slot API against "
+        "model instances and the HTML partial, on throwaway rows that are rolled back"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500, help="Slots to serialize (default 500)")
+        parser.add_argument('--repeat', type=int, default=5, help="Best of this many runs (default 5)")
+
+    def handle(self, *args, **options):
+        if options['rows'] < 1 or options['repeat'] < 1:
+            raise CommandError("--rows and --repeat must be at least 1")
+
+        with transaction.atomic(), use_venue(Venue.default_id()):
+            self._create_rows(options['rows'])
+            slots = BookingTimeSlot.objects.filter(bookable_item__name__startswith='Benchmark ').order_by('time_start', 'id')
+            candidates = [
+                ('HTML partial', lambda: render_to_string('available-time-slots.html', {
+                    'slots': slots.select_related('bookable_item'), 'selected_date': timezone.localdate()
+                })),
+                ('JSON, model instances', lambda: _model_instance_payload(slots)),
+                ('JSON, values() objects', lambda: _values_payload(slots, 'objects')),
+                ('JSON, values() rows', lambda: _values_payload(slots, 'rows')),
+            ]
+            self.stdout.write(f"{'':24} {'bytes':>10} {'ms':>9}")
+            for name, render in candidates:
+                best = None
+                for _ in range(options['repeat']):
+                    start = time.perf_counter()
+                    body = render()
+                    elapsed = time.perf_counter() - start
+                    best = elapsed if best is None else min(best, elapsed)
+                self.stdout.write(f"{name:24} {len(body.encode()):>10} {best * 1000:>9.2f}")
+            transaction.set_rollback(True)
+
+    def _create_rows(self, count):
+        items = [BookableItem.objects.create(name=f'Benchmark Table {number}', capacity=4) for number in range(1, 11)]
+        start = timezone.now().replace(minute=0, second=0, microsecond=0)
+        BookingTimeSlot.objects.bulk_create([
+            BookingTimeSlot(
+                bookable_item=items[number % len(items)],
+                venue_id=items[0].venue_id,
+                time_start=start + timedelta(minutes=30 * (number // len(items))),
+                time_length=timedelta(hours=1),
+                local_date=start.date(),
+                local_minute=0,
+            )
+            for number in range(count)
+        ])
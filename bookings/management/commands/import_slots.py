@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.importer import IMPORT_CHUNK_SIZE, import_slots_csv
+from bookings.models import Venue
+from bookings.tenancy import use_venue
+
+
+class Command(BaseCommand):
+    help = (
+        "Import booking time slots from a CSV file with columns "
+        "table, date, start_time, duration and optional status"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Path to the CSV file")
+        parser.add_argument(
+            '--chunk-size', type=int, default=IMPORT_CHUNK_SIZE,
+            help=f"Rows inserted per bulk_create (default {IMPORT_CHUNK_SIZE})"
+        )
+        parser.add_argument(
+            '--venue', default=None,
+            help="Slug of the venue to import into (default: the default venue)"
+        )
+        parser.add_argument(
+            '--no-create-items', action='store_true',
+            help="Reject rows for bookable items that don't already exist"
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        def report_progress(result):
+            self.stdout.write(
+                f"{result.rows} rows read, {result.created} created, "
+                f"{result.skipped} skipped, {result.error_count} errors"
+            )
+
+        if options['venue']:
+            venue_id = Venue.objects.filter(slug=options['venue']).values_list('id', flat=True).first()
+            if venue_id is None:
+                raise CommandError(f"No venue with slug '{options['venue']}'")
+        else:
+            venue_id = Venue.default_id()
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as csv_file, use_venue(venue_id):
+                result = import_slots_csv(
+                    csv_file,
+                    chunk_size=options['chunk_size'],
+                    create_items=not options['no_create_items'],
+                    progress=report_progress,
+                )
+        except OSError as e:
+            raise CommandError(f"Could not open {options['path']}: {e}")
+
+        for error in result.errors:
+            self.stderr.write(f"Line {error['line']}: {error['error']}")
+        if result.error_count > len(result.errors):
+            self.stderr.write(f"... and {result.error_count - len(result.errors)} more errors")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} slots ({result.skipped} skipped, {result.error_count} errors)"
+        ))
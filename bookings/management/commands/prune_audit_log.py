@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from bookings.audit import get_audit_retention, prune_audit_log
+
+
+class Command(BaseCommand):
+    help = "Delete audit log events older than AUDIT_RETENTION"
+
+    def handle(self, *args, **options):
+        deleted = prune_audit_log()
+        self.stdout.write(self.style.SUCCESS(
+            f"Pruned {deleted} audit events older than {get_audit_retention()}"
+        ))
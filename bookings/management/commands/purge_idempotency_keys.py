@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from bookings.idempotency import get_idempotency_ttl, purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Delete stored Idempotency-Key responses older than IDEMPOTENCY_KEY_TTL"
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS(
+            f"Purged {deleted} idempotency keys older than {get_idempotency_ttl()}"
+        ))
@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+
+from bookings.analytics import rebuild_rollups
+from bookings.models import ArchivedSlot, BookingTimeSlot
+
+
+def _parse_date(value, option):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"{option} must be a date in YYYY-MM-DD format")
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the analytics rollup tables from live and archived slots, "
+        "one week per transaction. Cancellation counts are kept."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', default=None, help="First local date, YYYY-MM-DD (default: earliest slot)")
+        parser.add_argument('--until', default=None, help="Last local date, YYYY-MM-DD (default: latest slot)")
+
+    def handle(self, *args, **options):
+        since = _parse_date(options['since'], '--since') if options['since'] else None
+        until = _parse_date(options['until'], '--until') if options['until'] else None
+        if since is None or until is None:
+            bounds = [
+                model.all_venues.aggregate(first=Min('local_date'), last=Max('local_date'))
+                for model in (BookingTimeSlot, ArchivedSlot)
+            ]
+            firsts = [bound['first'] for bound in bounds if bound['first']]
+            lasts = [bound['last'] for bound in bounds if bound['last']]
+            if not firsts:
+                self.stdout.write("No slots to roll up")
+                return
+            since = since or min(firsts)
+            until = until or max(lasts)
+        if until < since:
+            raise CommandError("--until must be on or after --since")
+
+        def report_progress(week, rows):
+            self.stdout.write(f"Week of {week}: {rows} rollup rows written so far")
+
+        rows = rebuild_rollups(since, until, progress=report_progress)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows from {since} to {until}"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.slot_status import RECONCILE_BATCH_SIZE, reconcile_slot_status
+
+
+class Command(BaseCommand):
+    help = (
+        "Make every time slot's status agree with whether it has a booking, "
+        "in small batches. Safe to run while the site is live."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=RECONCILE_BATCH_SIZE,
+            help=f"Slots checked per transaction (default {RECONCILE_BATCH_SIZE})"
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help="Count drifted slots without changing them"
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size must be at least 1")
+
+        def report_progress(scanned, marked, freed):
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {scanned} slots checked, {marked + freed} drifted so far")
+
+        scanned, marked, freed = reconcile_slot_status(
+            batch_size=options['batch_size'], dry_run=options['dry_run'], progress=report_progress
+        )
+        verb = 'Would fix' if options['dry_run'] else 'Fixed'
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {scanned} slots. {verb} {marked} slots with a booking but not marked booked "
+            f"and {freed} slots marked booked without a booking"
+        ))
@@ -0,0 +1,44 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.outbox import run_worker
+
+
+class Command(BaseCommand):
+    help = "Deliver queued booking emails and webhooks from the outbox table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help="Delivery threads (default 4)")
+        parser.add_argument('--batch-size', type=int, default=100, help="Messages claimed per batch (default 100)")
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help="Seconds to wait when the outbox is empty (default 1)"
+        )
+        parser.add_argument('--once', action='store_true', help="Process a single batch and exit")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['batch_size'] < 1:
+            raise CommandError("--threads and --batch-size must be at least 1")
+
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            self.stdout.write("Finishing current batch before exiting...")
+            stop_event.set()
+
+        if not options['once']:
+            signal.signal(signal.SIGTERM, request_stop)
+            signal.signal(signal.SIGINT, request_stop)
+            self.stdout.write(f"Outbox worker started with {options['threads']} threads")
+
+        run_worker(
+            threads=options['threads'],
+            batch_size=options['batch_size'],
+            poll_interval=options['poll_interval'],
+            once=options['once'],
+            stop_event=stop_event,
+            sleep=lambda seconds: stop_event.wait(seconds),
+        )
+        self.stdout.write(self.style.SUCCESS("Outbox worker stopped"))
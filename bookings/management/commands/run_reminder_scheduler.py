@@ -0,0 +1,33 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from bookings.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "Queue booking reminders BOOKING_REMINDER_LEAD before each booked slot starts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Queue reminders that are due now and exit")
+
+    def handle(self, *args, **options):
+        scheduler = ReminderScheduler()
+
+        if options['once']:
+            sent = scheduler.run_pending()
+            self.stdout.write(self.style.SUCCESS(f"Queued {sent} reminders"))
+            return
+
+        stop_event = threading.Event()
+
+        def request_stop(signum, frame):
+            stop_event.set()
+            scheduler.stop()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        signal.signal(signal.SIGINT, request_stop)
+        self.stdout.write(f"Reminder scheduler started, lead time {scheduler.lead}")
+        scheduler.run(stop_event)
+        self.stdout.write(self.style.SUCCESS("Reminder scheduler stopped"))
@@ -0,0 +1,77 @@
+import json
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Runs in a fresh interpreter so nothing is already imported
+STARTUP_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter() - start
+from bookings.warmup import warm_up
+timings = warm_up(database=False)
+print('STARTUP ' + json.dumps({'setup': setup, 'warm_up': timings}))
+"""
+
+
+def parse_importtime(output):
+    """
+    Parse ``python -X importtime`` output into (total self seconds,
+    {top level package: cumulative seconds}).
+    """
+    total_us = 0
+    packages = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        total_us += int(self_us)
+        # Top-level imports are the ones that aren't indented under another
+        if not name.startswith('  ', 1):
+            packages[name.strip().split('.')[0]] += int(cumulative_us)
+    return total_us / 1e6, {package: us / 1e6 for package, us in packages.items()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Report where worker startup time goes: module imports, django.setup() "
+        "and warm-up, measured in a fresh interpreter"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=15, help="Packages to list (default 15)")
+        parser.add_argument('--json', action='store_true', help="Print a JSON report for tracking over time")
+
+    def handle(self, *args, **options):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', STARTUP_SCRIPT],
+            capture_output=True, text=True
+        )
+        startup_lines = [line for line in result.stdout.splitlines() if line.startswith('STARTUP ')]
+        if result.returncode != 0 or not startup_lines:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+
+        startup = json.loads(startup_lines[-1][len('STARTUP '):])
+        import_total, packages = parse_importtime(result.stderr)
+        top = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'imports': import_total,
+                'setup': startup['setup'],
+                'warm_up': startup['warm_up'],
+                'packages': dict(top),
+            }))
+            return
+
+        self.stdout.write(f"Module imports: {import_total:.3f}s")
+        self.stdout.write(f"django.setup(): {startup['setup']:.3f}s")
+        for step, seconds in startup['warm_up'].items():
+            self.stdout.write(f"Warm-up {step}: {seconds:.3f}s")
+        self.stdout.write("Slowest top-level imports (cumulative):")
+        for package, seconds in top:
+            self.stdout.write(f"  {seconds:8.3f}s  {package}")
@@ -0,0 +1,86 @@
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
+
+from . import audit
+from .models import Venue
+from .tenancy import get_venue_timezone, reset_current_venue, set_current_venue
+
+VENUE_HOST_CACHE_TIMEOUT = 300
+VENUE_HOSTS_VERSION_KEY = 'venue-hosts-version'
+
+
+def _hosts_version():
+    return cache.get_or_set(VENUE_HOSTS_VERSION_KEY, 1, None)
+
+
+def invalidate_venue_hosts():
+    """Drop every cached host -> venue mapping by bumping the key version."""
+    try:
+        cache.incr(VENUE_HOSTS_VERSION_KEY)
+    except ValueError:
+        pass
+
+
+def resolve_venue_id(host):
+    """
+    Map a request host to a venue id: an exact custom domain match first,
+    then the first label as a venue slug (cafe.example.com -> 'cafe'), and
+    finally the default venue. Results are cached per host.
+    """
+    host = host.split(':')[0].lower().rstrip('.')
+    key = f'venue-host:{_hosts_version()}:{host}'
+    venue_id = cache.get(key)
+    if venue_id is not None:
+        return venue_id
+
+    venues = Venue.objects.filter(is_active=True)
+    venue_id = venues.filter(domain=host).values_list('id', flat=True).first()
+    if venue_id is None and host.count('.') >= 2:
+        venue_id = venues.filter(slug=host.split('.')[0]).values_list('id', flat=True).first()
+    if venue_id is None:
+        venue_id = Venue.default_id()
+    cache.set(key, venue_id, VENUE_HOST_CACHE_TIMEOUT)
+    return venue_id
+
+
+class VenueMiddleware:
+    """
+    Resolve the venue for each request and scope every venue-aware manager
+    to it for the duration of the request. The venue's timezone is activated
+    so dates are parsed and rendered in local time. Sets request.venue_id
+    and a lazy request.venue.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        venue_id = resolve_venue_id(request.get_host())
+        request.venue_id = venue_id
+        request.venue = SimpleLazyObject(lambda: Venue.objects.get(id=venue_id))
+        token = set_current_venue(venue_id)
+        timezone.activate(get_venue_timezone(venue_id))
+        try:
+            return self.get_response(request)
+        finally:
+            timezone.deactivate()
+            reset_current_venue(token)
+
+
+class AuditActorMiddleware:
+    """
+    Attribute audit log events made during the request to the requesting
+    user. Must come after AuthenticationMiddleware; request.user stays lazy,
+    so requests that change nothing never load it for this.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = audit.set_actor(request.user)
+        try:
+            return self.get_response(request)
+        finally:
+            audit.reset_actor(token)
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='bookingtimeslot',
+            name='time_start',
+            field=models.DateTimeField(db_index=True, help_text='Start time of the booking slot'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_outboxmessage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='reminder_sent_at',
+            field=models.DateTimeField(blank=True, help_text='When the pre-booking reminder was queued; set once so reminders are never repeated', null=True),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:53
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0006_booking_reminder_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='customer_email',
+            field=models.EmailField(blank=True, help_text='Contact email address', max_length=254),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='customer_name',
+            field=models.CharField(blank=True, help_text='Name of the person the booking is for (the user, or the customer a staff member booked for)', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='customer_phone',
+            field=models.CharField(blank=True, help_text='Contact phone number', max_length=50),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='party_size',
+            field=models.PositiveIntegerField(default=1, help_text='Number of people the booking is for', validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:54
+
+from django.db import migrations
+
+STAFF_NOTES_PREFIX = 'Booked by staff for:'
+BATCH_SIZE = 1000
+
+
+def backfill_customer_fields(apps, schema_editor):
+    """
+    Copy the customer name out of staff booking notes, or from the booking's
+    user, into the new customer columns.
+    """
+    Booking = apps.get_model('bookings', 'Booking')
+    bookings = Booking.objects.filter(customer_name='').select_related('user').only(
+        'id', 'notes', 'customer_name', 'customer_email', 'user__username', 'user__email'
+    ).order_by('id')
+    # Walk the table in primary key order, one batch at a time, rather than
+    # holding a cursor open over rows that are being updated
+    last_id = 0
+    while True:
+        batch = list(bookings.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for booking in batch:
+            if booking.notes.startswith(STAFF_NOTES_PREFIX):
+                booking.customer_name = booking.notes[len(STAFF_NOTES_PREFIX):].strip()
+            else:
+                booking.customer_name = booking.user.username
+                booking.customer_email = booking.user.email
+        Booking.objects.bulk_update(batch, ['customer_name', 'customer_email'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_booking_customer_fields'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_customer_fields, migrations.RunPython.noop),
+    ]
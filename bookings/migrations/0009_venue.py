@@ -0,0 +1,45 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_backfill_booking_customer_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Venue',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200)),
+                ('slug', models.SlugField(help_text="Subdomain this venue is served on (e.g. 'cafe' for cafe.example.com)", unique=True)),
+                ('domain', models.CharField(blank=True, help_text='Optional custom domain (e.g. bookings.cafe.com)', max_length=253, null=True, unique=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Venue',
+                'verbose_name_plural': 'Venues',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bookableitem',
+            name='venue',
+            field=models.ForeignKey(help_text='The venue this item belongs to', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookable_items', to='bookings.venue'),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='venue',
+            field=models.ForeignKey(help_text='Copied from the time slot so venue-scoped queries use one index', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.venue'),
+        ),
+        migrations.AddField(
+            model_name='bookingtimeslot',
+            name='venue',
+            field=models.ForeignKey(help_text='Copied from the bookable item so venue-scoped queries use one index', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='time_slots', to='bookings.venue'),
+        ),
+    ]
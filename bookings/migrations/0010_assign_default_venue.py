@@ -0,0 +1,40 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:57
+
+from django.conf import settings
+from django.db import migrations
+from django.db.models import OuterRef, Subquery
+
+
+def assign_default_venue(apps, schema_editor):
+    """
+    Put every existing item, slot and booking in the default venue, so a
+    single-tenant install keeps working unchanged. Each table is updated
+    with one set-based UPDATE.
+    """
+    Venue = apps.get_model('bookings', 'Venue')
+    BookableItem = apps.get_model('bookings', 'BookableItem')
+    BookingTimeSlot = apps.get_model('bookings', 'BookingTimeSlot')
+    Booking = apps.get_model('bookings', 'Booking')
+
+    venue, _ = Venue.objects.get_or_create(
+        slug=getattr(settings, 'DEFAULT_VENUE_SLUG', 'default'),
+        defaults={'name': 'Default Venue'}
+    )
+    BookableItem.objects.filter(venue__isnull=True).update(venue=venue)
+    BookingTimeSlot.objects.filter(venue__isnull=True).update(
+        venue_id=Subquery(BookableItem.objects.filter(id=OuterRef('bookable_item_id')).values('venue_id')[:1])
+    )
+    Booking.objects.filter(venue__isnull=True).update(
+        venue_id=Subquery(BookingTimeSlot.objects.filter(id=OuterRef('time_slot_id')).values('venue_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_venue'),
+    ]
+
+    operations = [
+        migrations.RunPython(assign_default_venue, migrations.RunPython.noop),
+    ]
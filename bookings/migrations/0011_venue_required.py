@@ -0,0 +1,41 @@
+# Generated by Django 4.2.23 on 2026-10-19 16:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_assign_default_venue'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookableitem',
+            name='venue',
+            field=models.ForeignKey(help_text='The venue this item belongs to', on_delete=django.db.models.deletion.CASCADE, related_name='bookable_items', to='bookings.venue'),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='venue',
+            field=models.ForeignKey(help_text='Copied from the time slot so venue-scoped queries use one index', on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='bookings.venue'),
+        ),
+        migrations.AlterField(
+            model_name='bookingtimeslot',
+            name='venue',
+            field=models.ForeignKey(help_text='Copied from the bookable item so venue-scoped queries use one index', on_delete=django.db.models.deletion.CASCADE, related_name='time_slots', to='bookings.venue'),
+        ),
+        migrations.AddIndex(
+            model_name='bookableitem',
+            index=models.Index(fields=['venue', 'name'], name='item_venue_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['venue', 'created_at'], name='booking_venue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingtimeslot',
+            index=models.Index(fields=['venue', 'time_start'], name='slot_venue_start_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:02
+
+import bookings.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_venue_required'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingtimeslot',
+            name='local_date',
+            field=models.DateField(editable=False, help_text="Date of time_start in the venue's timezone, kept in sync on save", null=True),
+        ),
+        migrations.AddField(
+            model_name='bookingtimeslot',
+            name='local_minute',
+            field=models.PositiveSmallIntegerField(editable=False, help_text="Minute of the day of time_start in the venue's timezone", null=True),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='timezone',
+            field=models.CharField(default=bookings.models.default_timezone, help_text='IANA timezone slots are entered and shown in (e.g. Europe/London)', max_length=64, validators=[bookings.models.validate_timezone]),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:02
+
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_slot_local_time(apps, schema_editor):
+    """Fill local_date/local_minute for existing slots from their venue's timezone."""
+    Venue = apps.get_model('bookings', 'Venue')
+    BookingTimeSlot = apps.get_model('bookings', 'BookingTimeSlot')
+
+    for venue_id, tz_name in Venue.objects.values_list('id', 'timezone'):
+        tz = ZoneInfo(tz_name or settings.TIME_ZONE)
+        slots = BookingTimeSlot.objects.filter(venue_id=venue_id, local_date__isnull=True).only(
+            'id', 'time_start'
+        ).order_by('id')
+        last_id = 0
+        while True:
+            batch = list(slots.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            for slot in batch:
+                local = slot.time_start.astimezone(tz)
+                slot.local_date = local.date()
+                slot.local_minute = local.hour * 60 + local.minute
+            BookingTimeSlot.objects.bulk_update(batch, ['local_date', 'local_minute'])
+            last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0012_venue_timezone_slot_local_time'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_slot_local_time, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_backfill_slot_local_time'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bookingtimeslot',
+            name='local_date',
+            field=models.DateField(editable=False, help_text="Date of time_start in the venue's timezone, kept in sync on save"),
+        ),
+        migrations.AlterField(
+            model_name='bookingtimeslot',
+            name='local_minute',
+            field=models.PositiveSmallIntegerField(editable=False, help_text="Minute of the day of time_start in the venue's timezone"),
+        ),
+        migrations.AddIndex(
+            model_name='bookingtimeslot',
+            index=models.Index(fields=['venue', 'local_date', 'local_minute'], name='slot_venue_local_idx'),
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:06
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0014_slot_local_time_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedSlot',
+            fields=[
+                ('id', models.BigIntegerField(help_text='The original BookingTimeSlot id', primary_key=True, serialize=False)),
+                ('item_name', models.CharField(max_length=200)),
+                ('time_start', models.DateTimeField()),
+                ('time_length', models.DurationField()),
+                ('status', models.CharField(choices=[('available', 'Available'), ('pending', 'Pending'), ('booked', 'Booked')], max_length=10)),
+                ('local_date', models.DateField()),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('bookable_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_slots', to='bookings.bookableitem')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_slots', to='bookings.venue')),
+            ],
+            options={
+                'verbose_name': 'Archived Slot',
+                'verbose_name_plural': 'Archived Slots',
+                'ordering': ['time_start'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedBooking',
+            fields=[
+                ('id', models.BigIntegerField(help_text='The original Booking id', primary_key=True, serialize=False)),
+                ('customer_name', models.CharField(blank=True, max_length=200)),
+                ('customer_phone', models.CharField(blank=True, max_length=50)),
+                ('customer_email', models.EmailField(blank=True, max_length=254)),
+                ('party_size', models.PositiveIntegerField(default=1)),
+                ('notes', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('time_slot', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='booking', to='bookings.archivedslot')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='bookings.venue')),
+            ],
+            options={
+                'verbose_name': 'Archived Booking',
+                'verbose_name_plural': 'Archived Bookings',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='archivedslot',
+            index=models.Index(fields=['venue', 'time_start'], name='archived_slot_venue_start_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0015_archive_tables'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='group',
+            field=models.UUIDField(blank=True, db_index=True, help_text='Shared by bookings made together in one multi-slot request', null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_booking_group'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookableitem',
+            name='adjacent_items',
+            field=models.ManyToManyField(blank=True, help_text='Items that can be pushed together with this one for a larger party', to='bookings.bookableitem'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0017_item_adjacency'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedslot',
+            name='local_minute',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.CreateModel(
+            name='UsageRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day'), ('week', 'Week')], max_length=4)),
+                ('date', models.DateField(help_text='The local date, or the Monday starting the week')),
+                ('hour', models.PositiveSmallIntegerField(default=0, help_text='Local hour of day for hourly rollups, else 0')),
+                ('slot_count', models.IntegerField(default=0)),
+                ('slot_minutes', models.IntegerField(default=0)),
+                ('booked_count', models.IntegerField(default=0)),
+                ('booked_minutes', models.IntegerField(default=0)),
+                ('party_total', models.IntegerField(default=0, help_text='Sum of party sizes of current bookings')),
+                ('lead_minutes_total', models.BigIntegerField(default=0, help_text='Sum of minutes between booking and slot start for current bookings')),
+                ('cancellations', models.IntegerField(default=0)),
+                ('bookable_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='bookings.bookableitem')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_rollups', to='bookings.venue')),
+            ],
+            options={
+                'verbose_name': 'Usage Rollup',
+                'verbose_name_plural': 'Usage Rollups',
+                'indexes': [models.Index(fields=['venue', 'period', 'date'], name='rollup_venue_period_date_idx')],
+                'unique_together': {('bookable_item', 'period', 'date', 'hour')},
+            },
+        ),
+    ]
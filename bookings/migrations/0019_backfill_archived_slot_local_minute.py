@@ -0,0 +1,39 @@
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_archived_local_minute(apps, schema_editor):
+    """Fill local_minute for already archived slots from their venue's timezone."""
+    Venue = apps.get_model('bookings', 'Venue')
+    ArchivedSlot = apps.get_model('bookings', 'ArchivedSlot')
+
+    for venue_id, tz_name in Venue.objects.values_list('id', 'timezone'):
+        tz = ZoneInfo(tz_name or settings.TIME_ZONE)
+        slots = ArchivedSlot.objects.filter(venue_id=venue_id, local_minute__isnull=True).only(
+            'id', 'time_start'
+        ).order_by('id')
+        last_id = 0
+        while True:
+            batch = list(slots.filter(id__gt=last_id)[:BATCH_SIZE])
+            if not batch:
+                break
+            for slot in batch:
+                local = slot.time_start.astimezone(tz)
+                slot.local_minute = local.hour * 60 + local.minute
+            ArchivedSlot.objects.bulk_update(batch, ['local_minute'])
+            last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0018_usage_rollups'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_archived_local_minute, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0019_backfill_archived_slot_local_minute'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedslot',
+            name='local_minute',
+            field=models.PositiveSmallIntegerField(),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:35
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0020_archived_slot_local_minute_required'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('party_size', models.PositiveIntegerField(default=1, help_text='Number of people the booking would be for', validators=[django.core.validators.MinValueValidator(1)])),
+                ('notes', models.TextField(blank=True, help_text='Copied onto the booking if the slot is handed over')),
+                ('priority', models.SmallIntegerField(default=0, help_text='Higher priorities are served first; equal priorities in the order they joined')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('time_slot', models.ForeignKey(help_text='The time slot being waited for', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist', to='bookings.bookingtimeslot')),
+                ('user', models.ForeignKey(help_text='The user waiting for the slot', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+                ('venue', models.ForeignKey(help_text='Copied from the time slot so venue-scoped queries use one index', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to='bookings.venue')),
+            ],
+            options={
+                'verbose_name': 'Waitlist Entry',
+                'verbose_name_plural': 'Waitlist Entries',
+                'ordering': ['-priority', 'created_at', 'id'],
+                'indexes': [models.Index(fields=['time_slot', '-priority', 'created_at', 'id'], name='waitlist_queue_idx')],
+                'unique_together': {('time_slot', 'user')},
+            },
+        ),
+    ]
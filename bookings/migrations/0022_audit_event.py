@@ -0,0 +1,31 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0021_waitlist_entry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.PositiveSmallIntegerField(choices=[(1, 'slot.created'), (2, 'slot.deleted'), (3, 'booking.created'), (4, 'booking.cancelled'), (5, 'slot.archived')])),
+                ('slot_id', models.BigIntegerField()),
+                ('booking_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_id', models.IntegerField(blank=True, help_text='Id of the user who made the change, if any', null=True)),
+                ('venue_id', models.IntegerField(blank=True, null=True)),
+                ('at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Audit Event',
+                'verbose_name_plural': 'Audit Events',
+                'ordering': ['at', 'id'],
+                'indexes': [models.Index(fields=['slot_id', 'at'], name='audit_slot_at_idx'), models.Index(fields=['at'], name='audit_at_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0022_audit_event'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingtimeslot',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, help_text='Bumped on every change, so writers can tell if the slot changed since they read it'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0023_slot_version'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='archivedslot',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('pending', 'Pending'), ('booked', 'Booked'), ('blocked', 'Blocked')], max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='auditevent',
+            name='event',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'slot.created'), (2, 'slot.deleted'), (3, 'booking.created'), (4, 'booking.cancelled'), (5, 'slot.archived'), (6, 'slot.blocked'), (7, 'slot.unblocked')]),
+        ),
+        migrations.AlterField(
+            model_name='bookingtimeslot',
+            name='status',
+            field=models.CharField(choices=[('available', 'Available'), ('pending', 'Pending'), ('booked', 'Booked'), ('blocked', 'Blocked')], default='available', help_text='Current booking status of the time slot', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='BlackoutWindow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('reason', models.CharField(blank=True, help_text="Shown to staff, e.g. 'Table repairs'", max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lifted_at', models.DateTimeField(blank=True, help_text='When the slots were put back', null=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('items', models.ManyToManyField(related_name='blackouts', to='bookings.bookableitem')),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='blackouts', to='bookings.venue')),
+            ],
+            options={
+                'verbose_name': 'Blackout Window',
+                'verbose_name_plural': 'Blackout Windows',
+                'ordering': ['-starts_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='bookingtimeslot',
+            name='blackout',
+            field=models.ForeignKey(blank=True, help_text='The maintenance window this slot falls in, until it is lifted', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='slots', to='bookings.blackoutwindow'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+from django.db import migrations
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+
+BATCH_SIZE = 1000
+
+# Deferred constraint triggers check at commit time that a slot is 'booked'
+# exactly when it has a booking, so a transaction may cancel a booking and
+# free (or hand over) its slot in either order.
+INSTALL_TRIGGERS = """
+CREATE OR REPLACE FUNCTION bookings_assert_slot_status(target bigint) RETURNS void AS $$
+DECLARE
+    current_status varchar;
+    has_booking boolean;
+BEGIN
+    SELECT status INTO current_status FROM bookings_bookingtimeslot WHERE id = target;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    has_booking := EXISTS (SELECT 1 FROM bookings_booking WHERE time_slot_id = target);
+    IF has_booking <> (current_status = 'booked') THEN
+        RAISE EXCEPTION 'time slot % is % but has % booking', target, current_status,
+            CASE WHEN has_booking THEN 'a' ELSE 'no' END
+            USING ERRCODE = 'integrity_constraint_violation';
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bookings_check_booking_slot() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM bookings_assert_slot_status(OLD.time_slot_id);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM bookings_assert_slot_status(NEW.time_slot_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION bookings_check_slot_status() RETURNS trigger AS $$
+BEGIN
+    PERFORM bookings_assert_slot_status(NEW.id);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE CONSTRAINT TRIGGER booking_slot_status_check
+    AFTER INSERT OR UPDATE OF time_slot_id OR DELETE ON bookings_booking
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE bookings_check_booking_slot();
+
+CREATE CONSTRAINT TRIGGER slot_status_check
+    AFTER INSERT OR UPDATE OF status ON bookings_bookingtimeslot
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE PROCEDURE bookings_check_slot_status();
+"""
+
+DROP_TRIGGERS = """
+DROP TRIGGER IF EXISTS slot_status_check ON bookings_bookingtimeslot;
+DROP TRIGGER IF EXISTS booking_slot_status_check ON bookings_booking;
+DROP FUNCTION IF EXISTS bookings_check_slot_status();
+DROP FUNCTION IF EXISTS bookings_check_booking_slot();
+DROP FUNCTION IF EXISTS bookings_assert_slot_status(bigint);
+"""
+
+
+def reconcile_existing_slots(apps, schema_editor):
+    """Fix slots that already disagree with their booking before the check goes live."""
+    BookingTimeSlot = apps.get_model('bookings', 'BookingTimeSlot')
+    Booking = apps.get_model('bookings', 'Booking')
+    has_booking = Exists(Booking.objects.filter(time_slot_id=OuterRef('pk')))
+
+    last_id = 0
+    while True:
+        ids = list(
+            BookingTimeSlot.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:BATCH_SIZE]
+        )
+        if not ids:
+            break
+        slots = BookingTimeSlot.objects.filter(id__gte=ids[0], id__lte=ids[-1]).alias(has_booking=has_booking)
+        slots.filter(has_booking=True).exclude(status='booked').update(status='booked', version=F('version') + 1)
+        slots.filter(has_booking=False, status='booked').update(
+            status=Case(When(blackout__isnull=False, then=Value('blocked')), default=Value('available')),
+            version=F('version') + 1
+        )
+        last_id = ids[-1]
+
+
+def install_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        # No params, so the driver leaves the % placeholders in RAISE alone
+        schema_editor.execute(INSTALL_TRIGGERS, params=None)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(DROP_TRIGGERS, params=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0024_blackout_windows'),
+    ]
+
+    operations = [
+        migrations.RunPython(reconcile_existing_slots, migrations.RunPython.noop),
+        migrations.RunPython(install_triggers, drop_triggers),
+    ]
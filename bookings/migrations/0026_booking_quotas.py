@@ -0,0 +1,42 @@
+# Generated by Django 4.2.23 on 2026-10-19 17:59
+
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def backfill_slot_start(apps, schema_editor):
+    """Copy each booking's slot start time onto it, in primary key batches."""
+    Booking = apps.get_model('bookings', 'Booking')
+    bookings = Booking.objects.filter(slot_start__isnull=True).only('id', 'time_slot__time_start').select_related(
+        'time_slot'
+    ).order_by('id')
+    last_id = 0
+    while True:
+        batch = list(bookings.filter(id__gt=last_id)[:BATCH_SIZE])
+        if not batch:
+            break
+        for booking in batch:
+            booking.slot_start = booking.time_slot.time_start
+        Booking.objects.bulk_update(batch, ['slot_start'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0025_slot_status_triggers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='slot_start',
+            field=models.DateTimeField(blank=True, editable=False, help_text="Copy of the slot's start time, so per-user quotas are an index range count", null=True),
+        ),
+        migrations.RunPython(backfill_slot_start, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'slot_start'], name='booking_user_start_idx'),
+        ),
+    ]
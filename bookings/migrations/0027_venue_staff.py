@@ -0,0 +1,39 @@
+# Generated by Django 4.2.23 on 2026-10-19 18:13
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def add_staff_to_default_venue(apps, schema_editor):
+    """
+    Put every existing staff account on the default venue, so they keep
+    the staff pages and admin they had before venues listed their staff.
+    """
+    Venue = apps.get_model('bookings', 'Venue')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+
+    staff_ids = list(User.objects.filter(is_staff=True).values_list('id', flat=True))
+    if not staff_ids:
+        return
+    venue, _ = Venue.objects.get_or_create(
+        slug=getattr(settings, 'DEFAULT_VENUE_SLUG', 'default'),
+        defaults={'name': 'Default Venue'}
+    )
+    venue.staff.add(*staff_ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0026_booking_quotas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='staff',
+            field=models.ManyToManyField(blank=True, help_text='Staff accounts that can manage this venue; superusers manage every venue', related_name='staff_venues', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(add_staff_to_default_venue, migrations.RunPython.noop),
+    ]
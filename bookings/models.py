@@ -1,12 +1,93 @@
+import zoneinfo
+
+from django.conf import settings
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
+from django.http.request import validate_host
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .tenancy import (
+    VenueScopedManager, current_venue_id, get_default_venue_slug, get_venue_timezone,
+    local_date_and_minute,
+)
+
+
+def validate_timezone(value):
+    if value not in zoneinfo.available_timezones():
+        raise ValidationError(f'"{value}" is not a known timezone')
+
+
+def default_timezone():
+    return settings.TIME_ZONE
+
+
+class Venue(models.Model):
+    """
+    A tenant of the white-label deployment (a restaurant, clinic, club...).
+    Requests are matched to a venue by domain or subdomain.
+    """
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(unique=True, help_text="Subdomain this venue is served on (e.g. 'cafe' for cafe.example.com)")
+    domain = models.CharField(
+        max_length=253,
+        unique=True,
+        null=True,
+        blank=True,
+        help_text="Optional custom domain (e.g. bookings.cafe.com)"
+    )
+    timezone = models.CharField(
+        max_length=64,
+        default=default_timezone,
+        validators=[validate_timezone],
+        help_text="IANA timezone slots are entered and shown in (e.g. Europe/London)"
+    )
+    is_active = models.BooleanField(default=True)
+    staff = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='staff_venues',
+        help_text="Staff accounts that can manage this venue; superusers manage every venue"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name = "Venue"
+        verbose_name_plural = "Venues"
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        # Django refuses requests for hosts outside ALLOWED_HOSTS before the
+        # venue is resolved, so a domain that isn't allowed would never work
+        if self.domain and not validate_host(self.domain.lower(), settings.ALLOWED_HOSTS):
+            raise ValidationError({
+                'domain': 'Add this domain to EXTRA_ALLOWED_HOSTS before giving it to a venue'
+            })
+
+    @classmethod
+    def default_id(cls):
+        """Id of the fallback venue used for single-tenant installs and unscoped writes."""
+        venue, _ = cls.objects.get_or_create(
+            slug=get_default_venue_slug(),
+            defaults={'name': 'Default Venue'}
+        )
+        return venue.id
 
 
 class BookableItem(models.Model):
     """
     Represents a resource that can be reserved (e.g., table, dentist chair, tennis court, tee time).
     """
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='bookable_items',
+        help_text="The venue this item belongs to"
+    )
     name = models.CharField(max_length=200, help_text="Name of the bookable item")
     capacity = models.PositiveIntegerField(
         default=1,
@@ -20,15 +101,31 @@ class BookableItem(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True, help_text="Whether this item is available for booking")
+    adjacent_items = models.ManyToManyField(
+        'self',
+        blank=True,
+        help_text="Items that can be pushed together with this one for a larger party"
+    )
+
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
 
     class Meta:
         ordering = ['name']
         verbose_name = "Bookable Item"
         verbose_name_plural = "Bookable Items"
+        indexes = [
+            models.Index(fields=['venue', 'name'], name='item_venue_name_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if self.venue_id is None:
+            self.venue_id = current_venue_id() or Venue.default_id()
+        super().save(*args, **kwargs)
+
 
 class BookingTimeSlot(models.Model):
     """
@@ -38,30 +135,65 @@ class BookingTimeSlot(models.Model):
         ('available', 'Available'),
         ('pending', 'Pending'),
         ('booked', 'Booked'),
+        ('blocked', 'Blocked'),
     ]
 
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='time_slots',
+        help_text="Copied from the bookable item so venue-scoped queries use one index"
+    )
     bookable_item = models.ForeignKey(
         BookableItem,
         on_delete=models.CASCADE,
         related_name='time_slots',
         help_text="The bookable item this time slot belongs to"
     )
-    time_start = models.DateTimeField(help_text="Start time of the booking slot")
+    time_start = models.DateTimeField(db_index=True, help_text="Start time of the booking slot")
     time_length = models.DurationField(help_text="Length of the time slot (e.g., 30 minutes, 1 hour)")
+    local_date = models.DateField(
+        editable=False,
+        help_text="Date of time_start in the venue's timezone, kept in sync on save"
+    )
+    local_minute = models.PositiveSmallIntegerField(
+        editable=False,
+        help_text="Minute of the day of time_start in the venue's timezone"
+    )
     status = models.CharField(
         max_length=10,
         choices=STATUS_CHOICES,
         default='available',
         help_text="Current booking status of the time slot"
     )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        help_text="Bumped on every change, so writers can tell if the slot changed since they read it"
+    )
+    blackout = models.ForeignKey(
+        'BlackoutWindow',
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='slots',
+        help_text="The maintenance window this slot falls in, until it is lifted"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
     class Meta:
         ordering = ['time_start']
         verbose_name = "Booking Time Slot"
         verbose_name_plural = "Booking Time Slots"
         unique_together = ['bookable_item', 'time_start']  # Prevent duplicate slots for same item at same time
+        indexes = [
+            models.Index(fields=['venue', 'time_start'], name='slot_venue_start_idx'),
+            models.Index(fields=['venue', 'local_date', 'local_minute'], name='slot_venue_local_idx'),
+        ]
 
     def __str__(self):
         return f"{self.bookable_item.name} - {self.time_start.strftime('%Y-%m-%d %H:%M')} ({self.get_status_display()})"
@@ -75,11 +207,103 @@ class BookingTimeSlot(models.Model):
         """Check if this time slot is available for booking."""
         return self.status == 'available'
 
+    def clean(self):
+        # 'booked' means exactly "has a booking": change it by booking or cancelling
+        has_booking = self.pk is not None and Booking.all_venues.filter(time_slot_id=self.pk).exists()
+        if self.status == 'booked' and not has_booking:
+            raise ValidationError({'status': 'A slot is booked by making a booking for it'})
+        if has_booking and self.status != 'booked':
+            raise ValidationError({'status': 'Cancel the booking to change the status of a booked slot'})
+
+    def set_local_time(self, tz=None):
+        """Recompute local_date/local_minute; bulk writers call this themselves."""
+        tz = tz or get_venue_timezone(self.venue_id)
+        self.local_date, self.local_minute = local_date_and_minute(self.time_start, tz)
+
+    def save(self, *args, **kwargs):
+        if self.venue_id is None:
+            self.venue_id = self.bookable_item.venue_id
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'time_start' in update_fields:
+            self.set_local_time()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'local_date', 'local_minute'}
+        if self._state.adding:
+            from .blackouts import block_new_slots
+
+            # Created inside a window in force: blocked, as if it had been there already
+            block_new_slots([self])
+        moved = not self._state.adding and (update_fields is None or 'time_start' in update_fields)
+        if not self._state.adding:
+            # Plain saves still bump the version so save_if_unchanged() callers notice them
+            self.version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        super().save(*args, **kwargs)
+        if moved and self.status == 'booked':
+            # Keep the booking's copy of the start time, used for quotas, in step
+            Booking.all_venues.filter(time_slot_id=self.pk).exclude(slot_start=self.time_start).update(
+                slot_start=self.time_start
+            )
+
+    def save_if_unchanged(self, **changes):
+        """
+        Compare-and-swap: write ``changes`` and bump the version in one
+        UPDATE that only matches if the row is still at the version this
+        instance was read at. Only the changed columns are written. Returns
+        False, writing nothing, if the slot was changed or deleted since.
+        Use save() for time_start, which other columns are derived from.
+        """
+        now = timezone.now()
+        updated = BookingTimeSlot.all_venues.filter(id=self.id, version=self.version).update(
+            version=models.F('version') + 1, updated_at=now, **changes
+        )
+        if not updated:
+            return False
+        for field, value in changes.items():
+            setattr(self, field, value)
+        self.version += 1
+        self.updated_at = now
+        return True
+
+
+class BlackoutWindow(models.Model):
+    """
+    Items taken out of service for a stretch of time. Their available slots
+    in the window are blocked in one UPDATE and unblocked again when the
+    window is lifted; booked slots are left alone and reported as clashes.
+    """
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='blackouts')
+    items = models.ManyToManyField(BookableItem, related_name='blackouts')
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    reason = models.CharField(max_length=200, blank=True, help_text="Shown to staff, e.g. 'Table repairs'")
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    lifted_at = models.DateTimeField(null=True, blank=True, help_text="When the slots were put back")
+
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
+    class Meta:
+        ordering = ['-starts_at']
+        verbose_name = "Blackout Window"
+        verbose_name_plural = "Blackout Windows"
+
+    def __str__(self):
+        return f"{self.reason or 'Blackout'} {self.starts_at:%Y-%m-%d %H:%M} - {self.ends_at:%Y-%m-%d %H:%M}"
+
 
 class Booking(models.Model):
     """
     Represents a confirmed booking made by a user for a specific time slot.
     """
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='bookings',
+        help_text="Copied from the time slot so venue-scoped queries use one index"
+    )
     user = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -92,21 +316,75 @@ class Booking(models.Model):
         related_name='booking',
         help_text="The time slot that was booked"
     )
+    customer_name = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Name of the person the booking is for (the user, or the customer a staff member booked for)"
+    )
+    customer_phone = models.CharField(max_length=50, blank=True, help_text="Contact phone number")
+    customer_email = models.EmailField(blank=True, help_text="Contact email address")
+    party_size = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Number of people the booking is for"
+    )
     notes = models.TextField(
         blank=True,
         help_text="Additional notes or special requests for the booking"
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    group = models.UUIDField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="Shared by bookings made together in one multi-slot request"
+    )
+    slot_start = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Copy of the slot's start time, so per-user quotas are an index range count"
+    )
+    reminder_sent_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="When the pre-booking reminder was queued; set once so reminders are never repeated"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
     class Meta:
         ordering = ['-created_at']
         verbose_name = "Booking"
         verbose_name_plural = "Bookings"
+        indexes = [
+            models.Index(fields=['venue', 'created_at'], name='booking_venue_created_idx'),
+            models.Index(fields=['user', 'slot_start'], name='booking_user_start_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.username} - {self.time_slot.bookable_item.name} on {self.time_slot.time_start.strftime('%Y-%m-%d %H:%M')}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remembered so save() can tell the booking was moved to another slot
+        instance._loaded_time_slot_id = dict(zip(field_names, values)).get('time_slot_id')
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.venue_id is None:
+            self.venue_id = self.time_slot.venue_id
+        if self.slot_start is None or self.time_slot_id != getattr(self, '_loaded_time_slot_id', None):
+            self.slot_start = self.time_slot.time_start
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'slot_start'}
+        super().save(*args, **kwargs)
+        self._loaded_time_slot_id = self.time_slot_id
+
     @property
     def bookable_item(self):
         """Get the bookable item for this booking."""
@@ -120,4 +398,285 @@ class Booking(models.Model):
     @property
     def end_time(self):
         """Get the end time for this booking."""
-        return self.time_slot.time_end
\ No newline at end of file
+        return self.time_slot.time_end
+
+class WaitlistEntry(models.Model):
+    """
+    A user waiting for a booked time slot. When the booking is cancelled the
+    slot goes straight to the first entry in the queue instead of becoming
+    available.
+    """
+    venue = models.ForeignKey(
+        Venue,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        help_text="Copied from the time slot so venue-scoped queries use one index"
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='waitlist_entries',
+        help_text="The user waiting for the slot"
+    )
+    time_slot = models.ForeignKey(
+        BookingTimeSlot,
+        on_delete=models.CASCADE,
+        related_name='waitlist',
+        help_text="The time slot being waited for"
+    )
+    party_size = models.PositiveIntegerField(
+        default=1,
+        validators=[MinValueValidator(1)],
+        help_text="Number of people the booking would be for"
+    )
+    notes = models.TextField(blank=True, help_text="Copied onto the booking if the slot is handed over")
+    priority = models.SmallIntegerField(
+        default=0,
+        help_text="Higher priorities are served first; equal priorities in the order they joined"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
+    class Meta:
+        ordering = ['-priority', 'created_at', 'id']
+        verbose_name = "Waitlist Entry"
+        verbose_name_plural = "Waitlist Entries"
+        unique_together = ['time_slot', 'user']
+        indexes = [
+            models.Index(fields=['time_slot', '-priority', 'created_at', 'id'], name='waitlist_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} waiting for {self.time_slot}"
+
+    def save(self, *args, **kwargs):
+        if self.venue_id is None:
+            self.venue_id = self.time_slot.venue_id
+        super().save(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """
+    Stores the response of a mutating request so that a retried request with the
+    same Idempotency-Key header can be answered without running the view again.
+    """
+    key = models.CharField(max_length=255, help_text="Client supplied Idempotency-Key header value")
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='idempotency_keys',
+        help_text="The user who sent the original request"
+    )
+    endpoint = models.CharField(max_length=100, help_text="Name of the view the key was used against")
+    request_hash = models.CharField(max_length=64, help_text="SHA-256 of the original request body")
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        verbose_name = "Idempotency Key"
+        verbose_name_plural = "Idempotency Keys"
+        unique_together = ['user', 'endpoint', 'key']
+
+    def __str__(self):
+        return f"{self.endpoint}:{self.key} ({self.response_status})"
+
+
+class OutboxMessage(models.Model):
+    """
+    A side effect (email, webhook) of a booking change, written in the same
+    transaction as the change and delivered later by run_outbox_worker.
+    """
+    CHANNEL_CHOICES = [
+        ('email', 'Email'),
+        ('webhook', 'Webhook'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES)
+    event = models.CharField(max_length=50, help_text="Event name, e.g. booking.confirmed")
+    payload = models.JSONField(help_text="Everything the delivery needs, captured at write time")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    available_at = models.DateTimeField(help_text="Earliest time the next delivery attempt may run")
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        verbose_name = "Outbox Message"
+        verbose_name_plural = "Outbox Messages"
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} via {self.channel} ({self.get_status_display()})"
+
+
+class ArchivedSlot(models.Model):
+    """
+    A past time slot moved out of the live BookingTimeSlot table by
+    archive_slots. Keeps the original id and a copy of the item name, so
+    reports still work if the item is later removed.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="The original BookingTimeSlot id")
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='archived_slots')
+    bookable_item = models.ForeignKey(
+        BookableItem,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='archived_slots'
+    )
+    item_name = models.CharField(max_length=200)
+    time_start = models.DateTimeField()
+    time_length = models.DurationField()
+    status = models.CharField(max_length=10, choices=BookingTimeSlot.STATUS_CHOICES)
+    local_date = models.DateField()
+    local_minute = models.PositiveSmallIntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
+    class Meta:
+        ordering = ['time_start']
+        verbose_name = "Archived Slot"
+        verbose_name_plural = "Archived Slots"
+        indexes = [
+            models.Index(fields=['venue', 'time_start'], name='archived_slot_venue_start_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_name} - {self.time_start.strftime('%Y-%m-%d %H:%M')} (archived)"
+
+    @property
+    def time_end(self):
+        return self.time_start + self.time_length
+
+
+class ArchivedBooking(models.Model):
+    """
+    A booking on an archived slot, moved together with it.
+    """
+    id = models.BigIntegerField(primary_key=True, help_text="The original Booking id")
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='archived_bookings')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    time_slot = models.OneToOneField(ArchivedSlot, on_delete=models.CASCADE, related_name='booking')
+    customer_name = models.CharField(max_length=200, blank=True)
+    customer_phone = models.CharField(max_length=50, blank=True)
+    customer_email = models.EmailField(blank=True)
+    party_size = models.PositiveIntegerField(default=1)
+    notes = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Archived Booking"
+        verbose_name_plural = "Archived Bookings"
+
+    def __str__(self):
+        return f"{self.customer_name} - {self.time_slot}"
+
+
+class UsageRollup(models.Model):
+    """
+    Pre-aggregated slot and booking counts for one bookable item over one
+    hour, day or week of venue-local time. Kept up to date as slots and
+    bookings change (see analytics.py) so reports never scan the raw tables;
+    `python manage.py rebuild_rollups` recomputes them.
+    """
+    PERIOD_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+        ('week', 'Week'),
+    ]
+
+    venue = models.ForeignKey(Venue, on_delete=models.CASCADE, related_name='usage_rollups')
+    bookable_item = models.ForeignKey(BookableItem, on_delete=models.CASCADE, related_name='usage_rollups')
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    date = models.DateField(help_text="The local date, or the Monday starting the week")
+    hour = models.PositiveSmallIntegerField(default=0, help_text="Local hour of day for hourly rollups, else 0")
+    slot_count = models.IntegerField(default=0)
+    slot_minutes = models.IntegerField(default=0)
+    booked_count = models.IntegerField(default=0)
+    booked_minutes = models.IntegerField(default=0)
+    party_total = models.IntegerField(default=0, help_text="Sum of party sizes of current bookings")
+    lead_minutes_total = models.BigIntegerField(
+        default=0,
+        help_text="Sum of minutes between booking and slot start for current bookings"
+    )
+    cancellations = models.IntegerField(default=0)
+
+    objects = VenueScopedManager()
+    all_venues = models.Manager()
+
+    class Meta:
+        unique_together = ['bookable_item', 'period', 'date', 'hour']
+        verbose_name = "Usage Rollup"
+        verbose_name_plural = "Usage Rollups"
+        indexes = [
+            models.Index(fields=['venue', 'period', 'date'], name='rollup_venue_period_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.bookable_item_id} {self.period} {self.date} {self.hour:02d}:00"
+
+
+class AuditEvent(models.Model):
+    """
+    One append-only entry in the slot and booking audit log. Rows are kept
+    narrow and hold plain ids rather than foreign keys, so they outlive the
+    slots, bookings and users they describe and never cascade. Written in
+    batches by audit.py; `python manage.py prune_audit_log` rotates out old
+    rows.
+    """
+    SLOT_CREATED = 1
+    SLOT_DELETED = 2
+    BOOKED = 3
+    CANCELLED = 4
+    ARCHIVED = 5
+    BLOCKED = 6
+    UNBLOCKED = 7
+    EVENT_CHOICES = [
+        (SLOT_CREATED, 'slot.created'),
+        (SLOT_DELETED, 'slot.deleted'),
+        (BOOKED, 'booking.created'),
+        (CANCELLED, 'booking.cancelled'),
+        (ARCHIVED, 'slot.archived'),
+        (BLOCKED, 'slot.blocked'),
+        (UNBLOCKED, 'slot.unblocked'),
+    ]
+
+    event = models.PositiveSmallIntegerField(choices=EVENT_CHOICES)
+    slot_id = models.BigIntegerField()
+    booking_id = models.BigIntegerField(null=True, blank=True)
+    actor_id = models.IntegerField(null=True, blank=True, help_text="Id of the user who made the change, if any")
+    venue_id = models.IntegerField(null=True, blank=True)
+    at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['at', 'id']
+        verbose_name = "Audit Event"
+        verbose_name_plural = "Audit Events"
+        indexes = [
+            models.Index(fields=['slot_id', 'at'], name='audit_slot_at_idx'),
+            models.Index(fields=['at'], name='audit_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_event_display()} slot {self.slot_id} at {self.at:%Y-%m-%d %H:%M:%S}"
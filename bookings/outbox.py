@@ -0,0 +1,194 @@
+import json
+import logging
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import OutboxMessage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 8
+BASE_BACKOFF_SECONDS = 30
+MAX_BACKOFF_SECONDS = 6 * 60 * 60
+# A claimed message becomes available again after this long, so a worker
+# that dies mid-delivery doesn't strand it
+CLAIM_LEASE = timedelta(minutes=5)
+WEBHOOK_TIMEOUT_SECONDS = 10
+
+
+def booking_payload(booking, time_slot=None):
+    """Snapshot what the deliveries need, so cancelled bookings can still be described."""
+    time_slot = time_slot or booking.time_slot
+    return {
+        'booking_id': booking.id,
+        'slot_id': time_slot.id,
+        'user_id': booking.user_id,
+        'username': booking.user.username,
+        'email': booking.user.email,
+        'bookable_item': time_slot.bookable_item.name,
+        'time_start': time_slot.time_start.isoformat(),
+        'time_end': time_slot.time_end.isoformat(),
+        'notes': booking.notes,
+    }
+
+
+def enqueue_booking_event(event, booking, time_slot=None, notify_user=True):
+    """
+    Queue the side effects of a booking change. Call inside the same
+    transaction.atomic() block as the change so they commit or roll back
+    together; delivery happens later in run_outbox_worker.
+    """
+    return enqueue_booking_events(event, [(booking, time_slot)], notify_user=notify_user)
+
+
+def enqueue_booking_events(event, bookings, notify_user=True):
+    """
+    enqueue_booking_event for many (booking, time_slot) pairs at once,
+    written with a single insert.
+    """
+    now = timezone.now()
+    webhook = bool(getattr(settings, 'BOOKING_WEBHOOK_URL', None))
+    messages = []
+    for booking, time_slot in bookings:
+        payload = booking_payload(booking, time_slot)
+        if notify_user and payload['email']:
+            messages.append(OutboxMessage(channel='email', event=event, payload=payload, available_at=now))
+        if webhook:
+            messages.append(OutboxMessage(channel='webhook', event=event, payload=payload, available_at=now))
+    if messages:
+        OutboxMessage.objects.bulk_create(messages)
+    return messages
+
+
+EMAIL_SUBJECTS = {
+    'booking.confirmed': 'Your booking is confirmed',
+    'booking.cancelled': 'Your booking has been cancelled',
+    'booking.reminder': 'Reminder of your upcoming booking',
+    'booking.waitlist_allocated': 'A time slot you were waiting for is now booked for you',
+}
+
+
+def deliver_email(message):
+    payload = message.payload
+    subject = EMAIL_SUBJECTS.get(message.event, message.event)
+    body = (
+        f"Hi {payload['username']},\n\n"
+        f"{subject}: {payload['bookable_item']} at {payload['time_start']}.\n"
+    )
+    send_mail(subject, body, None, [payload['email']])
+
+
+def deliver_webhook(message):
+    body = json.dumps({'event': message.event, 'data': message.payload}).encode('utf-8')
+    request = urllib.request.Request(
+        settings.BOOKING_WEBHOOK_URL,
+        data=body,
+        headers={'Content-Type': 'application/json', 'X-Booking-Event': message.event},
+        method='POST',
+    )
+    with urllib.request.urlopen(request, timeout=WEBHOOK_TIMEOUT_SECONDS) as response:
+        response.read()
+
+
+DELIVERY_HANDLERS = {
+    'email': deliver_email,
+    'webhook': deliver_webhook,
+}
+
+
+def backoff_for(attempts):
+    """Exponential backoff after the given number of failed attempts."""
+    return timedelta(seconds=min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** (attempts - 1)))
+
+
+def claim_batch(batch_size):
+    """
+    Claim up to batch_size due messages. Rows are locked with SKIP LOCKED
+    where supported so several workers can drain the table side by side, and
+    leased by pushing available_at forward.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        if messages:
+            OutboxMessage.objects.filter(id__in=[m.id for m in messages]).update(
+                available_at=now + CLAIM_LEASE
+            )
+    return messages
+
+
+def deliver(message):
+    """Run one delivery and record the outcome. Returns True on success."""
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+    attempts = message.attempts + 1
+    try:
+        DELIVERY_HANDLERS[message.channel](message)
+    except Exception as e:
+        logger.warning("Outbox message %s failed (attempt %s): %s", message.id, attempts, e)
+        OutboxMessage.objects.filter(id=message.id).update(
+            attempts=attempts,
+            status='failed' if attempts >= max_attempts else 'pending',
+            available_at=timezone.now() + backoff_for(attempts),
+            last_error=str(e)[:1000],
+        )
+        return False
+
+    OutboxMessage.objects.filter(id=message.id).update(
+        attempts=attempts,
+        status='sent',
+        sent_at=timezone.now(),
+        last_error='',
+    )
+    return True
+
+
+def _deliver_in_thread(message):
+    # Worker threads hold their own connections; drop stale or broken ones
+    # the same way Django does around each request
+    close_old_connections()
+    try:
+        return deliver(message)
+    finally:
+        close_old_connections()
+
+
+def process_batch(batch_size=100, executor=None):
+    """
+    Claim and deliver one batch. With an executor deliveries run in parallel
+    threads; without one they run inline. Returns (delivered, failed).
+    """
+    messages = claim_batch(batch_size)
+    if executor is None:
+        results = [deliver(message) for message in messages]
+    else:
+        results = list(executor.map(_deliver_in_thread, messages))
+    delivered = sum(1 for ok in results if ok)
+    return delivered, len(results) - delivered
+
+
+def run_worker(threads=4, batch_size=100, poll_interval=1.0, once=False, stop_event=None, sleep=None):
+    """
+    Drain the outbox until stopped. Sleeps for poll_interval only when a
+    batch comes back empty, so a backlog is worked through without pauses.
+    """
+    sleep = sleep or time.sleep
+    with ThreadPoolExecutor(max_workers=threads, thread_name_prefix='outbox') as executor:
+        while True:
+            delivered, failed = process_batch(batch_size, executor)
+            if delivered or failed:
+                logger.info("Outbox batch: %s delivered, %s failed", delivered, failed)
+            if once or (stop_event is not None and stop_event.is_set()):
+                return
+            if not (delivered or failed):
+                sleep(poll_interval)
@@ -0,0 +1,228 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import random
+import re
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE'
+DEFAULT_CAPTURE_LIMIT = 50
+DEFAULT_SLOW_REQUEST_MS = 1000
+DEFAULT_SLOW_SAMPLE_RATE = 0.0
+MAX_SQL_STATEMENTS = 500
+PROFILE_STATS_LINES = 40
+CAPTURE_ID_RE = re.compile(r'^\d{20}-[0-9a-f]{8}$')
+
+# cProfile can only have one active profiler per interpreter on Python 3.12+,
+# so concurrent captures fall back to recording SQL only
+_profiler_lock = threading.Lock()
+
+
+def get_capture_dir():
+    return getattr(settings, 'PROFILE_CAPTURE_DIR', None) or os.path.join(tempfile.gettempdir(), 'booking-profiles')
+
+
+def get_capture_limit():
+    return getattr(settings, 'PROFILE_CAPTURE_LIMIT', DEFAULT_CAPTURE_LIMIT)
+
+
+def get_slow_request_ms():
+    return getattr(settings, 'PROFILE_SLOW_REQUEST_MS', DEFAULT_SLOW_REQUEST_MS)
+
+
+def get_slow_sample_rate():
+    return getattr(settings, 'PROFILE_SLOW_SAMPLE_RATE', DEFAULT_SLOW_SAMPLE_RATE)
+
+
+class SQLRecorder:
+    """Database execute wrapper that records every statement and its duration."""
+
+    def __init__(self):
+        self.queries = []
+        self.count = 0
+        self.total_ms = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.total_ms += duration_ms
+            if len(self.queries) < MAX_SQL_STATEMENTS:
+                self.queries.append({
+                    'alias': context['connection'].alias,
+                    'sql': sql,
+                    'ms': round(duration_ms, 3),
+                    'many': many,
+                })
+
+
+def _capture_path(capture_id, extension):
+    return os.path.join(get_capture_dir(), f'{capture_id}.{extension}')
+
+
+def _stats_text(profiler):
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(PROFILE_STATS_LINES)
+    return output.getvalue()
+
+
+def _trim_captures(capture_dir, limit):
+    """Delete the oldest captures so the directory works as a ring buffer."""
+    capture_ids = sorted(
+        name[:-len('.json')] for name in os.listdir(capture_dir) if name.endswith('.json')
+    )
+    for capture_id in capture_ids[:max(len(capture_ids) - limit, 0)]:
+        for extension in ('json', 'prof'):
+            try:
+                os.remove(_capture_path(capture_id, extension))
+            except FileNotFoundError:
+                pass
+
+
+def save_capture(request, response, duration_ms, profiler, recorder, reason):
+    """
+    Write a capture's profile and SQL log to the capture directory and
+    return its id. Ids sort by creation time.
+    """
+    capture_dir = get_capture_dir()
+    os.makedirs(capture_dir, exist_ok=True)
+    now = timezone.now()
+    capture_id = f"{now.strftime('%Y%m%d%H%M%S%f')}-{uuid.uuid4().hex[:8]}"
+
+    if profiler is not None:
+        profiler.dump_stats(_capture_path(capture_id, 'prof'))
+    user = getattr(request, 'user', None)
+    capture = {
+        'id': capture_id,
+        'created_at': now.isoformat(),
+        'reason': reason,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'host': request.get_host(),
+        'status': response.status_code,
+        'duration_ms': round(duration_ms, 3),
+        'user': user.get_username() if user is not None and user.is_authenticated else '',
+        'sql_count': recorder.count,
+        'sql_ms': round(recorder.total_ms, 3),
+        'queries': recorder.queries,
+        'has_profile': profiler is not None,
+        'stats': _stats_text(profiler) if profiler is not None else '',
+    }
+    # The .json file marks a capture as complete, so write it last and atomically
+    temp_path = _capture_path(capture_id, 'json.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as capture_file:
+        json.dump(capture, capture_file)
+    os.replace(temp_path, _capture_path(capture_id, 'json'))
+
+    _trim_captures(capture_dir, get_capture_limit())
+    return capture_id
+
+
+def load_capture(capture_id):
+    """Return a stored capture, or None if the id is malformed or gone."""
+    if not CAPTURE_ID_RE.match(capture_id):
+        return None
+    try:
+        with open(_capture_path(capture_id, 'json'), encoding='utf-8') as capture_file:
+            return json.load(capture_file)
+    except FileNotFoundError:
+        return None
+
+
+def capture_profile_path(capture_id):
+    """Path of a capture's binary pstats file, or None if there isn't one."""
+    if not CAPTURE_ID_RE.match(capture_id):
+        return None
+    path = _capture_path(capture_id, 'prof')
+    return path if os.path.exists(path) else None
+
+
+def list_captures():
+    """Stored captures, newest first, without their SQL log and stats."""
+    capture_dir = get_capture_dir()
+    if not os.path.isdir(capture_dir):
+        return []
+    capture_ids = sorted(
+        (name[:-len('.json')] for name in os.listdir(capture_dir) if name.endswith('.json')),
+        reverse=True
+    )
+    captures = []
+    for capture_id in capture_ids:
+        capture = load_capture(capture_id)
+        if capture is not None:
+            capture.pop('queries', None)
+            capture.pop('stats', None)
+            captures.append(capture)
+    return captures
+
+
+class ProfilingMiddleware:
+    """
+    Run a request under cProfile with every SQL statement recorded.
+
+    Superusers opt in per request with ?_profile=1 or an ``X-Profile: 1``
+    header; the response then carries an ``X-Profile-Id`` header naming the
+    capture. Captures hold every venue's requests, so only superusers can
+    take or browse them.
+    In addition, PROFILE_SLOW_SAMPLE_RATE of all requests are profiled and
+    kept if they take longer than PROFILE_SLOW_REQUEST_MS.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if self._requested(request):
+            return self._profile(request, reason='requested')
+        sample_rate = get_slow_sample_rate()
+        if sample_rate and random.random() < sample_rate:
+            return self._profile(request, reason='slow')
+        return self.get_response(request)
+
+    def _requested(self, request):
+        flag = request.GET.get(PROFILE_QUERY_PARAM) or request.META.get(PROFILE_HEADER)
+        if flag not in ('1', 'true'):
+            return False
+        user = getattr(request, 'user', None)
+        return user is not None and user.is_superuser
+
+    def _profile(self, request, reason):
+        recorder = SQLRecorder()
+        profiler = cProfile.Profile() if _profiler_lock.acquire(blocking=False) else None
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(recorder))
+                if profiler is not None:
+                    profiler.enable()
+                try:
+                    response = self.get_response(request)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            if profiler is not None:
+                _profiler_lock.release()
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        if reason == 'requested' or duration_ms >= get_slow_request_ms():
+            capture_id = save_capture(request, response, duration_ms, profiler, recorder, reason)
+            if reason == 'requested':
+                response['X-Profile-Id'] = capture_id
+        return response
@@ -0,0 +1,105 @@
+from collections import Counter
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import CharField, Count, Q
+from django.db.models.functions import Cast, Concat
+from django.utils import timezone
+
+from .models import Booking
+from .tenancy import current_venue_id, get_venue_timezone
+
+DEFAULT_BOOKING_QUOTAS = {
+    # Most bookings one user may hold starting on one day, in one week
+    # (Monday to Sunday, venue time), and not yet started. Each start time of
+    # a group booking counts: one party on combined tables is one booking, a
+    # run of back-to-back slots is one per slot. None for no limit.
+    'per_day': 4,
+    'per_week': 10,
+    'active': 20,
+}
+
+QUOTA_MESSAGES = {
+    'per_day': 'You can hold at most {limit} bookings on one day',
+    'per_week': 'You can hold at most {limit} bookings in one week',
+    'active': 'You can hold at most {limit} upcoming bookings',
+}
+
+
+class QuotaExceeded(Exception):
+    """The user already holds as many bookings as a quota allows; nothing has been written."""
+
+    def __init__(self, quota, limit):
+        super().__init__(QUOTA_MESSAGES[quota].format(limit=limit))
+        self.quota = quota
+        self.limit = limit
+
+
+def get_quotas():
+    quotas = getattr(settings, 'BOOKING_QUOTAS', DEFAULT_BOOKING_QUOTAS)
+    return {name: quotas.get(name, default) for name, default in DEFAULT_BOOKING_QUOTAS.items()}
+
+
+def _bookings(window):
+    # A group's slots starting together (one party on combined tables)
+    # count once; every other slot counts
+    group_start = Concat(Cast('group', CharField()), Cast('slot_start', CharField()))
+    return (
+        Count('id', filter=window & Q(group__isnull=True))
+        + Count(group_start, filter=window & Q(group__isnull=False), distinct=True)
+    )
+
+
+def _day_start(day, tz):
+    return timezone.make_aware(datetime.combine(day, time()), tz)
+
+
+def check_quota(user, slot_starts, lock_user=True):
+    """
+    Raise QuotaExceeded if ``user`` can't take one more booking for each
+    of ``slot_starts``, against each day and week it falls in. Pass a group
+    booking's distinct start times: its slots starting together are one
+    booking, as they are counted here. Call inside the booking
+    transaction, before any slot is locked or claimed: the user's row is
+    locked so their concurrent requests are counted one after another.
+    Callers already holding a slot lock pass lock_user=False, so locks are
+    never taken in the opposite order. Every quota is counted in one query
+    over the (user, slot_start) index. Staff are not limited.
+    """
+    quotas = {name: limit for name, limit in get_quotas().items() if limit is not None}
+    slot_starts = list(slot_starts)
+    if not quotas or not slot_starts or user.is_staff:
+        return
+
+    if lock_user:
+        User.objects.select_for_update().filter(id=user.id).first()
+
+    now = timezone.now()
+    # Days and weeks are the venue's, as for the slots' local_date
+    tz = get_venue_timezone(current_venue_id())
+    days = Counter(start.astimezone(tz).date() for start in slot_starts)
+    weeks = Counter()
+    for day, new in days.items():
+        weeks[day - timedelta(days=day.weekday())] += new
+    # (quota, bookings already held in the window, bookings being added)
+    checks = []
+    for name in quotas:
+        if name == 'per_day':
+            for day, new in days.items():
+                day_start, day_end = _day_start(day, tz), _day_start(day + timedelta(days=1), tz)
+                checks.append((name, Q(slot_start__gte=day_start, slot_start__lt=day_end), new))
+        elif name == 'per_week':
+            for monday, new in weeks.items():
+                week_start, week_end = _day_start(monday, tz), _day_start(monday + timedelta(days=7), tz)
+                checks.append((name, Q(slot_start__gte=week_start, slot_start__lt=week_end), new))
+        else:
+            checks.append((name, Q(slot_start__gte=now), sum(start >= now for start in slot_starts)))
+
+    since = min(now, _day_start(min(weeks), tz))
+    counts = Booking.objects.filter(user=user, slot_start__gte=since).aggregate(**{
+        f'check_{i}': _bookings(window) for i, (_, window, _) in enumerate(checks)
+    })
+    for i, (name, _, new) in enumerate(checks):
+        if new and counts[f'check_{i}'] + new > quotas[name]:
+            raise QuotaExceeded(name, quotas[name])
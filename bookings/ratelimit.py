@@ -0,0 +1,152 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+from .caching import is_shared
+from .tenancy import venue_cache_key
+
+DEFAULT_RATE_LIMITS = {
+    # scope: (tokens added per second, bucket size)
+    'book': {'rate': 0.5, 'burst': 10},
+    'availability': {'rate': 5, 'burst': 60},
+    'api': {'rate': 10, 'burst': 120},
+}
+DEFAULT_CONCURRENCY_LIMIT = 50
+# Counters expire once no write has started for this long, so a worker
+# killed mid-request can't leak a slot forever
+CONCURRENCY_KEY_TIMEOUT = 60
+
+
+def _cache_alias():
+    return getattr(settings, 'RATE_LIMIT_CACHE', 'default')
+
+
+def _cache():
+    return caches[_cache_alias()]
+
+
+def _enabled():
+    return getattr(settings, 'RATE_LIMIT_ENABLED', True)
+
+
+def _scope_config(scope):
+    limits = getattr(settings, 'RATE_LIMITS', DEFAULT_RATE_LIMITS)
+    return limits.get(scope) or DEFAULT_RATE_LIMITS[scope]
+
+
+def client_ip(request):
+    """
+    Client address for per-IP buckets. Behind a proxy that appends to
+    X-Forwarded-For (e.g. the Heroku router) set RATE_LIMIT_TRUST_FORWARDED_FOR
+    so the last hop is used rather than a client-supplied value.
+    """
+    if getattr(settings, 'RATE_LIMIT_TRUST_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR', '')
+        if forwarded:
+            return forwarded.split(',')[-1].strip()
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+def take_token(key, rate, burst, now=None):
+    """
+    Try to take one token from the bucket stored under ``key``.
+
+    Returns 0 if the request is admitted, otherwise the number of seconds
+    until a token will be available. Buckets live in the shared cache as
+    (tokens, last_refill) so every worker sees the same state; the read and
+    write aren't atomic, so bursts across workers can over-admit slightly.
+    """
+    cache = _cache()
+    now = time.time() if now is None else now
+    tokens, last_refill = cache.get(key) or (burst, now)
+    tokens = min(burst, tokens + (now - last_refill) * rate)
+    timeout = math.ceil(burst / rate) + 1
+    if tokens >= 1:
+        cache.set(key, (tokens - 1, now), timeout)
+        return 0
+    cache.set(key, (tokens, now), timeout)
+    return (1 - tokens) / rate
+
+
+def _too_many_requests(retry_after, error='Too many requests, please try again shortly'):
+    response = JsonResponse({'success': False, 'error': error}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def rate_limit(scope):
+    """
+    Token bucket rate limit per client IP and, when logged in, per user,
+    kept separately for each venue. The IP bucket is checked first so
+    anonymous floods are shed before the session is loaded. Rates come from
+    settings.RATE_LIMITS[scope].
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _enabled():
+                return view_func(request, *args, **kwargs)
+
+            config = _scope_config(scope)
+            rate, burst = config['rate'], config['burst']
+
+            wait = take_token(venue_cache_key(f'ratelimit:{scope}:ip:{client_ip(request)}'), rate, burst)
+            if not wait and request.user.is_authenticated:
+                wait = take_token(venue_cache_key(f'ratelimit:{scope}:user:{request.user.pk}'), rate, burst)
+            if wait:
+                return _too_many_requests(wait)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def concurrency_limit(scope='booking_writes'):
+    """
+    Cap how many mutating requests for ``scope`` run at once across all
+    workers and venues (settings.BOOKING_WRITE_CONCURRENCY): the cap protects
+    the one shared database, so it isn't kept per venue. Excess requests are
+    shed with 429 instead of queueing on database locks. Safe methods pass
+    through, and so does everything when the cache is per process, where
+    the count would only cover one worker.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _enabled() or request.method in ('GET', 'HEAD', 'OPTIONS') or not is_shared(_cache_alias()):
+                return view_func(request, *args, **kwargs)
+
+            cache = _cache()
+            key = f'concurrency:{scope}'
+            limit = getattr(settings, 'BOOKING_WRITE_CONCURRENCY', DEFAULT_CONCURRENCY_LIMIT)
+            cache.add(key, 0, CONCURRENCY_KEY_TIMEOUT)
+            try:
+                in_flight = cache.incr(key)
+            except ValueError:
+                # Key expired between add() and incr()
+                cache.add(key, 1, CONCURRENCY_KEY_TIMEOUT)
+                in_flight = 1
+            # incr() keeps the old expiry: push it back while writes keep coming
+            cache.touch(key, CONCURRENCY_KEY_TIMEOUT)
+
+            try:
+                if in_flight > limit:
+                    return _too_many_requests(1, 'The booking service is busy, please try again shortly')
+                return view_func(request, *args, **kwargs)
+            finally:
+                try:
+                    remaining = cache.decr(key)
+                except ValueError:
+                    remaining = 0
+                if remaining < 0:
+                    # The key expired and was re-created while this request
+                    # ran: put it back to 0 so it can't lift the cap
+                    try:
+                        cache.incr(key, -remaining)
+                    except ValueError:
+                        pass
+        return wrapper
+    return decorator
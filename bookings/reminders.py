@@ -0,0 +1,236 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Booking
+from .outbox import enqueue_booking_event
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REMINDER_LEAD = timedelta(hours=24)
+# How far ahead of "now" due reminders are held in memory. Anything due
+# later is picked up by the next window load.
+DEFAULT_WINDOW = timedelta(minutes=30)
+# How often the scheduler picks up bookings made or cancelled by other
+# processes (the web workers), in seconds
+DEFAULT_REMINDER_SYNC_SECONDS = 5
+# created_at/updated_at are set before the write commits, so each sync looks
+# back this far to catch bookings whose transaction was still open at the
+# last one
+SYNC_OVERLAP = timedelta(minutes=1)
+
+# The scheduler running in this process, if any, so booking signals can
+# update it without waiting for the next sync.
+active_scheduler = None
+
+
+def get_reminder_lead():
+    return getattr(settings, 'BOOKING_REMINDER_LEAD', DEFAULT_REMINDER_LEAD)
+
+
+def get_sync_seconds():
+    return getattr(settings, 'REMINDER_SYNC_SECONDS', DEFAULT_REMINDER_SYNC_SECONDS)
+
+
+class ReminderScheduler:
+    """
+    Sends a reminder ``lead`` before each booking's time slot starts.
+
+    Only bookings due within the next ``window`` are loaded, with a range
+    query on the indexed time_start column, and kept in a min-heap keyed on
+    due time. The run loop sleeps until the earliest due reminder or the end
+    of the window, whichever is sooner. New, moved and cancelled bookings are
+    applied incrementally: through schedule() and cancel() from signals in
+    this process, and by sync_changes() every ``sync_seconds`` for bookings
+    changed in other processes. dispatch() checks the slot's start again
+    before sending, in case a move was missed.
+
+    A reminder is claimed by setting Booking.reminder_sent_at with a
+    conditional UPDATE in the same transaction that queues the outbox
+    message, so a restarted or duplicate scheduler never sends twice.
+    """
+
+    def __init__(self, lead=None, window=None, clock=None, sync_seconds=None):
+        self.lead = lead or get_reminder_lead()
+        self.window = window or DEFAULT_WINDOW
+        self.clock = clock or timezone.now
+        self.sync_seconds = get_sync_seconds() if sync_seconds is None else sync_seconds
+        self._heap = []
+        # booking id -> due time; heap entries that don't match are stale
+        self._due = {}
+        self._loaded_until = None
+        # Wall clock time of the last sync, compared with created_at, and
+        # monotonic time of the next one
+        self._synced_at = None
+        self._next_sync = 0.0
+        self._condition = threading.Condition()
+
+    def __len__(self):
+        return len(self._due)
+
+    def _push(self, booking_id, time_start, now):
+        due_at = max(time_start - self.lead, now)
+        self._due[booking_id] = due_at
+        heapq.heappush(self._heap, (due_at, booking_id))
+
+    def load_window(self):
+        """Load reminders due between now and the end of the next window."""
+        now = self.clock()
+        horizon = now + self.window
+        synced_at = timezone.now()
+        rows = Booking.objects.filter(
+            reminder_sent_at__isnull=True,
+            time_slot__time_start__gt=now,
+            time_slot__time_start__lt=horizon + self.lead,
+        ).values_list('id', 'time_slot__time_start')
+        with self._condition:
+            for booking_id, time_start in rows:
+                self._push(booking_id, time_start, now)
+            self._loaded_until = horizon
+            self._synced_at = synced_at
+            self._next_sync = time.monotonic() + self.sync_seconds
+            self._condition.notify()
+
+    def sync_changes(self):
+        """
+        Apply bookings made, moved or cancelled by other processes since the
+        last load or sync: new and moved ones are those in the window whose
+        booking or slot was written since, and are (re)scheduled at their
+        slot's current start; cancelled ones are found by checking the held
+        ids, at most one window's worth, still exist.
+        """
+        now = self.clock()
+        synced_at = timezone.now()
+        with self._condition:
+            held = set(self._due)
+        since = self._synced_at - SYNC_OVERLAP
+        rows = Booking.objects.filter(
+            Q(created_at__gte=since) | Q(updated_at__gte=since) | Q(time_slot__updated_at__gte=since),
+            reminder_sent_at__isnull=True,
+            time_slot__time_start__gt=now,
+            time_slot__time_start__lt=self._loaded_until + self.lead,
+        ).values_list('id', 'time_slot__time_start')
+        existing = set(Booking.objects.filter(id__in=held).values_list('id', flat=True)) if held else set()
+        with self._condition:
+            for booking_id in held - existing:
+                self._due.pop(booking_id, None)
+            for booking_id, time_start in rows:
+                if self._due.get(booking_id) != max(time_start - self.lead, now):
+                    self._push(booking_id, time_start, now)
+            self._synced_at = synced_at
+            self._next_sync = time.monotonic() + self.sync_seconds
+            self._condition.notify()
+
+    def schedule(self, booking_id, time_start):
+        """Add a booking made after the window was loaded."""
+        now = self.clock()
+        with self._condition:
+            if self._loaded_until is None or time_start <= now:
+                return
+            if time_start - self.lead < self._loaded_until:
+                self._push(booking_id, time_start, now)
+                self._condition.notify()
+
+    def cancel(self, booking_id):
+        """Forget a booking's reminder; its heap entry is skipped when reached."""
+        with self._condition:
+            if self._due.pop(booking_id, None) is not None:
+                self._condition.notify()
+
+    def _discard_stale(self):
+        while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def pop_due(self):
+        """Remove and return the ids of every reminder due now."""
+        now = self.clock()
+        due = []
+        with self._condition:
+            self._discard_stale()
+            while self._heap and self._heap[0][0] <= now:
+                _, booking_id = heapq.heappop(self._heap)
+                del self._due[booking_id]
+                due.append(booking_id)
+                self._discard_stale()
+        return due
+
+    def seconds_until_next(self):
+        """Seconds until the next reminder is due or the window needs reloading."""
+        now = self.clock()
+        with self._condition:
+            self._discard_stale()
+            wake_at = self._loaded_until or now
+            if self._heap:
+                wake_at = min(wake_at, self._heap[0][0])
+        return max(0.0, (wake_at - now).total_seconds())
+
+    def dispatch(self, booking_id):
+        """
+        Queue the reminder for one booking. Returns False if already sent or
+        cancelled, or if its slot has moved: to the past, or far enough ahead
+        that the reminder isn't due yet, in which case it is rescheduled.
+        """
+        with transaction.atomic():
+            booking = (
+                Booking.objects.select_related('user', 'time_slot__bookable_item')
+                .filter(id=booking_id, reminder_sent_at__isnull=True)
+                .first()
+            )
+            if booking is None:
+                return False
+            time_start = booking.time_slot.time_start
+            now = self.clock()
+            if time_start <= now:
+                return False
+            if time_start - self.lead > now:
+                self.schedule(booking_id, time_start)
+                return False
+            claimed = Booking.objects.filter(
+                id=booking_id,
+                reminder_sent_at__isnull=True,
+            ).update(reminder_sent_at=timezone.now())
+            if not claimed:
+                return False
+            enqueue_booking_event('booking.reminder', booking)
+        return True
+
+    def run_pending(self):
+        """
+        Reload the window if it has passed, or sync if one is due, and
+        dispatch everything due. Returns the number sent.
+        """
+        if self._loaded_until is None or self.clock() >= self._loaded_until:
+            self.load_window()
+        elif time.monotonic() >= self._next_sync:
+            self.sync_changes()
+        sent = 0
+        for booking_id in self.pop_due():
+            if self.dispatch(booking_id):
+                sent += 1
+        return sent
+
+    def run(self, stop_event):
+        """Dispatch reminders until stop_event is set, sleeping exactly until the next one is due."""
+        global active_scheduler
+        active_scheduler = self
+        try:
+            while not stop_event.is_set():
+                sent = self.run_pending()
+                if sent:
+                    logger.info("Queued %s booking reminders", sent)
+                with self._condition:
+                    until_sync = max(0.0, self._next_sync - time.monotonic())
+                    self._condition.wait(min(self.seconds_until_next(), until_sync))
+        finally:
+            active_scheduler = None
+
+    def stop(self):
+        with self._condition:
+            self._condition.notify()
@@ -0,0 +1,111 @@
+from django.db import transaction
+from django.core.signals import request_finished
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import analytics, audit, reminders
+from .catalog import invalidate_catalog
+from .middleware import invalidate_venue_hosts
+from .models import AuditEvent, BookableItem, Booking, BookingTimeSlot, Venue
+from .slot_status import free_slots
+from .tenancy import clear_venue_timezones
+
+
+@receiver(post_save, sender=Booking)
+def schedule_booking_reminder(sender, instance, created, **kwargs):
+    scheduler = reminders.active_scheduler
+    if created and scheduler is not None:
+        time_start = instance.time_slot.time_start
+        transaction.on_commit(lambda: scheduler.schedule(instance.id, time_start))
+
+
+@receiver(post_delete, sender=Booking)
+def cancel_booking_reminder(sender, instance, **kwargs):
+    scheduler = reminders.active_scheduler
+    if scheduler is not None:
+        booking_id = instance.id
+        transaction.on_commit(lambda: scheduler.cancel(booking_id))
+
+
+@receiver(post_save, sender=Booking)
+def count_booking(sender, instance, created, **kwargs):
+    if created:
+        analytics.record_bookings([instance])
+
+
+@receiver(post_delete, sender=Booking)
+def uncount_booking(sender, instance, **kwargs):
+    # Cancelled bookings are deleted, directly or with their slot or user,
+    # so this is the one place every cancellation passes through
+    analytics.record_cancellations([instance])
+
+
+@receiver(pre_save, sender=BookingTimeSlot)
+def remember_slot_buckets(sender, instance, update_fields=None, **kwargs):
+    if instance._state.adding:
+        return
+    if update_fields is not None and not {'time_start', 'time_length', 'bookable_item'} & set(update_fields):
+        return
+    instance._counted_in = (
+        BookingTimeSlot.all_venues.filter(pk=instance.pk).values(*analytics.SLOT_BUCKET_FIELDS).first()
+    )
+
+
+@receiver(post_save, sender=BookingTimeSlot)
+def count_slot(sender, instance, created, **kwargs):
+    if created:
+        analytics.record_slots([instance])
+        return
+    before = instance.__dict__.pop('_counted_in', None)
+    if before is not None:
+        analytics.record_slot_move(instance, before)
+
+
+@receiver(post_delete, sender=BookingTimeSlot)
+def uncount_slot(sender, instance, **kwargs):
+    analytics.record_slots([instance], sign=-1)
+
+
+@receiver(post_save, sender=Booking)
+def log_booking(sender, instance, created, **kwargs):
+    if created:
+        audit.record(AuditEvent.BOOKED, instance.time_slot_id, instance.id, instance.venue_id)
+
+
+@receiver(post_delete, sender=Booking)
+def log_cancellation(sender, instance, **kwargs):
+    audit.record(AuditEvent.CANCELLED, instance.time_slot_id, instance.id, instance.venue_id)
+
+
+@receiver(post_save, sender=BookingTimeSlot)
+def log_slot(sender, instance, created, **kwargs):
+    if created:
+        audit.record(AuditEvent.SLOT_CREATED, instance.id, venue_id=instance.venue_id)
+
+
+@receiver(post_delete, sender=BookingTimeSlot)
+def log_slot_deletion(sender, instance, **kwargs):
+    audit.record(AuditEvent.SLOT_DELETED, instance.id, venue_id=instance.venue_id)
+
+
+@receiver(pre_delete, sender=User)
+def free_deleted_users_slots(sender, instance, **kwargs):
+    # Their bookings are deleted with them, so their slots must stop being booked
+    free_slots(BookingTimeSlot.all_venues.filter(booking__user=instance))
+
+
+@receiver(request_finished)
+def flush_audit_log(sender, **kwargs):
+    audit.buffer.flush_if_stale()
+
+
+@receiver([post_save, post_delete], sender=Venue)
+def venue_changed(sender, **kwargs):
+    invalidate_venue_hosts()
+    clear_venue_timezones()
+
+
+@receiver([post_save, post_delete], sender=BookableItem)
+def bookable_item_changed(sender, **kwargs):
+    invalidate_catalog()
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+
+from .models import Booking, BookingTimeSlot
+
+RECONCILE_BATCH_SIZE = 1000
+
+# A slot is 'booked' exactly when a Booking row exists for it. On PostgreSQL
+# the constraint triggers installed by migration 0025 enforce this at commit;
+# elsewhere reconcile_slots repairs any drift.
+
+
+def _has_booking():
+    return Exists(Booking.all_venues.filter(time_slot_id=OuterRef('pk')))
+
+
+def free_slots(slots):
+    """
+    Mark ``slots`` as no longer booked with one UPDATE: available again, or
+    blocked if they fall in a blackout. Returns the number updated.
+    """
+    return slots.update(
+        status=Case(When(blackout__isnull=False, then=Value('blocked')), default=Value('available')),
+        version=F('version') + 1
+    )
+
+
+def _reconcile_batch(slots, dry_run):
+    """Fix one batch with two set-based UPDATEs. Returns (marked booked, freed)."""
+    slots = slots.alias(has_booking=_has_booking())
+    unbooked = slots.filter(has_booking=True).exclude(status='booked')
+    orphaned = slots.filter(has_booking=False, status='booked')
+    if dry_run:
+        return unbooked.count(), orphaned.count()
+    marked = unbooked.update(status='booked', version=F('version') + 1)
+    freed = free_slots(orphaned)
+    return marked, freed
+
+
+def reconcile_slot_status(batch_size=RECONCILE_BATCH_SIZE, dry_run=False, progress=None):
+    """
+    Make every slot's status agree with whether it has a booking, walking
+    all venues' slots in id order one short transaction per batch. Returns
+    (slots scanned, slots marked booked, slots freed). ``progress`` is called
+    with the running totals after each batch.
+    """
+    scanned = marked = freed = 0
+    last_id = 0
+    while True:
+        ids = list(
+            BookingTimeSlot.all_venues.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return scanned, marked, freed
+        with transaction.atomic():
+            batch_marked, batch_freed = _reconcile_batch(
+                BookingTimeSlot.all_venues.filter(id__gte=ids[0], id__lte=ids[-1]), dry_run
+            )
+        scanned += len(ids)
+        marked += batch_marked
+        freed += batch_freed
+        last_id = ids[-1]
+        if progress:
+            progress(scanned, marked, freed)
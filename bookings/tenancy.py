@@ -0,0 +1,146 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import wraps
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.contrib.auth.views import redirect_to_login
+from django.db import models
+
+DEFAULT_VENUE_SLUG = 'default'
+
+_current_venue_id = contextvars.ContextVar('current_venue_id', default=None)
+
+
+def current_venue_id():
+    """The venue the current request (or use_venue block) is scoped to, or None."""
+    return _current_venue_id.get()
+
+
+def set_current_venue(venue_id):
+    """Scope queries to venue_id. Returns a token for reset_current_venue()."""
+    return _current_venue_id.set(venue_id)
+
+
+def reset_current_venue(token):
+    _current_venue_id.reset(token)
+
+
+@contextmanager
+def use_venue(venue_id):
+    """Scope the block to one venue, e.g. in management commands and tests."""
+    token = set_current_venue(venue_id)
+    try:
+        yield
+    finally:
+        reset_current_venue(token)
+
+
+def get_default_venue_slug():
+    return getattr(settings, 'DEFAULT_VENUE_SLUG', DEFAULT_VENUE_SLUG)
+
+
+# venue id -> (ZoneInfo, loaded at). Cleared in this process when a Venue is
+# saved; other workers pick up a change once their entry expires.
+_venue_timezones = {}
+VENUE_TIMEZONE_TTL = 300
+
+
+def get_venue_timezone(venue_id):
+    """The venue's local timezone, falling back to settings.TIME_ZONE."""
+    cached = _venue_timezones.get(venue_id)
+    if cached is None or time.monotonic() - cached[1] > VENUE_TIMEZONE_TTL:
+        from .models import Venue
+
+        name = Venue.objects.filter(id=venue_id).values_list('timezone', flat=True).first()
+        cached = (ZoneInfo(name or settings.TIME_ZONE), time.monotonic())
+        _venue_timezones[venue_id] = cached
+    return cached[0]
+
+
+def clear_venue_timezones():
+    _venue_timezones.clear()
+
+
+def recompute_slot_local_times(venue_id, batch_size=1000):
+    """
+    Rewrite local_date/local_minute for every slot of a venue after its
+    timezone changes, in primary key batches. Returns the number of slots.
+    """
+    from .models import BookingTimeSlot
+
+    tz = get_venue_timezone(venue_id)
+    slots = BookingTimeSlot.all_venues.filter(venue_id=venue_id).only('id', 'time_start').order_by('id')
+    last_id = 0
+    updated = 0
+    while True:
+        batch = list(slots.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return updated
+        for slot in batch:
+            slot.local_date, slot.local_minute = local_date_and_minute(slot.time_start, tz)
+        BookingTimeSlot.all_venues.bulk_update(batch, ['local_date', 'local_minute'])
+        updated += len(batch)
+        last_id = batch[-1].id
+
+
+def local_date_and_minute(value, tz):
+    """Split an aware datetime into the local date and minute of day in tz."""
+    local = value.astimezone(tz)
+    return local.date(), local.hour * 60 + local.minute
+
+
+def is_venue_staff(user, venue_id=None):
+    """
+    Whether ``user`` may manage the venue (the current one by default):
+    superusers manage every venue, other staff only those listing them.
+    """
+    if not (user.is_active and user.is_staff):
+        return False
+    if user.is_superuser:
+        return True
+    from .models import Venue
+
+    venue_id = current_venue_id() if venue_id is None else venue_id
+    return Venue.staff.through.objects.filter(venue_id=venue_id, user_id=user.pk).exists()
+
+
+def venue_staff_required(view_func):
+    """Like user_passes_test(is_staff), but only passes staff of the request's venue."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if is_venue_staff(request.user):
+            return view_func(request, *args, **kwargs)
+        return redirect_to_login(request.get_full_path())
+    return wrapper
+
+
+def venue_cache_key(key, venue_id=None):
+    """
+    Namespace a cache key by venue so tenants never read each other's
+    entries and one venue's traffic doesn't share buckets with another's.
+    """
+    venue_id = current_venue_id() if venue_id is None else venue_id
+    return f'venue:{venue_id or "all"}:{key}'
+
+
+class VenueScopedQuerySet(models.QuerySet):
+    def for_venue(self, venue_id):
+        return self.filter(venue_id=venue_id)
+
+
+class VenueScopedManager(models.Manager.from_queryset(VenueScopedQuerySet)):
+    """
+    Default manager that filters to the current venue whenever one is set.
+    Outside a venue scope (migrations, shell, most management commands) it
+    returns every venue's rows; use Model.all_venues to bypass the scope
+    explicitly.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        venue_id = current_venue_id()
+        if venue_id is not None:
+            queryset = queryset.filter(venue_id=venue_id)
+        return queryset
@@ -1,14 +1,16 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.urls import reverse
-from django.contrib.auth.models import User
+from django.contrib.auth.models import Permission, User
 from django.utils import timezone
+from django.core.cache import cache
 from .models import BookingTimeSlot, BookableItem, Booking
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import json
 
 
 class BookingAppTests(TestCase):
     def setUp(self):
+        cache.clear()
         self.user = User.objects.create_user(username='testuser', password='testpass')
         self.admin = User.objects.create_superuser(username='admin', password='adminpass', email='admin@example.com')
         self.item = BookableItem.objects.create(name='Table 1', capacity=4)
@@ -50,6 +52,8 @@ class BookingAppTests(TestCase):
 class BookingSystemTestCase(TestCase):
     def setUp(self):
         """Set up test data that matches your project structure"""
+        # Rate limit buckets live in the cache, which outlives each test
+        cache.clear()
         # Create users
         self.user = User.objects.create_user(
             username='testuser', 
@@ -272,7 +276,7 @@ class AdminTests(BookingSystemTestCase):
         
         # Verify booking was created
         booking = Booking.objects.get(time_slot=self.available_slot)
-        self.assertIn('Walk-in Customer', booking.notes)
+        self.assertEqual(booking.customer_name, 'Walk-in Customer')
     
     def test_admin_can_delete_slot(self):
         """Test admin can delete time slots"""
@@ -294,6 +298,30 @@ class AdminTests(BookingSystemTestCase):
         )
 
 
+    def test_only_staff_can_clear_a_day_and_holders_are_told(self):
+        """Test clearing a day needs venue staff and queues a cancellation for each booking on it"""
+        from .models import OutboxMessage
+
+        booking = Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        day = timezone.localtime(self.available_slot.time_start).strftime('%Y-%m-%d')
+        body = json.dumps({'date': day})
+
+        response = self.client.delete(reverse('delete_all_slots_for_day'), data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 302)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.delete(reverse('delete_all_slots_for_day'), data=body, content_type='application/json')
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(BookingTimeSlot.objects.filter(id=self.available_slot.id).exists())
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.delete(reverse('delete_all_slots_for_day'), data=body, content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertFalse(BookingTimeSlot.objects.filter(local_date=day).exists())
+        self.assertFalse(Booking.objects.filter(id=booking.id).exists())
+        message = OutboxMessage.objects.get(event='booking.cancelled')
+        self.assertEqual(message.payload['booking_id'], booking.id)
+
+
 class GuestUserTests(BookingSystemTestCase):
     """Tests for non-authenticated users"""
     
@@ -472,3 +500,2161 @@ class EdgeCaseTests(BookingSystemTestCase):
         # Should still work (inactive items might still have valid slots)
         # Adjust based on logic
         self.assertIn(response.status_code, [200, 400])
+
+
+class IdempotencyTests(BookingSystemTestCase):
+    """Tests for Idempotency-Key handling on booking and cancellation"""
+
+    def test_retried_booking_returns_cached_response(self):
+        """Test a retried booking with the same key replays the original result"""
+        self.client.login(username='testuser', password='testpass123')
+        payload = json.dumps({'slot_id': self.available_slot.id})
+
+        first = self.client.post(
+            reverse('book_time_slot'), data=payload,
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY='abc-123'
+        )
+        retry = self.client.post(
+            reverse('book_time_slot'), data=payload,
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY='abc-123'
+        )
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(json.loads(first.content), json.loads(retry.content))
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Booking.objects.filter(time_slot=self.available_slot).count(), 1)
+
+    def test_key_reused_with_different_body_is_rejected(self):
+        """Test reusing a key for a different slot is refused"""
+        other_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2,
+            time_start=self.today,
+            time_length=timedelta(hours=1),
+            status='available'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY='abc-123'
+        )
+        response = self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': other_slot.id}),
+            content_type='application/json', HTTP_IDEMPOTENCY_KEY='abc-123'
+        )
+
+        self.assertEqual(response.status_code, 422)
+        other_slot.refresh_from_db()
+        self.assertEqual(other_slot.status, 'available')
+
+    def test_retried_cancellation_returns_cached_response(self):
+        """Test a retried cancel does not 404 once the booking is gone"""
+        booking = Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        self.client.login(username='testuser', password='testpass123')
+        payload = json.dumps({'booking_id': booking.id})
+
+        for _ in range(2):
+            response = self.client.delete(
+                reverse('user_bookings'), data=payload,
+                content_type='application/json', HTTP_IDEMPOTENCY_KEY='cancel-1'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(json.loads(response.content)['success'])
+
+    def test_expired_keys_are_purged(self):
+        """Test keys older than the TTL are removed by the cleanup"""
+        from .idempotency import purge_expired_keys
+        from .models import IdempotencyKey
+
+        stored = IdempotencyKey.objects.create(
+            user=self.user, endpoint='book_time_slot', key='old',
+            request_hash='0' * 64, response_status=200, response_body='{}'
+        )
+        IdempotencyKey.objects.filter(pk=stored.pk).update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        self.assertEqual(purge_expired_keys(), 1)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+
+class ExportTests(BookingSystemTestCase):
+    """Tests for streaming CSV/iCalendar exports and the user calendar feed"""
+
+    def test_staff_can_export_slots_as_csv(self):
+        """Test slot export streams a CSV row per slot in range"""
+        self.client.login(username='admin', password='adminpass123')
+        day = self.today.strftime('%Y-%m-%d')
+        response = self.client.get(reverse('staff_export_slots'), {'start': day, 'end': day})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(','), ['slot_id', 'bookable_item', 'time_start', 'time_end', 'status', 'booked_by', 'notes'])
+        self.assertEqual(len(lines), 3)
+
+    def test_export_filters_by_status(self):
+        """Test status filter limits exported slots"""
+        self.client.login(username='admin', password='adminpass123')
+        day = self.today.strftime('%Y-%m-%d')
+        response = self.client.get(
+            reverse('staff_export_slots'),
+            {'start': day, 'end': day, 'status': 'booked'}
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn(str(self.booked_slot.id), lines[1])
+
+    def test_staff_can_export_bookings_as_ics(self):
+        """Test booking export produces an iCalendar document"""
+        Booking.objects.create(user=self.user, time_slot=self.available_slot, notes='Window seat')
+        self.client.login(username='admin', password='adminpass123')
+        day = self.today.strftime('%Y-%m-%d')
+        response = self.client.get(
+            reverse('staff_export_bookings'),
+            {'start': day, 'end': day, 'format': 'ics'}
+        )
+
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+        self.assertIn('DESCRIPTION:Window seat', body)
+
+    def test_invalid_export_range_is_rejected(self):
+        """Test an end date before the start date returns 400"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(
+            reverse('staff_export_slots'),
+            {'start': '2025-08-20', 'end': '2025-08-19'}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_guest_cannot_export(self):
+        """Test exports are staff only"""
+        response = self.client.get(reverse('staff_export_bookings'))
+        self.assertIn(response.status_code, [302, 403])
+
+    def test_calendar_feed_supports_conditional_get(self):
+        """Test the user feed answers 304 when nothing changed"""
+        from .exports import calendar_feed_token
+
+        Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        url = reverse('user_calendar_feed', args=[calendar_feed_token(self.user)])
+
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Table 1', b''.join(response.streaming_content).decode())
+
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_calendar_feed_rejects_bad_token(self):
+        """Test a tampered feed token returns 404"""
+        response = self.client.get(reverse('user_calendar_feed', args=['not-a-token']))
+        self.assertEqual(response.status_code, 404)
+
+
+class SlotImportTests(BookingSystemTestCase):
+    """Tests for CSV slot import"""
+
+    CSV_DATA = (
+        "table,date,start_time,duration\n"
+        "Table 1,2025-09-01,12:00,60\n"
+        "Table 9,2025-09-01,13:00,30\n"
+        "Table 9,not-a-date,13:00,30\n"
+        ",2025-09-01,14:00,60\n"
+    )
+
+    def test_import_creates_slots_and_reports_errors(self):
+        """Test valid rows are inserted and bad rows reported by line"""
+        import io
+        from .importer import import_slots_csv
+
+        result = import_slots_csv(io.StringIO(self.CSV_DATA), chunk_size=1)
+
+        self.assertEqual(result.rows, 4)
+        self.assertEqual(result.created, 2)
+        self.assertEqual([e['line'] for e in result.errors], [4, 5])
+        self.assertTrue(BookableItem.objects.filter(name='Table 9').exists())
+
+    def test_import_skips_existing_slots(self):
+        """Test re-importing the same rows doesn't duplicate slots"""
+        import io
+        from .importer import import_slots_csv
+
+        import_slots_csv(io.StringIO(self.CSV_DATA))
+        result = import_slots_csv(io.StringIO(self.CSV_DATA))
+
+        self.assertEqual(result.created, 0)
+        self.assertEqual(result.skipped, 2)
+
+    def test_import_only_counts_and_logs_inserted_rows(self):
+        """Test rows that were already there aren't counted, logged or added to the rollups"""
+        import io
+        from .audit import slot_history
+        from .models import UsageRollup
+        from .importer import import_slots_csv
+
+        import_slots_csv(io.StringIO(self.CSV_DATA))
+        with self.captureOnCommitCallbacks(execute=True):
+            result = import_slots_csv(io.StringIO(self.CSV_DATA + "Table 1,2025-09-02,12:00,60\n"))
+
+        self.assertEqual((result.created, result.skipped), (1, 2))
+        old = BookingTimeSlot.objects.get(bookable_item=self.table1, local_date=date(2025, 9, 1))
+        new = BookingTimeSlot.objects.get(bookable_item=self.table1, local_date=date(2025, 9, 2))
+        self.assertEqual(slot_history(old.id), [])
+        self.assertEqual(len(slot_history(new.id)), 1)
+        self.assertEqual(UsageRollup.objects.get(bookable_item=self.table1, period='week', date=date(2025, 9, 1)).slot_count, 2)
+
+    def test_staff_can_upload_csv(self):
+        """Test the upload endpoint imports a CSV file"""
+        from django.core.files.uploadedfile import SimpleUploadedFile
+
+        self.client.login(username='admin', password='adminpass123')
+        upload = SimpleUploadedFile('slots.csv', self.CSV_DATA.encode(), content_type='text/csv')
+        response = self.client.post(reverse('staff_import_slots'), {'file': upload})
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertTrue(data['success'])
+        self.assertEqual(data['created_count'], 2)
+        self.assertEqual(data['error_count'], 2)
+
+    def test_import_slots_command(self):
+        """Test the import_slots management command"""
+        import os
+        import tempfile
+        from io import StringIO
+        from django.core.management import call_command
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write(self.CSV_DATA)
+        self.addCleanup(os.remove, csv_file.name)
+        out, err = StringIO(), StringIO()
+        call_command('import_slots', csv_file.name, stdout=out, stderr=err)
+
+        self.assertIn('Imported 2 slots', out.getvalue())
+        self.assertIn('Line 4', err.getvalue())
+
+    def test_template_slots_skip_existing(self):
+        """Test template creation reports skipped existing slots"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(
+            reverse('staff_create_template_slots'),
+            data=json.dumps({'slots': [
+                {'table': 'Table 1', 'date': self.today.strftime('%Y-%m-%d'),
+                 'start_time': self.today.strftime('%H:%M'), 'duration': 60},
+                {'table': 'Table 4', 'date': '2025-09-02', 'start_time': '10:00', 'duration': 60},
+            ]}),
+            content_type='application/json'
+        )
+
+        data = json.loads(response.content)
+        self.assertEqual(data['created_count'], 1)
+        self.assertEqual(data['skipped_count'], 1)
+
+
+class AdminChangeListTests(BookingSystemTestCase):
+    """Tests that admin change lists stay at a bounded number of queries"""
+
+    def _changelist_queries(self, url_name):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def _add_bookings(self, count, offset):
+        for i in range(count):
+            item = BookableItem.objects.create(name=f'Extra {offset + i}')
+            slot = BookingTimeSlot.objects.create(
+                bookable_item=item,
+                time_start=self.tomorrow + timedelta(hours=offset + i),
+                time_length=timedelta(hours=1),
+                status='booked'
+            )
+            Booking.objects.create(user=self.user, time_slot=slot)
+
+    def test_booking_changelist_queries_do_not_grow_with_rows(self):
+        """Test booking rows don't each trigger slot/item/user lookups"""
+        self.client.login(username='admin', password='adminpass123')
+        self._add_bookings(2, 0)
+        # Warm up per-process caches (venue resolution) before measuring
+        self._changelist_queries('admin:bookings_booking_changelist')
+        baseline = self._changelist_queries('admin:bookings_booking_changelist')
+        self._add_bookings(10, 2)
+        self.assertEqual(self._changelist_queries('admin:bookings_booking_changelist'), baseline)
+
+    def test_slot_changelist_queries_do_not_grow_with_rows(self):
+        """Test slot rows don't each trigger a bookable item lookup"""
+        self.client.login(username='admin', password='adminpass123')
+        self._changelist_queries('admin:bookings_bookingtimeslot_changelist')
+        baseline = self._changelist_queries('admin:bookings_bookingtimeslot_changelist')
+        self._add_bookings(10, 0)
+        self.assertEqual(self._changelist_queries('admin:bookings_bookingtimeslot_changelist'), baseline)
+
+    def test_large_changelists_skip_whole_table_date_aggregates(self):
+        """Test unfiltered slot, booking and archive lists don't scan for the oldest and newest dates"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.login(username='admin', password='adminpass123')
+        for url_name in ('admin:bookings_bookingtimeslot_changelist', 'admin:bookings_booking_changelist',
+                         'admin:bookings_archivedslot_changelist'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(reverse(url_name)).status_code, 200)
+            self.assertFalse([query['sql'] for query in queries.captured_queries if 'MIN(' in query['sql']])
+
+
+class RateLimitTests(BookingSystemTestCase):
+    """Tests for token bucket rate limiting and write concurrency caps"""
+
+    @override_settings(RATE_LIMITS={'book': {'rate': 0.01, 'burst': 2}, 'availability': {'rate': 5, 'burst': 60}})
+    def test_booking_is_rate_limited_with_retry_after(self):
+        """Test requests beyond the bucket size get 429 and Retry-After"""
+        self.client.login(username='testuser', password='testpass123')
+        statuses = []
+        for _ in range(3):
+            response = self.client.post(
+                reverse('book_time_slot'),
+                data=json.dumps({'slot_id': self.booked_slot.id}),
+                content_type='application/json'
+            )
+            statuses.append(response.status_code)
+
+        self.assertEqual(statuses, [400, 400, 429])
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    @override_settings(RATE_LIMITS={'book': {'rate': 0.5, 'burst': 10}, 'availability': {'rate': 0.01, 'burst': 1}})
+    def test_availability_limited_per_ip(self):
+        """Test anonymous clients share a per-IP bucket"""
+        first = self.client.get(reverse('available_time_slots'))
+        second = self.client.get(reverse('available_time_slots'))
+        other_ip = self.client.get(reverse('available_time_slots'), REMOTE_ADDR='10.0.0.2')
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(other_ip.status_code, 200)
+
+    @override_settings(BOOKING_WRITE_CONCURRENCY=0, CACHE_IS_SHARED=True)
+    def test_write_concurrency_cap_sheds_load(self):
+        """Test writes over the concurrency cap are rejected without booking"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(Booking.objects.filter(time_slot=self.available_slot).exists())
+
+    @override_settings(BOOKING_WRITE_CONCURRENCY=1, CACHE_IS_SHARED=True, ALLOWED_HOSTS=['.example.com', 'testserver'])
+    def test_write_concurrency_cap_is_shared_by_all_venues(self):
+        """Test writes in flight for one venue count against the cap for every venue"""
+        from django.core.cache import cache
+        from .models import Venue
+
+        Venue.objects.create(name='Harbour', slug='harbour')
+        cache.set('concurrency:booking_writes', 1, 60)
+        self.addCleanup(cache.delete, 'concurrency:booking_writes')
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json',
+            HTTP_HOST='harbour.example.com'
+        )
+        self.assertEqual(response.status_code, 429)
+
+    @override_settings(BOOKING_WRITE_CONCURRENCY=0, CACHE_IS_SHARED=False)
+    def test_write_concurrency_cap_is_off_without_a_shared_cache(self):
+        """Test a per-process count isn't used as a cap it can't enforce"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(BOOKING_WRITE_CONCURRENCY=1, CACHE_IS_SHARED=True)
+    def test_write_count_never_goes_negative_after_expiry(self):
+        """Test a request finishing after the counter expired leaves it at 0, not below"""
+        from django.core.cache import cache
+        from django.http import HttpResponse
+        from django.test import RequestFactory
+        from .ratelimit import concurrency_limit
+
+        @concurrency_limit()
+        def view(request):
+            # As if the key expired while this request was in flight and
+            # another request re-created it and finished
+            cache.set('concurrency:booking_writes', 0, 60)
+            return HttpResponse()
+
+        self.addCleanup(cache.delete, 'concurrency:booking_writes')
+        self.assertEqual(view(RequestFactory().post('/')).status_code, 200)
+        self.assertEqual(cache.get('concurrency:booking_writes'), 0)
+
+    def test_token_bucket_refills_over_time(self):
+        """Test a drained bucket admits again once tokens refill"""
+        from .ratelimit import take_token
+
+        self.assertEqual(take_token('test-bucket', 1, 1, now=100.0), 0)
+        self.assertAlmostEqual(take_token('test-bucket', 1, 1, now=100.5), 0.5)
+        self.assertEqual(take_token('test-bucket', 1, 1, now=101.5), 0)
+
+
+class OutboxTests(BookingSystemTestCase):
+    """Tests for the transactional outbox and its delivery worker"""
+
+    def _book(self):
+        self.client.login(username='testuser', password='testpass123')
+        return self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json'
+        )
+
+    def test_booking_queues_email_without_sending_inline(self):
+        """Test booking writes an outbox row instead of sending mail in the request"""
+        from django.core import mail
+        from .models import OutboxMessage
+
+        self._book()
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.channel, message.event, message.status), ('email', 'booking.confirmed', 'pending'))
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_worker_delivers_queued_email(self):
+        """Test the worker sends queued mail and marks it sent"""
+        from django.core import mail
+        from .models import OutboxMessage
+        from .outbox import process_batch
+
+        self._book()
+        delivered, failed = process_batch()
+
+        self.assertEqual((delivered, failed), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['user@test.com'])
+        self.assertEqual(OutboxMessage.objects.get().status, 'sent')
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        """Test a failing delivery is rescheduled and eventually marked failed"""
+        from unittest import mock
+        from .models import OutboxMessage
+        from .outbox import process_batch
+
+        self._book()
+        with override_settings(OUTBOX_MAX_ATTEMPTS=2), \
+                mock.patch.dict('bookings.outbox.DELIVERY_HANDLERS', {'email': mock.Mock(side_effect=OSError('down'))}):
+            self.assertEqual(process_batch(), (0, 1))
+            message = OutboxMessage.objects.get()
+            self.assertEqual((message.status, message.attempts), ('pending', 1))
+            self.assertGreater(message.available_at, timezone.now())
+
+            OutboxMessage.objects.update(available_at=timezone.now())
+            process_batch()
+            message.refresh_from_db()
+            self.assertEqual((message.status, message.last_error), ('failed', 'down'))
+
+    def test_cancellation_rolled_back_leaves_no_message(self):
+        """Test outbox rows roll back with the booking change"""
+        from django.db import transaction
+        from .models import OutboxMessage
+        from .outbox import enqueue_booking_event
+
+        booking = Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        try:
+            with transaction.atomic():
+                enqueue_booking_event('booking.cancelled', booking)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(OutboxMessage.objects.exists())
+
+    def test_webhook_delivered_to_local_sink(self):
+        """Test webhook messages are POSTed to the configured URL"""
+        import threading
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        from .outbox import process_batch
+
+        received = []
+
+        class Sink(BaseHTTPRequestHandler):
+            def do_POST(self):
+                received.append(json.loads(self.rfile.read(int(self.headers['Content-Length']))))
+                self.send_response(204)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Sink)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        with override_settings(BOOKING_WEBHOOK_URL=f'http://127.0.0.1:{server.server_port}/hook'):
+            self._book()
+            self.assertEqual(process_batch(), (2, 0))
+
+        self.assertEqual(received[0]['event'], 'booking.confirmed')
+        self.assertEqual(received[0]['data']['slot_id'], self.available_slot.id)
+
+
+class ReminderSchedulerTests(BookingSystemTestCase):
+    """Tests for the heap based booking reminder scheduler"""
+
+    def setUp(self):
+        super().setUp()
+        self.now = timezone.now()
+        self.soon_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2,
+            time_start=self.now + timedelta(hours=24, minutes=10),
+            time_length=timedelta(hours=1),
+        )
+        self.later_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2,
+            time_start=self.now + timedelta(days=3),
+            time_length=timedelta(hours=1),
+        )
+        self.soon = Booking.objects.create(user=self.user, time_slot=self.soon_slot)
+        self.later = Booking.objects.create(user=self.user, time_slot=self.later_slot)
+
+    def _scheduler(self):
+        from .reminders import ReminderScheduler
+        return ReminderScheduler(
+            lead=timedelta(hours=24), window=timedelta(minutes=30), clock=lambda: self.now
+        )
+
+    def test_only_upcoming_window_is_loaded(self):
+        """Test bookings far in the future aren't held in memory"""
+        scheduler = self._scheduler()
+        scheduler.load_window()
+        self.assertEqual(len(scheduler), 1)
+        self.assertAlmostEqual(scheduler.seconds_until_next(), 600, delta=1)
+
+    def test_due_reminder_is_sent_once(self):
+        """Test a due reminder is queued once, even across restarts"""
+        from .models import OutboxMessage
+
+        scheduler = self._scheduler()
+        scheduler.load_window()
+        self.now += timedelta(minutes=10)
+        self.assertEqual(scheduler.run_pending(), 1)
+
+        restarted = self._scheduler()
+        self.assertEqual(restarted.run_pending(), 0)
+        self.assertEqual(OutboxMessage.objects.filter(event='booking.reminder').count(), 1)
+        self.soon.refresh_from_db()
+        self.assertIsNotNone(self.soon.reminder_sent_at)
+
+    def test_cancelled_booking_is_not_reminded(self):
+        """Test cancel() drops a scheduled reminder"""
+        scheduler = self._scheduler()
+        scheduler.load_window()
+        scheduler.cancel(self.soon.id)
+        self.now += timedelta(minutes=10)
+        self.assertEqual(scheduler.pop_due(), [])
+
+    def test_new_booking_is_scheduled_through_signal(self):
+        """Test bookings created while running are added incrementally"""
+        from . import reminders
+
+        scheduler = self._scheduler()
+        scheduler.load_window()
+        reminders.active_scheduler = scheduler
+        self.addCleanup(setattr, reminders, 'active_scheduler', None)
+
+        slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table1,
+            time_start=self.now + timedelta(hours=2),
+            time_length=timedelta(hours=1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(user=self.user, time_slot=slot)
+
+        self.assertEqual(len(scheduler), 2)
+
+    def test_moved_bookings_are_reminded_at_their_new_time(self):
+        """Test a slot moved later, or a booking moved to an earlier slot, changes when its reminder goes"""
+        from .reminders import ReminderScheduler
+
+        scheduler = ReminderScheduler(
+            lead=timedelta(hours=24), window=timedelta(minutes=30), clock=lambda: self.now, sync_seconds=0
+        )
+        scheduler.load_window()
+        # Moved in other processes: no scheduler there to signal
+        self.soon_slot.time_start += timedelta(days=2)
+        self.soon_slot.save()
+        soon_again = BookingTimeSlot.objects.create(
+            bookable_item=self.table1, time_start=self.now + timedelta(hours=2), time_length=timedelta(hours=1)
+        )
+        self.later.time_slot = soon_again
+        self.later.save()
+
+        self.now += timedelta(minutes=10)
+        self.assertEqual(scheduler.run_pending(), 1)
+        self.later.refresh_from_db()
+        self.assertIsNotNone(self.later.reminder_sent_at)
+        self.soon.refresh_from_db()
+        self.assertIsNone(self.soon.reminder_sent_at)
+
+    def test_dispatch_checks_the_slot_start_again(self):
+        """Test a reminder reached after its slot moved without a sync isn't sent early"""
+        scheduler = self._scheduler()
+        scheduler.load_window()
+        BookingTimeSlot.objects.filter(id=self.soon_slot.id).update(time_start=self.now + timedelta(hours=24, minutes=20))
+        self.now += timedelta(minutes=10)
+        self.assertEqual(scheduler.run_pending(), 0)
+        self.assertAlmostEqual(scheduler.seconds_until_next(), 600, delta=1)
+        self.now += timedelta(minutes=10)
+        self.assertEqual(scheduler.run_pending(), 1)
+
+    def test_other_processes_bookings_are_synced(self):
+        """Test bookings made and cancelled where no scheduler runs are picked up by the next sync"""
+        from .reminders import ReminderScheduler
+
+        scheduler = ReminderScheduler(
+            lead=timedelta(hours=24), window=timedelta(minutes=30), clock=lambda: self.now, sync_seconds=0
+        )
+        scheduler.load_window()
+        # As in a web worker: no scheduler in this process to signal
+        slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table1, time_start=self.now + timedelta(hours=24, minutes=5), time_length=timedelta(hours=1)
+        )
+        booking = Booking.objects.create(user=self.user, time_slot=slot)
+        self.soon.delete()
+
+        scheduler.run_pending()
+        self.assertEqual(len(scheduler), 1)
+        self.assertAlmostEqual(scheduler.seconds_until_next(), 300, delta=1)
+        self.now += timedelta(minutes=5)
+        self.assertEqual(scheduler.pop_due(), [booking.id])
+
+
+class CustomerIdentityTests(BookingSystemTestCase):
+    """Tests for structured customer fields on bookings"""
+
+    def test_staff_booking_stores_customer_fields(self):
+        """Test staff bookings record name, phone, email and party size"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(
+            reverse('staff_book_slot'),
+            data=json.dumps({
+                'slot_id': self.available_slot.id,
+                'customer_name': 'Ada Lovelace',
+                'customer_phone': '01234 567890',
+                'customer_email': 'ada@example.com',
+                'party_size': 3
+            }),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        booking = Booking.objects.get(time_slot=self.available_slot)
+        self.assertEqual(
+            (booking.customer_name, booking.customer_phone, booking.customer_email, booking.party_size),
+            ('Ada Lovelace', '01234 567890', 'ada@example.com', 3)
+        )
+
+    def test_invalid_party_size_is_rejected(self):
+        """Test a non-positive party size is refused"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(
+            reverse('staff_book_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id, 'party_size': 0}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_user_booking_records_customer_name(self):
+        """Test self-service bookings copy the user's name and email"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json'
+        )
+        booking = Booking.objects.get(time_slot=self.available_slot)
+        self.assertEqual((booking.customer_name, booking.customer_email), ('testuser', 'user@test.com'))
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_dashboard_reads_customer_name_in_one_query(self):
+        """Test dashboard events come from a single joined query"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .catalog import get_catalog
+        from .views import _dashboard_slot_events
+
+        Booking.objects.create(user=self.admin, time_slot=self.available_slot, customer_name='Grace Hopper')
+        self.available_slot.status = 'booked'
+        self.available_slot.save()
+        get_catalog()
+        with CaptureQueriesContext(connection) as queries:
+            events, _ = _dashboard_slot_events(BookingTimeSlot.objects.all())
+
+        self.assertEqual(len(queries), 1)
+        booked = [e for e in events if e['extendedProps']['slot_id'] == self.available_slot.id][0]
+        self.assertEqual(booked['extendedProps']['booking_user'], 'Grace Hopper')
+
+
+@override_settings(ALLOWED_HOSTS=['.example.com', 'testserver'])
+class VenueIsolationTests(BookingSystemTestCase):
+    """Tests for multi-tenant venue resolution and scoping"""
+
+    def setUp(self):
+        super().setUp()
+        from .models import Venue
+        from .tenancy import use_venue
+
+        self.cafe = Venue.objects.create(name='Cafe', slug='cafe', domain='bookings.cafe.test')
+        with use_venue(self.cafe.id):
+            self.cafe_table = BookableItem.objects.create(name='Cafe Table')
+            self.cafe_slot = BookingTimeSlot.objects.create(
+                bookable_item=self.cafe_table,
+                time_start=self.today,
+                time_length=timedelta(hours=1),
+            )
+
+    def test_related_rows_inherit_venue(self):
+        """Test slots and bookings take the venue of their parent"""
+        booking = Booking.objects.create(user=self.user, time_slot=self.cafe_slot)
+        self.assertEqual(self.cafe_slot.venue_id, self.cafe.id)
+        self.assertEqual(booking.venue_id, self.cafe.id)
+        self.assertNotEqual(self.available_slot.venue_id, self.cafe.id)
+
+    def test_subdomain_only_sees_its_venue(self):
+        """Test a venue subdomain lists only that venue's slots"""
+        date_str = self.today.strftime('%Y-%m-%d')
+        response = self.client.get(
+            reverse('available_time_slots'), {'date': date_str}, HTTP_HOST='cafe.example.com'
+        )
+        self.assertContains(response, 'Cafe Table')
+        self.assertNotContains(response, 'Table 1')
+
+    def test_custom_domain_resolves_venue(self):
+        """Test an exact domain match picks the venue"""
+        from .middleware import resolve_venue_id
+        self.assertEqual(resolve_venue_id('bookings.cafe.test'), self.cafe.id)
+        self.assertNotEqual(resolve_venue_id('unknown.example.com'), self.cafe.id)
+
+    def test_cannot_book_another_venues_slot(self):
+        """Test slots from other venues are not found"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json',
+            HTTP_HOST='cafe.example.com'
+        )
+        self.assertNotEqual(response.status_code, 200)
+        self.assertFalse(Booking.objects.filter(time_slot=self.available_slot).exists())
+
+    def test_cache_keys_are_namespaced_by_venue(self):
+        """Test the same logical key differs between venues"""
+        from .tenancy import venue_cache_key
+        self.assertNotEqual(venue_cache_key('k', 1), venue_cache_key('k', 2))
+
+
+    def test_staff_only_manage_their_own_venue(self):
+        """Test a venue's staff can't use staff pages or the admin on another venue's host"""
+        manager = User.objects.create_user(username='manager', password='managerpass123', is_staff=True)
+        manager.user_permissions.add(*Permission.objects.filter(codename__in=['view_booking', 'change_booking']))
+        self.cafe.staff.add(manager)
+        self.client.login(username='manager', password='managerpass123')
+
+        self.assertEqual(self.client.get(reverse('staff_dashboard'), HTTP_HOST='cafe.example.com').status_code, 200)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 302)
+        changelist = reverse('admin:bookings_booking_changelist')
+        self.assertEqual(self.client.get(changelist, HTTP_HOST='cafe.example.com').status_code, 200)
+        self.assertEqual(self.client.get(changelist).status_code, 403)
+
+    def test_existing_staff_keep_the_default_venue(self):
+        """Test the migration adding venue staff lists every staff account on the default venue"""
+        import importlib
+        from django.apps import apps
+        from .models import Venue
+        from .tenancy import get_default_venue_slug, is_venue_staff
+
+        migration = importlib.import_module('bookings.migrations.0027_venue_staff')
+        manager = User.objects.create_user(username='manager', password='managerpass123', is_staff=True)
+        migration.add_staff_to_default_venue(apps, None)
+
+        default = Venue.objects.get(slug=get_default_venue_slug())
+        self.assertEqual(set(default.staff.all()), {self.admin, manager})
+        self.assertTrue(is_venue_staff(manager, default.id))
+        self.assertFalse(is_venue_staff(manager, self.cafe.id))
+        self.assertFalse(is_venue_staff(self.user, default.id))
+
+    @override_settings(ALLOWED_HOSTS=['.example.com'])
+    def test_venue_domain_must_be_an_allowed_host(self):
+        """Test a custom domain Django would refuse can't be given to a venue"""
+        from django.core.exceptions import ValidationError
+        from .models import Venue
+
+        Venue(name='Pier', slug='pier', domain='book.example.com').full_clean()
+        with self.assertRaises(ValidationError):
+            Venue(name='Pier', slug='pier', domain='bookings.pier.test').full_clean()
+
+class VenueTimezoneTests(BookingSystemTestCase):
+    """Tests for per-venue timezones and the local date column"""
+
+    def setUp(self):
+        super().setUp()
+        from .models import Venue
+        from .tenancy import clear_venue_timezones, use_venue
+
+        clear_venue_timezones()
+        self.venue = Venue.objects.create(name='Harbour', slug='harbour', timezone='Pacific/Auckland')
+        with use_venue(self.venue.id):
+            self.item = BookableItem.objects.create(name='Harbour Table')
+        # 11:30 UTC on 1 June is 23:30 in Auckland (UTC+12) the same day
+        self.late_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.item,
+            time_start=timezone.make_aware(datetime(2025, 6, 1, 11, 30), timezone.utc),
+            time_length=timedelta(hours=1),
+        )
+
+    def test_local_date_and_minute_use_venue_timezone(self):
+        """Test the stored local fields follow the venue's timezone"""
+        self.assertEqual(str(self.late_slot.local_date), '2025-06-01')
+        self.assertEqual(self.late_slot.local_minute, 23 * 60 + 30)
+
+    def test_local_time_recomputed_when_start_changes(self):
+        """Test moving a slot keeps the local columns in sync"""
+        self.late_slot.time_start += timedelta(hours=1)
+        self.late_slot.save(update_fields=['time_start'])
+        self.late_slot.refresh_from_db()
+        self.assertEqual((str(self.late_slot.local_date), self.late_slot.local_minute), ('2025-06-02', 30))
+
+    def test_importer_reads_times_in_venue_timezone(self):
+        """Test imported wall clock times are interpreted in the venue's timezone"""
+        import io
+        from .importer import import_slots_csv
+        from .tenancy import use_venue
+
+        with use_venue(self.venue.id):
+            import_slots_csv(io.StringIO("table,date,start_time\nHarbour Table,2025-06-03,09:00\n"))
+        slot = BookingTimeSlot.objects.get(bookable_item=self.item, local_date='2025-06-03')
+        self.assertEqual(slot.local_minute, 9 * 60)
+        self.assertEqual(slot.time_start, timezone.make_aware(datetime(2025, 6, 2, 21, 0), timezone.utc))
+
+    def test_recompute_after_timezone_change(self):
+        """Test changing a venue's timezone rewrites its slots' local fields"""
+        from .tenancy import clear_venue_timezones, recompute_slot_local_times
+
+        self.venue.timezone = 'UTC'
+        self.venue.save()
+        clear_venue_timezones()
+        self.assertEqual(recompute_slot_local_times(self.venue.id), 1)
+        self.late_slot.refresh_from_db()
+        self.assertEqual(self.late_slot.local_minute, 11 * 60 + 30)
+
+    @override_settings(ALLOWED_HOSTS=['.example.com', 'testserver'])
+    def test_available_slots_filter_on_local_date(self):
+        """Test the day view uses the venue's calendar date"""
+        response = self.client.get(
+            reverse('available_time_slots'), {'date': '2025-06-01'}, HTTP_HOST='harbour.example.com'
+        )
+        self.assertContains(response, 'Harbour Table')
+        self.assertContains(response, '23:30')
+
+
+class SlotArchiveTests(BookingSystemTestCase):
+    """Tests for moving past slots into the archive tables"""
+
+    def setUp(self):
+        super().setUp()
+        self.past_start = self.today - timedelta(days=120)
+        self.old_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2,
+            time_start=self.past_start,
+            time_length=timedelta(hours=1),
+            status='booked'
+        )
+        self.old_booking = Booking.objects.create(
+            user=self.user, time_slot=self.old_slot, customer_name='Old Guest', party_size=2
+        )
+
+    def test_archive_moves_slots_and_bookings(self):
+        """Test past slots and their bookings leave the live tables intact in the archive"""
+        from .archive import archive_slots_before
+        from .models import ArchivedBooking, ArchivedSlot
+
+        self.assertEqual(archive_slots_before(self.today - timedelta(days=90), batch_size=1), (1, 1))
+        self.assertFalse(BookingTimeSlot.objects.filter(id=self.old_slot.id).exists())
+        self.assertFalse(Booking.objects.filter(id=self.old_booking.id).exists())
+
+        archived = ArchivedSlot.objects.get(id=self.old_slot.id)
+        self.assertEqual((archived.item_name, archived.status), ('Table 2', 'booked'))
+        self.assertEqual(ArchivedBooking.objects.get(id=self.old_booking.id).time_slot, archived)
+        self.assertEqual(BookingTimeSlot.objects.count(), 2)
+
+    def test_archive_runs_in_batches(self):
+        """Test every batch is bounded and the whole backlog is still moved"""
+        from .archive import archive_slots_before
+
+        for days in range(100, 105):
+            BookingTimeSlot.objects.create(
+                bookable_item=self.table1,
+                time_start=self.today - timedelta(days=days),
+                time_length=timedelta(hours=1)
+            )
+        batches = []
+        result = archive_slots_before(
+            self.today - timedelta(days=90), batch_size=2, progress=lambda slots, bookings: batches.append(slots)
+        )
+        self.assertEqual(result, (6, 1))
+        self.assertEqual(batches, [2, 4, 6])
+
+    def test_export_includes_archived_rows(self):
+        """Test the booking export reads archived and live bookings as one report"""
+        from django.core.management import call_command
+        from io import StringIO
+
+        call_command('archive_slots', stdout=StringIO())
+        Booking.objects.create(user=self.user, time_slot=self.available_slot, customer_name='New Guest')
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('staff_export_bookings'), {
+            'start': self.past_start.strftime('%Y-%m-%d'),
+            'end': self.today.strftime('%Y-%m-%d'),
+        })
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertIn('Old Guest', lines[1])
+        self.assertIn('New Guest', lines[2])
+
+    def test_future_cutoff_is_rejected(self):
+        """Test the command refuses to archive slots that haven't happened yet"""
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with self.assertRaises(CommandError):
+            call_command('archive_slots', before=self.tomorrow.strftime('%Y-%m-%d'))
+
+
+class ProfilingTests(BookingSystemTestCase):
+    """Tests for opt-in request profiling and the capture ring buffer"""
+
+    def setUp(self):
+        super().setUp()
+        import tempfile
+
+        self.capture_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.capture_dir.cleanup)
+        settings_override = override_settings(
+            PROFILE_CAPTURE_DIR=self.capture_dir.name, PROFILE_CAPTURE_LIMIT=2, PROFILE_SLOW_SAMPLE_RATE=0
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_staff_can_profile_a_request(self):
+        """Test ?_profile=1 stores a profile with the request's SQL"""
+        from .profiling import load_capture
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('staff_dashboard'), {'_profile': '1'})
+
+        capture = load_capture(response['X-Profile-Id'])
+        self.assertEqual(capture['status'], 200)
+        self.assertTrue(capture['has_profile'])
+        self.assertGreater(capture['sql_count'], 0)
+        self.assertTrue(any('bookings_bookingtimeslot' in query['sql'] for query in capture['queries']))
+
+        download = self.client.get(reverse('staff_profile_download', args=[capture['id']]))
+        self.assertEqual(download.status_code, 200)
+        self.assertContains(self.client.get(reverse('staff_profiles')), capture['id'])
+
+    def test_non_staff_cannot_opt_in(self):
+        """Test the profiling flag is ignored for regular users"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('booking'), HTTP_X_PROFILE='1')
+        self.assertNotIn('X-Profile-Id', response)
+
+    def test_captures_are_a_ring_buffer(self):
+        """Test only the newest PROFILE_CAPTURE_LIMIT captures are kept"""
+        from .profiling import list_captures
+
+        self.client.login(username='admin', password='adminpass123')
+        ids = [self.client.get(reverse('booking'), {'_profile': '1'})['X-Profile-Id'] for _ in range(3)]
+        self.assertEqual([capture['id'] for capture in list_captures()], ids[:0:-1])
+
+    def test_sampled_slow_requests_are_captured(self):
+        """Test sampled requests over the threshold are kept without opting in"""
+        from .profiling import list_captures
+
+        with override_settings(PROFILE_SLOW_SAMPLE_RATE=1, PROFILE_SLOW_REQUEST_MS=0):
+            self.client.get(reverse('booking'))
+        with override_settings(PROFILE_SLOW_SAMPLE_RATE=1, PROFILE_SLOW_REQUEST_MS=60000):
+            self.client.get(reverse('booking'))
+        captures = list_captures()
+        self.assertEqual(len(captures), 1)
+        self.assertEqual(captures[0]['reason'], 'slow')
+
+    def test_unknown_capture_is_404(self):
+        """Test malformed or missing capture ids are not found"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.get(reverse('staff_profile_detail', args=['..%2Fsettings']))
+        self.assertEqual(response.status_code, 404)
+
+
+class WarmupTests(TestCase):
+    """Tests for worker warm-up and the startup report parser"""
+
+    def test_warm_up_primes_template_cache(self):
+        """Test warm-up compiles the page templates into the cached loader"""
+        from django.template import engines
+        from .warmup import warm_up
+
+        timings = warm_up()
+        self.assertEqual(list(timings), ['templates', 'urls', 'database', 'venue'])
+        loader = engines['django'].engine.template_loaders[0]
+        loader.reset()
+        warm_up(database=False)
+        self.assertIn('staff_dashboard.html', {key.split('-')[0] for key in loader.get_template_cache})
+
+    def test_parse_importtime(self):
+        """Test import times are totalled and grouped by top-level package"""
+        from .management.commands.startup_report import parse_importtime
+
+        output = (
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       100 |        100 |   django.utils\n"
+            "import time:       200 |        300 | django\n"
+            "import time:        50 |         50 | json\n"
+        )
+        total, packages = parse_importtime(output)
+        self.assertAlmostEqual(total, 0.00035)
+        self.assertEqual(packages, {'django': 0.0003, 'json': 0.00005})
+
+
+class ApiTests(BookingSystemTestCase):
+    """Tests for the versioned JSON API"""
+
+    def setUp(self):
+        super().setUp()
+        self.later_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2,
+            time_start=self.tomorrow,
+            time_length=timedelta(minutes=90),
+            status='available'
+        )
+        self.range = {'from': self.today.isoformat(), 'to': (self.tomorrow + timedelta(days=1)).isoformat()}
+
+    def test_slots_default_fields(self):
+        """Test the slot list returns compact objects with the default fields"""
+        response = self.client.get(reverse('api_v1_slots'), self.range)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()['data']
+        self.assertEqual([slot['id'] for slot in data], [self.available_slot.id, self.booked_slot.id, self.later_slot.id])
+        self.assertEqual(set(data[0]), {'id', 'item_id', 'start', 'minutes', 'status'})
+        self.assertEqual(data[2]['minutes'], 90)
+        self.assertNotIn(b', ', response.content)
+
+    def test_sparse_fields_and_status_filter(self):
+        """Test fields= picks the returned keys and status= filters rows"""
+        response = self.client.get(
+            reverse('api_v1_slots'), {**self.range, 'fields': 'id,item_name', 'status': 'available'}
+        )
+        self.assertEqual(response.json()['data'], [
+            {'id': self.available_slot.id, 'item_name': 'Table 1'},
+            {'id': self.later_slot.id, 'item_name': 'Table 2'},
+        ])
+
+    def test_cursor_pagination(self):
+        """Test following next_cursor walks every slot exactly once"""
+        seen = []
+        params = {**self.range, 'limit': 2, 'fields': 'id'}
+        while True:
+            body = self.client.get(reverse('api_v1_slots'), params).json()
+            seen += [slot['id'] for slot in body['data']]
+            if not body['next_cursor']:
+                break
+            params['cursor'] = body['next_cursor']
+        self.assertEqual(seen, [self.available_slot.id, self.booked_slot.id, self.later_slot.id])
+
+    def test_rows_shape(self):
+        """Test shape=rows sends field names once with positional rows"""
+        body = self.client.get(reverse('api_v1_items'), {'fields': 'name,capacity', 'shape': 'rows'}).json()
+        self.assertEqual(body['fields'], ['name', 'capacity'])
+        self.assertEqual(body['rows'], [['Table 1', 4], ['Table 2', 2]])
+
+    def test_invalid_parameters_are_rejected(self):
+        """Test unknown fields, bad cursors and bad limits return 400"""
+        for params in ({'fields': 'id,password'}, {'cursor': 'not-a-cursor'}, {'limit': '0'}, {'status': 'gone'}):
+            response = self.client.get(reverse('api_v1_slots'), params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()['success'])
+
+    def test_bookings_require_login_and_are_scoped_to_user(self):
+        """Test the bookings endpoint only lists the caller's own bookings"""
+        Booking.objects.create(user=self.admin, time_slot=self.booked_slot)
+        own = Booking.objects.create(user=self.user, time_slot=self.later_slot, party_size=3)
+        self.assertEqual(self.client.get(reverse('api_v1_bookings')).status_code, 401)
+
+        self.client.login(username='testuser', password='testpass123')
+        data = self.client.get(reverse('api_v1_bookings')).json()['data']
+        self.assertEqual(data, [{
+            'id': own.id, 'slot_id': self.later_slot.id, 'start': self.tomorrow.isoformat(),
+            'minutes': 90, 'party_size': 3,
+        }])
+
+
+class GroupBookingTests(BookingSystemTestCase):
+    """Tests for all-or-nothing multi-slot bookings"""
+
+    def setUp(self):
+        super().setUp()
+        self.next_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table1,
+            time_start=self.today + timedelta(hours=1),
+            time_length=timedelta(hours=1),
+            status='available'
+        )
+        self.other_table_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2,
+            time_start=self.today,
+            time_length=timedelta(hours=1),
+            status='available'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def post(self, data):
+        return self.client.post(reverse('book_time_slots'), data=json.dumps(data), content_type='application/json')
+
+    def test_book_adjacent_tables_together(self):
+        """Test a list of slots is booked as one group"""
+        response = self.post({'slot_ids': [self.other_table_slot.id, self.available_slot.id], 'party_size': 6})
+
+        self.assertEqual(response.status_code, 200)
+        bookings = Booking.objects.filter(user=self.user)
+        self.assertEqual(bookings.count(), 2)
+        self.assertEqual({str(booking.group) for booking in bookings}, {response.json()['group']})
+        self.assertEqual({booking.party_size for booking in bookings}, {6})
+        self.assertFalse(BookingTimeSlot.objects.filter(
+            id__in=[self.other_table_slot.id, self.available_slot.id], status='available'
+        ).exists())
+
+    def test_book_contiguous_duration(self):
+        """Test two back-to-back hours on one item are found and booked"""
+        response = self.post({
+            'bookable_item_id': self.table1.id, 'start': self.today.isoformat(), 'duration': 120
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [slot['slot_id'] for slot in response.json()['slots']], [self.available_slot.id, self.next_slot.id]
+        )
+
+    def test_gap_in_duration_is_rejected(self):
+        """Test a duration that runs into a missing slot books nothing"""
+        response = self.post({
+            'bookable_item_id': self.table2.id, 'start': self.today.isoformat(), 'duration': 120
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_one_unavailable_slot_rolls_back_all(self):
+        """Test a taken slot fails the whole group and leaves the others free"""
+        response = self.post({'slot_ids': [self.available_slot.id, self.booked_slot.id]})
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['slot_ids'], [self.booked_slot.id])
+        self.assertFalse(Booking.objects.exists())
+        self.available_slot.refresh_from_db()
+        self.assertEqual(self.available_slot.status, 'available')
+
+    def test_group_booking_queries_are_constant(self):
+        """Test claiming more slots doesn't add queries per slot"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .group_booking import book_slots
+
+        slots = [
+            BookingTimeSlot.objects.create(
+                bookable_item=self.table2, time_start=self.tomorrow + timedelta(hours=hour), time_length=timedelta(hours=1)
+            )
+            for hour in range(4)
+        ]
+        with CaptureQueriesContext(connection) as one:
+            book_slots(self.user, [slots[0].id])
+        with CaptureQueriesContext(connection) as three:
+            book_slots(self.user, [slot.id for slot in slots[1:]])
+        self.assertEqual(len(one), len(three))
+
+
+class PartyAssignmentTests(BookingSystemTestCase):
+    """Tests for best-fit table assignment by party size"""
+
+    def setUp(self):
+        super().setUp()
+        self.start = self.tomorrow
+        self.two_top = BookableItem.objects.create(name='Two Top', capacity=2)
+        self.four_top = BookableItem.objects.create(name='Four Top', capacity=4)
+        self.eight_top = BookableItem.objects.create(name='Eight Top', capacity=8)
+        self.slots = {
+            item.name: BookingTimeSlot.objects.create(
+                bookable_item=item, time_start=self.start, time_length=timedelta(hours=1)
+            )
+            for item in (self.two_top, self.four_top, self.eight_top)
+        }
+        self.client.login(username='testuser', password='testpass123')
+
+    def post(self, party_size):
+        return self.client.post(
+            reverse('book_for_party'),
+            data=json.dumps({'party_size': party_size, 'start': self.start.isoformat()}),
+            content_type='application/json'
+        )
+
+    def test_smallest_table_that_fits(self):
+        """Test a party of three gets the four-top, not the eight-top"""
+        response = self.post(3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['bookable_items'], ['Four Top'])
+        self.assertEqual(Booking.objects.get().party_size, 3)
+
+    def test_adjacent_tables_combined_when_no_single_fits(self):
+        """Test two adjacent tables are pushed together for a large party"""
+        self.four_top.adjacent_items.add(self.eight_top)
+        response = self.post(10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['bookable_items']), ['Eight Top', 'Four Top'])
+
+    @override_settings(BOOKING_QUOTAS={'per_day': 2, 'per_week': None, 'active': None})
+    def test_combined_tables_are_one_booking_for_quotas(self):
+        """Test a party on combined tables uses one booking of the daily quota"""
+        self.four_top.adjacent_items.add(self.eight_top)
+        self.assertEqual(self.post(10).status_code, 200)
+        later = BookingTimeSlot.objects.create(
+            bookable_item=self.two_top, time_start=self.start + timedelta(hours=2), time_length=timedelta(hours=1)
+        )
+        response = self.client.post(reverse('book_time_slot'), data=json.dumps({'slot_id': later.id}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(reverse('book_time_slot'), data=json.dumps({'slot_id': self.slots['Two Top'].id}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_no_fit_is_conflict(self):
+        """Test a party too large for any table or combination gets 409"""
+        response = self.post(9)
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(Booking.objects.exists())
+
+    def test_best_fit_prefers_fewest_spare_seats(self):
+        """Test combinations are ranked by spare seats, then by table count"""
+        from .assignment import Candidate, best_fit
+
+        candidates = [Candidate(1, 1, 4, 'A'), Candidate(2, 2, 4, 'B'), Candidate(3, 3, 2, 'C'), Candidate(4, 4, 5, 'D')]
+        adjacency = {1: {2, 3}, 2: {1}, 3: {1, 4}, 4: {3}}
+        self.assertEqual([c.name for c in best_fit(candidates, 5, adjacency)], ['D'])
+        self.assertEqual([c.name for c in best_fit(candidates, 7, adjacency)], ['C', 'D'])
+        self.assertEqual([c.name for c in best_fit(candidates, 9, adjacency)], ['A', 'B', 'C'])
+        self.assertIsNone(best_fit(candidates, 7))
+
+
+class AnalyticsRollupTests(BookingSystemTestCase):
+    """Tests for the incrementally maintained analytics rollups"""
+
+    def rollup(self, item, period='week', slot=None):
+        from .analytics import week_start
+        from .models import UsageRollup
+
+        slot = slot or self.available_slot
+        date = week_start(slot.local_date) if period == 'week' else slot.local_date
+        hour = slot.local_minute // 60 if period == 'hour' else 0
+        return UsageRollup.objects.get(bookable_item=item, period=period, date=date, hour=hour)
+
+    def snapshot(self):
+        from .analytics import ROLLUP_FIELDS
+        from .models import UsageRollup
+
+        return sorted(
+            UsageRollup.objects.values_list('bookable_item_id', 'period', 'date', 'hour', *ROLLUP_FIELDS)
+        )
+
+    def test_slots_and_bookings_update_rollups(self):
+        """Test creating slots and booking one updates every period's counters"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(
+            reverse('book_time_slot'),
+            data=json.dumps({'slot_id': self.available_slot.id}),
+            content_type='application/json'
+        )
+        week = self.rollup(self.table1)
+        self.assertEqual((week.slot_count, week.slot_minutes), (2, 120))
+        self.assertEqual((week.booked_count, week.booked_minutes), (1, 60))
+        self.assertEqual(self.rollup(self.table1, 'hour').booked_count, 1)
+        self.assertEqual(self.rollup(self.table1, 'hour', self.booked_slot).booked_count, 0)
+
+    def test_cancellation_is_counted(self):
+        """Test cancelling moves a booking from booked to cancelled"""
+        booking = Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        self.client.login(username='testuser', password='testpass123')
+        self.client.delete(
+            reverse('user_bookings'),
+            data=json.dumps({'booking_id': booking.id}),
+            content_type='application/json'
+        )
+        day = self.rollup(self.table1, 'day')
+        self.assertEqual((day.booked_count, day.cancellations), (0, 1))
+
+    def test_cascade_deletes_count_as_cancellations(self):
+        """Test bookings removed with their slot or user are counted as cancelled"""
+        other = BookingTimeSlot.objects.create(
+            bookable_item=self.table1, time_start=self.today + timedelta(hours=4), time_length=timedelta(hours=1)
+        )
+        Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        Booking.objects.create(user=self.admin, time_slot=other)
+        self.available_slot.delete()
+        self.admin.delete()
+        day = self.rollup(self.table1, 'day')
+        self.assertEqual((day.booked_count, day.cancellations), (0, 2))
+
+    def test_moved_slot_moves_its_counts(self):
+        """Test saving a slot at a new time moves its slot and booking counts"""
+        Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        old_day = self.rollup(self.table1, 'day')
+        self.available_slot.refresh_from_db()
+        self.available_slot.time_start += timedelta(days=1)
+        self.available_slot.save()
+
+        old_day.refresh_from_db()
+        self.assertEqual((old_day.slot_count, old_day.booked_count), (1, 0))
+        new_day = self.rollup(self.table1, 'day', self.available_slot)
+        self.assertEqual((new_day.slot_count, new_day.booked_count), (1, 1))
+
+    def test_rebuild_matches_incremental_and_keeps_cancellations(self):
+        """Test a rebuild reproduces the incrementally maintained counters"""
+        from .analytics import rebuild_rollups
+        from .group_booking import book_slots
+        from .models import UsageRollup
+        from .outbox import enqueue_booking_event
+
+        booking = Booking.objects.create(user=self.user, time_slot=self.available_slot, party_size=3)
+        slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2, time_start=self.tomorrow, time_length=timedelta(minutes=90)
+        )
+        book_slots(self.admin, [slot.id])
+        enqueue_booking_event('booking.cancelled', booking, self.available_slot)
+        booking.delete()
+        incremental = self.snapshot()
+
+        UsageRollup.objects.update(slot_count=0, booked_count=99)
+        rebuild_rollups(self.today.date() - timedelta(days=7), self.tomorrow.date())
+        self.assertEqual(
+            [row for row in self.snapshot() if any(row[4:])],
+            [row for row in incremental if any(row[4:])]
+        )
+
+    def test_archiving_leaves_rollups_alone(self):
+        """Test archived slots keep counting towards their rollups"""
+        from .archive import archive_slots_before
+
+        Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        before = self.snapshot()
+        archive_slots_before(timezone.now() + timedelta(days=2))
+        self.assertEqual(self.snapshot(), before)
+
+    def test_dashboard_reads_only_rollups(self):
+        """Test the analytics page never queries the slot or booking tables"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        Booking.objects.create(user=self.user, time_slot=self.available_slot)
+        self.client.login(username='admin', password='adminpass123')
+        self.client.get(reverse('staff_analytics'))
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse('staff_analytics'))
+        self.assertContains(response, 'Table 1')
+        self.assertContains(response, '50%')
+        self.assertFalse(any(
+            'bookings_bookingtimeslot' in query['sql'] or 'bookings_booking"' in query['sql']
+            for query in captured.captured_queries
+        ))
+
+
+class ForecastTests(BookingSystemTestCase):
+    """Tests for demand forecasting and forecast slot generation"""
+
+    def setUp(self):
+        super().setUp()
+        BookingTimeSlot.objects.all().delete()
+        # Four past Mondays: Table 1 is booked every evening, Table 2 sits
+        # empty beside it, and lunchtime slots never sell
+        self.next_monday = date(2025, 3, 3)
+        for weeks_back in range(1, 5):
+            monday = self.next_monday - timedelta(weeks=weeks_back)
+            evening = timezone.make_aware(datetime.combine(monday, datetime.min.time()) + timedelta(hours=19))
+            booked = BookingTimeSlot.objects.create(bookable_item=self.table1, time_start=evening, time_length=timedelta(hours=1), status='booked')
+            Booking.objects.create(user=self.user, time_slot=booked)
+            BookingTimeSlot.objects.create(bookable_item=self.table2, time_start=evening, time_length=timedelta(hours=1))
+            BookingTimeSlot.objects.create(bookable_item=self.table1, time_start=evening - timedelta(hours=7), time_length=timedelta(hours=1))
+
+    def test_proposal_follows_demand(self):
+        """Test busy hours get tables with headroom and dead hours get none"""
+        from .forecasting import propose_schedule
+
+        proposal = propose_schedule(self.next_monday, 1)
+        self.assertEqual({slot.hour for slot in proposal}, {19})
+        self.assertEqual([slot.item_name for slot in proposal], ['Table 1', 'Table 2'])
+        self.assertEqual(propose_schedule(self.next_monday + timedelta(days=1), 1), [])
+
+    def test_staff_can_generate_forecast_slots(self):
+        """Test POST creates the proposed slots through the importer"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(
+            reverse('staff_forecast_slots'),
+            data=json.dumps({'start': self.next_monday.isoformat(), 'days': 7, 'headroom': 0}),
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 200)
+        # Table 1 always sold out, so demand is taken to exceed one table
+        self.assertEqual(response.json()['created_count'], 2)
+        slots = BookingTimeSlot.objects.filter(time_start__gte=timezone.make_aware(datetime(2025, 3, 3)))
+        self.assertEqual(
+            sorted((slot.bookable_item.name, slot.local_date, slot.local_minute) for slot in slots),
+            [('Table 1', self.next_monday, 19 * 60), ('Table 2', self.next_monday, 19 * 60)]
+        )
+
+    def test_fit_is_vectorized_over_a_year(self):
+        """Test the seasonal fit weights recent weeks more heavily"""
+        import numpy as np
+        from .forecasting import DemandHistory, fit_demand
+
+        booked = np.zeros((2, 52, 7, 24))
+        opened = np.ones_like(booked)
+        booked[0, -4:, 0, 19] = 1
+        expected, rate, open_share = fit_demand(DemandHistory([1, 2], booked, opened))
+        self.assertEqual(expected.shape, (2, 7, 24))
+        self.assertGreater(expected[0, 0, 19], 4 / 52)
+        self.assertEqual(expected[1].sum(), 0)
+
+
+class WaitlistTests(BookingSystemTestCase):
+    """Tests for waitlists and handing cancelled slots to them"""
+
+    def setUp(self):
+        super().setUp()
+        self.slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table1,
+            time_start=self.tomorrow + timedelta(hours=4),
+            time_length=timedelta(hours=1),
+            status='booked'
+        )
+        self.booking = Booking.objects.create(user=self.user, time_slot=self.slot)
+        self.waiters = [
+            User.objects.create_user(username=f'waiter{i}', password='waitpass123', email=f'waiter{i}@test.com')
+            for i in range(2)
+        ]
+
+    def join(self, user, slot, **data):
+        self.client.login(username=user.username, password='waitpass123')
+        return self.client.post(
+            reverse('waitlist'),
+            data=json.dumps({'slot_id': slot.id, **data}),
+            content_type='application/json'
+        )
+
+    def test_waiters_queue_in_order(self):
+        """Test joining gives FIFO positions and only booked slots can be joined"""
+        self.assertEqual(self.join(self.waiters[0], self.slot).json()['position'], 1)
+        self.assertEqual(self.join(self.waiters[1], self.slot, party_size=2).json()['position'], 2)
+        self.assertEqual(self.join(self.waiters[1], self.slot).status_code, 409)
+
+        free_slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table2, time_start=self.slot.time_start, time_length=timedelta(hours=1)
+        )
+        self.assertEqual(self.join(self.waiters[1], free_slot).status_code, 409)
+
+        entries = self.client.get(reverse('waitlist')).json()['entries']
+        self.assertEqual([(e['slot_id'], e['position'], e['party_size']) for e in entries], [(self.slot.id, 2, 2)])
+
+    def test_cancellation_hands_slot_to_head_of_queue(self):
+        """Test the cancelled slot is booked for the first waiter in the same request"""
+        from .models import OutboxMessage, WaitlistEntry
+
+        self.join(self.waiters[0], self.slot, party_size=3, notes='Birthday')
+        self.join(self.waiters[1], self.slot)
+
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.delete(
+            reverse('user_bookings'),
+            data=json.dumps({'booking_id': self.booking.id}),
+            content_type='application/json'
+        )
+        self.assertTrue(response.json()['handed_to_waitlist'])
+
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'booked')
+        booking = Booking.objects.get(time_slot=self.slot)
+        self.assertEqual((booking.user, booking.party_size, booking.notes), (self.waiters[0], 3, 'Birthday'))
+        self.assertEqual(list(WaitlistEntry.objects.values_list('user', flat=True)), [self.waiters[1].id])
+        self.assertTrue(OutboxMessage.objects.filter(
+            event='booking.waitlist_allocated', payload__email='waiter0@test.com'
+        ).exists())
+
+    def test_priority_beats_arrival_order(self):
+        """Test staff-raised priority is served first on staff cancellation"""
+        from .models import WaitlistEntry
+
+        self.join(self.waiters[0], self.slot)
+        self.join(self.waiters[1], self.slot)
+        WaitlistEntry.objects.filter(user=self.waiters[1]).update(priority=5)
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.delete(
+            reverse('staff_cancel_booking'),
+            data=json.dumps({'slot_id': self.slot.id}),
+            content_type='application/json'
+        )
+        self.assertTrue(response.json()['handed_to_waitlist'])
+        self.assertEqual(Booking.objects.get(time_slot=self.slot).user, self.waiters[1])
+
+    def test_empty_waitlist_frees_slot(self):
+        """Test a cancellation with nobody waiting makes the slot available"""
+        self.join(self.waiters[0], self.slot)
+        self.client.delete(reverse('waitlist'), data=json.dumps({'slot_id': self.slot.id}), content_type='application/json')
+
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.delete(
+            reverse('user_bookings'),
+            data=json.dumps({'booking_id': self.booking.id}),
+            content_type='application/json'
+        )
+        self.assertFalse(response.json()['handed_to_waitlist'])
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.status, 'available')
+
+    @override_settings(BOOKING_QUOTAS={'per_day': 1, 'per_week': None, 'active': None})
+    def test_waiter_over_quota_is_passed_over(self):
+        """Test the slot goes to the next waiter when the head has since hit a quota, and the head keeps their place"""
+        from .models import WaitlistEntry
+
+        self.join(self.waiters[0], self.slot)
+        self.join(self.waiters[1], self.slot)
+        same_day = BookingTimeSlot.objects.create(
+            bookable_item=self.table2, time_start=self.slot.time_start, time_length=timedelta(hours=1)
+        )
+        Booking.objects.create(user=self.waiters[0], time_slot=same_day)
+
+        self.client.login(username='testuser', password='testpass123')
+        self.client.delete(reverse('user_bookings'), data=json.dumps({'booking_id': self.booking.id}),
+                           content_type='application/json')
+        booking = Booking.objects.get(time_slot=self.slot)
+        self.assertEqual((booking.user, booking.slot_start), (self.waiters[1], self.slot.time_start))
+        self.assertEqual(list(WaitlistEntry.objects.values_list('user', flat=True)), [self.waiters[0].id])
+
+
+class AuditLogTests(BookingSystemTestCase):
+    """Tests for the buffered slot and booking audit log"""
+
+    def setUp(self):
+        super().setUp()
+        from . import audit
+        from .models import AuditEvent
+        # The buffer is per process, so drop anything earlier tests left in it
+        audit.flush()
+        AuditEvent.objects.all().delete()
+
+    def test_slot_history_survives_deletion(self):
+        """Test a slot's whole life can be rebuilt after it is deleted"""
+        self.client.login(username='admin', password='adminpass123')
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = BookingTimeSlot.objects.create(
+                bookable_item=self.table2, time_start=self.tomorrow + timedelta(hours=5), time_length=timedelta(hours=1)
+            )
+            self.client.post(reverse('staff_book_slot'), data=json.dumps({
+                'slot_id': slot.id, 'customer_name': 'Walk In'
+            }), content_type='application/json')
+            self.client.delete(reverse('staff_cancel_booking'), data=json.dumps({'slot_id': slot.id}),
+                               content_type='application/json')
+            self.client.delete(reverse('delete_slot'), data=json.dumps({'slot_id': slot.id}),
+                               content_type='application/json')
+        self.assertFalse(BookingTimeSlot.objects.filter(id=slot.id).exists())
+
+        response = self.client.get(reverse('staff_slot_history', args=[slot.id]))
+        self.assertEqual(response.status_code, 200)
+        events = response.json()['events']
+        self.assertEqual(
+            [(e['event'], e['state']) for e in events],
+            [('slot.created', 'available'), ('booking.created', 'booked'),
+             ('booking.cancelled', 'available'), ('slot.deleted', 'deleted')]
+        )
+        self.assertEqual([e['actor'] for e in events[1:]], ['admin'] * 3)
+        self.assertEqual(events[1]['booking_id'], events[2]['booking_id'])
+        self.assertEqual(self.client.get(reverse('staff_slot_history', args=[slot.id + 1000])).status_code, 404)
+
+    def test_rolled_back_changes_are_not_logged(self):
+        """Test events are only buffered once their transaction commits"""
+        from django.db import transaction
+        from .audit import slot_history
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    slot = BookingTimeSlot.objects.create(
+                        bookable_item=self.table2, time_start=self.tomorrow, time_length=timedelta(hours=1)
+                    )
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(slot_history(slot.id), [])
+
+    @override_settings(AUDIT_BATCH_SIZE=3, AUDIT_FLUSH_SECONDS=3600)
+    def test_events_are_written_in_batches(self):
+        """Test the buffer writes one insert per full batch"""
+        from . import audit
+        from .models import AuditEvent
+
+        for slot_id in (1, 2):
+            audit.buffer.append((AuditEvent.SLOT_CREATED, slot_id, None, None, None, timezone.now()))
+        self.assertFalse(AuditEvent.objects.exists())
+        with self.assertNumQueries(1):
+            audit.buffer.append((AuditEvent.SLOT_CREATED, 3, None, None, None, timezone.now()))
+        self.assertEqual(AuditEvent.objects.count(), 3)
+        self.assertEqual(len(audit.buffer), 0)
+
+    def test_archiving_is_logged_as_archived(self):
+        """Test archived slots get one archive event rather than deletes"""
+        from .archive import archive_slots_before
+        from .audit import slot_history
+
+        past = timezone.now() - timedelta(days=200)
+        with self.captureOnCommitCallbacks(execute=True):
+            slot = BookingTimeSlot.objects.create(bookable_item=self.table2, time_start=past, time_length=timedelta(hours=1))
+            Booking.objects.create(user=self.user, time_slot=slot)
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_slots_before(timezone.now() - timedelta(days=100))
+        self.assertEqual(
+            [entry['event'] for entry in slot_history(slot.id)],
+            ['slot.created', 'booking.created', 'slot.archived']
+        )
+
+    def test_prune_removes_only_old_events(self):
+        """Test prune_audit_log rotates out events past the retention period"""
+        from .audit import prune_audit_log
+        from .models import AuditEvent
+
+        now = timezone.now()
+        AuditEvent.objects.bulk_create([
+            AuditEvent(event=AuditEvent.SLOT_CREATED, slot_id=slot_id, at=now - timedelta(days=days))
+            for slot_id, days in [(1, 500), (2, 400), (3, 10)]
+        ])
+        self.assertEqual(prune_audit_log(batch_size=1), 2)
+        self.assertEqual(list(AuditEvent.objects.values_list('slot_id', flat=True)), [3])
+
+
+class SlotVersionTests(BookingSystemTestCase):
+    """Tests for optimistic concurrency control on time slots"""
+
+    def test_compare_and_swap_detects_lost_update(self):
+        """Test the second writer of two who read the same version loses"""
+        first = BookingTimeSlot.objects.get(id=self.available_slot.id)
+        second = BookingTimeSlot.objects.get(id=self.available_slot.id)
+
+        self.assertTrue(first.save_if_unchanged(status='pending'))
+        self.assertEqual(first.version, 2)
+        self.assertFalse(second.save_if_unchanged(status='booked'))
+        self.available_slot.refresh_from_db()
+        self.assertEqual((self.available_slot.status, self.available_slot.version), ('pending', 2))
+
+    def test_compare_and_swap_writes_only_changed_columns(self):
+        """Test the UPDATE sets just the changed fields and carries a version predicate"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as queries:
+            self.available_slot.save_if_unchanged(status='pending')
+        sql = queries.captured_queries[0]['sql']
+        self.assertIn('"version" = 1', sql)
+        self.assertNotIn('"time_start"', sql)
+        self.assertNotIn('"bookable_item_id"', sql)
+
+    def test_plain_save_bumps_version(self):
+        """Test saves that skip compare-and-swap still invalidate stale readers"""
+        stale = BookingTimeSlot.objects.get(id=self.available_slot.id)
+        self.available_slot.status = 'pending'
+        self.available_slot.save()
+        self.assertEqual(self.available_slot.version, 2)
+        self.assertFalse(stale.save_if_unchanged(status='booked'))
+
+    def test_delete_locks_the_row_at_the_version_read(self):
+        """Test a stale delete is refused and a current one locks the slot before deleting it"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .concurrency import SlotConflict, delete_slot_if_unchanged
+
+        stale = BookingTimeSlot.objects.get(id=self.available_slot.id)
+        self.available_slot.save_if_unchanged(status='pending')
+        with self.assertRaises(SlotConflict):
+            delete_slot_if_unchanged(stale)
+        self.assertTrue(BookingTimeSlot.objects.filter(id=self.available_slot.id).exists())
+
+        with CaptureQueriesContext(connection) as queries:
+            delete_slot_if_unchanged(self.available_slot)
+        select = next(query['sql'] for query in queries.captured_queries if query['sql'].startswith('SELECT'))
+        self.assertIn('"version" = 2', select)
+        self.assertFalse(BookingTimeSlot.objects.filter(id=self.available_slot.id).exists())
+
+    def test_stale_dashboard_gets_conflict_with_fresh_state(self):
+        """Test a staff action against an old version is refused with the current slot"""
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(reverse('staff_book_slot'), data=json.dumps({
+            'slot_id': self.available_slot.id, 'customer_name': 'First', 'version': 1
+        }), content_type='application/json')
+        self.assertEqual(response.json()['version'], 2)
+
+        response = self.client.delete(reverse('staff_cancel_booking'), data=json.dumps({
+            'slot_id': self.available_slot.id, 'version': 1
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['slot']['version'], 2)
+        self.assertEqual(response.json()['slot']['booking_user'], 'First')
+        self.assertTrue(Booking.objects.filter(time_slot=self.available_slot).exists())
+
+        response = self.client.delete(reverse('delete_slot'), data=json.dumps({
+            'slot_id': self.available_slot.id, 'version': 1
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(BookingTimeSlot.objects.filter(id=self.available_slot.id).exists())
+
+        response = self.client.delete(reverse('staff_cancel_booking'), data=json.dumps({
+            'slot_id': self.available_slot.id, 'version': 2
+        }), content_type='application/json')
+        self.assertEqual(response.json()['version'], 3)
+
+
+class BlackoutTests(BookingSystemTestCase):
+    """Tests for blocking items out for maintenance windows"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='admin', password='adminpass123')
+        self.afternoon = self.tomorrow + timedelta(hours=1)
+        self.slots = [
+            BookingTimeSlot.objects.create(
+                bookable_item=item, time_start=self.afternoon + timedelta(hours=hour), time_length=timedelta(hours=1)
+            )
+            for item in (self.table1, self.table2) for hour in range(4)
+        ]
+        self.clash = self.slots[1]
+        self.clash.status = 'booked'
+        self.clash.save()
+        Booking.objects.create(user=self.user, time_slot=self.clash, customer_name='Ada')
+
+    def block(self, **data):
+        return self.client.post(reverse('staff_blackouts'), data=json.dumps({
+            'item_ids': [self.table1.id],
+            'start': (self.afternoon + timedelta(minutes=30)).isoformat(),
+            'end': (self.afternoon + timedelta(hours=3)).isoformat(),
+            'reason': 'New floor',
+            **data
+        }), content_type='application/json')
+
+    def test_blackout_blocks_overlapping_slots_and_reports_clashes(self):
+        """Test one call blocks the window's free slots and lists bookings in it"""
+        response = self.block()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        # The 1st slot overlaps the window's start; the 4th starts at its end
+        self.assertEqual(data['blocked_count'], 2)
+        self.assertEqual([(c['slot_id'], c['customer_name']) for c in data['clashes']], [(self.clash.id, 'Ada')])
+
+        statuses = dict(BookingTimeSlot.objects.filter(bookable_item=self.table1, time_start__gte=self.afternoon)
+                        .values_list('time_start', 'status'))
+        self.assertEqual(list(statuses.values()), ['blocked', 'booked', 'blocked', 'available'])
+        self.assertFalse(BookingTimeSlot.objects.filter(bookable_item=self.table2, status='blocked').exists())
+
+        response = self.client.post(reverse('book_time_slot'), data=json.dumps({'slot_id': self.slots[0].id}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_blackout_is_lifted_in_one_call(self):
+        """Test lifting restores the blocked slots and leaves bookings alone"""
+        blackout_id = self.block().json()['blackout_id']
+        self.assertEqual(len(self.client.get(reverse('staff_blackouts')).json()['blackouts']), 1)
+
+        response = self.client.delete(reverse('staff_blackouts'), data=json.dumps({'blackout_id': blackout_id}),
+                                      content_type='application/json')
+        self.assertEqual(response.json()['unblocked_count'], 2)
+        self.assertFalse(BookingTimeSlot.objects.filter(status='blocked').exists())
+        self.assertFalse(BookingTimeSlot.objects.filter(blackout__isnull=False).exists())
+        self.clash.refresh_from_db()
+        self.assertEqual(self.clash.status, 'booked')
+        self.assertEqual(self.client.get(reverse('staff_blackouts')).json()['blackouts'], [])
+
+    def test_cancelled_clash_stays_blocked(self):
+        """Test a booking cancelled during a blackout doesn't reopen its slot"""
+        self.block()
+        response = self.client.delete(reverse('staff_cancel_booking'), data=json.dumps({'slot_id': self.clash.id}),
+                                      content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.clash.refresh_from_db()
+        self.assertEqual(self.clash.status, 'blocked')
+
+    def test_blocking_is_set_based(self):
+        """Test the number of queries doesn't grow with the number of slots"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from .blackouts import create_blackout
+
+        start, end = self.afternoon - timedelta(hours=1), self.afternoon + timedelta(hours=2)
+        with CaptureQueriesContext(connection) as small:
+            create_blackout([self.table2.id], start, end)
+        with CaptureQueriesContext(connection) as large:
+            create_blackout([self.table1.id, self.table2.id], start, end + timedelta(hours=2))
+        self.assertEqual(len(small), len(large))
+
+    def test_lifting_one_of_two_overlapping_windows_keeps_slots_blocked(self):
+        """Test slots the other window still covers stay blocked and move to it"""
+        from .blackouts import create_blackout, lift_blackout
+
+        first, _, _ = create_blackout([self.table1.id], self.afternoon, self.afternoon + timedelta(hours=3))
+        second, _, _ = create_blackout([self.table1.id, self.table2.id], self.afternoon + timedelta(hours=2),
+                                       self.afternoon + timedelta(hours=4))
+        self.assertEqual(lift_blackout(first), 1)
+
+        self.slots[0].refresh_from_db()
+        self.assertEqual((self.slots[0].status, self.slots[0].blackout_id), ('available', None))
+        self.slots[2].refresh_from_db()
+        self.assertEqual((self.slots[2].status, self.slots[2].blackout_id), ('blocked', second.id))
+        self.clash.refresh_from_db()
+        self.assertEqual((self.clash.status, self.clash.blackout_id), ('booked', None))
+
+        self.assertEqual(lift_blackout(second), 4)
+        self.assertFalse(BookingTimeSlot.objects.filter(status='blocked').exists())
+
+    def test_slots_created_in_a_window_are_blocked(self):
+        """Test slots added by staff or an import inside a window in force start out blocked"""
+        from .blackouts import create_blackout, lift_blackout
+        from .importer import import_slot_rows
+
+        window, _, _ = create_blackout([self.table1.id], self.afternoon, self.afternoon + timedelta(hours=3))
+        slot = BookingTimeSlot.objects.create(
+            bookable_item=self.table1, time_start=self.afternoon + timedelta(minutes=30), time_length=timedelta(hours=1)
+        )
+        self.assertEqual((slot.status, slot.blackout_id), ('blocked', window.id))
+        outside = BookingTimeSlot.objects.create(
+            bookable_item=self.table2, time_start=self.afternoon + timedelta(minutes=30), time_length=timedelta(hours=1)
+        )
+        self.assertEqual((outside.status, outside.blackout_id), ('available', None))
+
+        local = timezone.localtime(self.afternoon + timedelta(hours=1, minutes=30))
+        result = import_slot_rows([
+            {'table': 'Table 1', 'date': local.strftime('%Y-%m-%d'), 'start_time': local.strftime('%H:%M')},
+            {'table': 'Table 2', 'date': local.strftime('%Y-%m-%d'), 'start_time': local.strftime('%H:%M')},
+        ])
+        self.assertEqual(result.created, 2)
+        imported = dict(BookingTimeSlot.objects.filter(time_start=self.afternoon + timedelta(hours=1, minutes=30))
+                        .values_list('bookable_item__name', 'blackout_id'))
+        self.assertEqual(imported, {'Table 1': window.id, 'Table 2': None})
+
+        self.assertEqual(lift_blackout(window), 4)
+        self.assertFalse(BookingTimeSlot.objects.filter(status='blocked').exists())
+
+    def test_invalid_window_is_rejected(self):
+        """Test an empty or reversed range is a 400"""
+        response = self.block(end=self.afternoon.isoformat())
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(BookingTimeSlot.objects.filter(status='blocked').exists())
+
+
+class SlotStatusTests(BookingSystemTestCase):
+    """Tests for keeping slot status in step with bookings"""
+
+    def test_reconcile_fixes_drift_both_ways(self):
+        """Test slots are marked booked or freed to match their bookings"""
+        from .slot_status import reconcile_slot_status
+
+        Booking.objects.create(user=self.user, time_slot=self.available_slot, customer_name='Ada')
+        scanned, marked, freed = reconcile_slot_status(batch_size=1)
+        self.assertEqual((scanned, marked, freed), (2, 1, 1))
+        self.available_slot.refresh_from_db()
+        self.booked_slot.refresh_from_db()
+        self.assertEqual(self.available_slot.status, 'booked')
+        self.assertEqual(self.booked_slot.status, 'available')
+        self.assertEqual(reconcile_slot_status(), (2, 0, 0))
+
+    def test_dry_run_changes_nothing(self):
+        """Test the command reports drift without fixing it when asked"""
+        from io import StringIO
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command('reconcile_slots', dry_run=True, stdout=out)
+        self.assertIn("Would fix 0 slots with a booking but not marked booked and 1 slots", out.getvalue())
+        self.booked_slot.refresh_from_db()
+        self.assertEqual(self.booked_slot.status, 'booked')
+
+        call_command('reconcile_slots', stdout=StringIO())
+        self.booked_slot.refresh_from_db()
+        self.assertEqual(self.booked_slot.status, 'available')
+
+    def test_clean_rejects_status_without_booking(self):
+        """Test a slot can't be set booked by hand, or freed while it has a booking"""
+        from django.core.exceptions import ValidationError
+
+        with self.assertRaises(ValidationError):
+            self.booked_slot.full_clean()
+        Booking.objects.create(user=self.user, time_slot=self.available_slot, customer_name='Ada')
+        with self.assertRaises(ValidationError):
+            self.available_slot.full_clean()
+
+    def test_import_rejects_booked_status(self):
+        """Test imported slots can't claim to be booked"""
+        import io
+        from .importer import import_slots_csv
+
+        result = import_slots_csv(io.StringIO(
+            "table,date,start_time,status\nTable 1,2025-09-01,12:00,booked\nTable 1,2025-09-01,13:00,pending\n"
+        ))
+        self.assertEqual(result.created, 1)
+        self.assertEqual([e['line'] for e in result.errors], [2])
+
+    def test_deleting_a_user_frees_their_slots(self):
+        """Test slots booked by a deleted user are available again"""
+        Booking.objects.create(user=self.user, time_slot=self.booked_slot, customer_name='Ada')
+        self.user.delete()
+        self.booked_slot.refresh_from_db()
+        self.assertEqual(self.booked_slot.status, 'available')
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class CatalogTests(BookingSystemTestCase):
+    """Tests for the per-process bookable item catalog"""
+
+    def test_item_lookups_skip_the_database_once_loaded(self):
+        """Test names and ids resolve from memory after the first load"""
+        from .catalog import get_catalog
+
+        get_catalog()
+        with self.assertNumQueries(0):
+            catalog = get_catalog()
+            self.assertEqual(catalog.item(self.table1.id).name, 'Table 1')
+            self.assertEqual(catalog.get_or_create('Table 1'), (catalog.item(self.table1.id), False))
+
+    def test_saving_an_item_invalidates_the_catalog(self):
+        """Test a rename is seen on the next lookup"""
+        from .catalog import get_catalog
+
+        get_catalog()
+        self.table1.name = 'Window Table'
+        self.table1.save()
+        self.assertEqual(get_catalog().item(self.table1.id).name, 'Window Table')
+
+    def test_other_workers_changes_reload_the_catalog(self):
+        """Test bumping the shared version makes this process reload"""
+        from django.core.cache import cache
+        from .catalog import CATALOG_VERSION_KEY, get_catalog
+
+        get_catalog()
+        # As if another worker renamed it: no signal reaches this process
+        BookableItem.objects.filter(id=self.table1.id).update(name='Patio')
+        self.assertEqual(get_catalog().item(self.table1.id).name, 'Table 1')
+        cache.incr(CATALOG_VERSION_KEY)
+        self.assertEqual(get_catalog().item(self.table1.id).name, 'Patio')
+
+    @override_settings(CACHE_IS_SHARED=None, CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}
+    })
+    def test_per_process_cache_never_keeps_the_catalog(self):
+        """Test without a shared cache other workers' changes are seen at once, and deploy checks warn"""
+        from .caching import check_shared_cache
+        from .catalog import get_catalog
+
+        get_catalog()
+        BookableItem.objects.filter(id=self.table1.id).update(name='Patio')
+        self.assertEqual(get_catalog().item(self.table1.id).name, 'Patio')
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['bookings.W001'])
+
+    def test_evicted_version_does_not_come_back(self):
+        """Test a bump after the shared version was evicted still makes workers reload"""
+        from django.core.cache import cache
+        from .catalog import CATALOG_VERSION_KEY, get_catalog
+
+        cached = get_catalog()
+        cache.delete(CATALOG_VERSION_KEY)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.table1.save()
+        self.assertIsNotNone(cache.get(CATALOG_VERSION_KEY))
+        self.assertNotEqual(cache.get(CATALOG_VERSION_KEY), cached.version)
+        # Seeding after an eviction doesn't repeat a version either
+        cache.delete(CATALOG_VERSION_KEY)
+        self.assertNotEqual(get_catalog().version, cached.version)
+
+    def test_pages_read_item_names_from_the_catalog(self):
+        """Test the slot list and staff slot creation resolve items by name without a join"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(reverse('staff_create_slot'), data=json.dumps({
+            'table': 'Table 1', 'date': self.tomorrow.strftime('%Y-%m-%d'), 'start_time': '22:00'
+        }), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(BookableItem.objects.filter(name='Table 1').count(), 1)
+
+        self.client.get(reverse('available_time_slots'), {'date': self.tomorrow.strftime('%Y-%m-%d')})
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('available_time_slots'), {'date': self.tomorrow.strftime('%Y-%m-%d')})
+        self.assertContains(response, 'Table 1')
+        self.assertFalse(any('bookings_bookableitem' in query['sql'] for query in queries.captured_queries))
+
+
+class BookingQuotaTests(BookingSystemTestCase):
+    """Tests for per-user booking quotas"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.login(username='testuser', password='testpass123')
+        self.evening = [
+            BookingTimeSlot.objects.create(
+                bookable_item=self.table1, time_start=self.tomorrow + timedelta(hours=hour), time_length=timedelta(hours=1)
+            )
+            for hour in (4, 5, 6)
+        ]
+        self.noon = BookingTimeSlot.objects.create(
+            bookable_item=self.table2, time_start=self.tomorrow, time_length=timedelta(hours=1)
+        )
+
+    def book(self, slot):
+        return self.client.post(reverse('book_time_slot'), data=json.dumps({'slot_id': slot.id}),
+                                content_type='application/json')
+
+    @override_settings(BOOKING_QUOTAS={'per_day': 1, 'per_week': None, 'active': None})
+    def test_quota_rejects_before_touching_the_slot(self):
+        """Test a booking over the daily quota is refused and the slot left as it was"""
+        self.assertEqual(self.book(self.noon).status_code, 200)
+        version = self.evening[0].version
+
+        response = self.book(self.evening[0])
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['quota'], 'per_day')
+        self.evening[0].refresh_from_db()
+        self.assertEqual((self.evening[0].status, self.evening[0].version), ('available', version))
+
+    @override_settings(BOOKING_QUOTAS={'per_day': 2, 'per_week': None, 'active': None})
+    def test_each_slot_booked_together_counts(self):
+        """Test a group booking uses one booking of the quota per slot"""
+        response = self.client.post(reverse('book_time_slots'), data=json.dumps({
+            'slot_ids': [slot.id for slot in self.evening]
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+        response = self.client.post(reverse('book_time_slots'), data=json.dumps({
+            'slot_ids': [slot.id for slot in self.evening[:2]]
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.book(self.noon).status_code, 403)
+
+    @override_settings(BOOKING_QUOTAS={'per_day': 1, 'per_week': None, 'active': None})
+    def test_group_is_checked_on_every_day_it_touches(self):
+        """Test a group whose later slot falls on a full day is refused"""
+        next_day = [
+            BookingTimeSlot.objects.create(
+                bookable_item=self.table2, time_start=self.tomorrow + timedelta(days=1, hours=hour),
+                time_length=timedelta(hours=1)
+            )
+            for hour in (0, 1)
+        ]
+        self.assertEqual(self.book(next_day[1]).status_code, 200)
+
+        response = self.client.post(reverse('book_time_slots'), data=json.dumps({
+            'slot_ids': [self.noon.id, next_day[0].id]
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Booking.objects.filter(time_slot=self.noon).exists())
+
+    @override_settings(BOOKING_QUOTAS={'per_day': None, 'per_week': None, 'active': 1})
+    def test_active_quota_ignores_past_bookings_and_staff(self):
+        """Test only upcoming bookings count, and staff are never limited"""
+        past = BookingTimeSlot.objects.create(
+            bookable_item=self.table1, time_start=timezone.now() - timedelta(days=1),
+            time_length=timedelta(hours=1), status='booked'
+        )
+        Booking.objects.create(user=self.user, time_slot=past)
+        self.assertEqual(self.book(self.noon).status_code, 200)
+        self.assertEqual(self.book(self.evening[0]).json()['quota'], 'active')
+
+        self.client.login(username='admin', password='adminpass123')
+        self.assertEqual(self.book(self.evening[0]).status_code, 200)
+        self.assertEqual(self.book(self.evening[1]).status_code, 200)
+
+    @override_settings(BOOKING_QUOTAS={'per_day': 1, 'per_week': None, 'active': None})
+    def test_days_are_the_venues_days(self):
+        """Test two slots on one Auckland day count against one day's quota though their UTC dates differ"""
+        from datetime import time
+        from zoneinfo import ZoneInfo
+        from .models import Venue
+        from .quotas import QuotaExceeded, check_quota
+        from .tenancy import clear_venue_timezones, use_venue
+
+        clear_venue_timezones()
+        self.addCleanup(clear_venue_timezones)
+        auckland = ZoneInfo('Pacific/Auckland')
+        venue = Venue.objects.create(name='Harbour', slug='harbour', timezone='Pacific/Auckland')
+        day = (timezone.now() + timedelta(days=3)).astimezone(auckland).date()
+        early, late = (timezone.make_aware(datetime.combine(day, clock), auckland) for clock in (time(0, 30), time(23)))
+        self.assertNotEqual(early.astimezone(timezone.utc).date(), late.astimezone(timezone.utc).date())
+
+        with use_venue(venue.id):
+            item = BookableItem.objects.create(name='Harbour Table')
+            slot = BookingTimeSlot.objects.create(bookable_item=item, time_start=early, time_length=timedelta(hours=1))
+            Booking.objects.create(user=self.user, time_slot=slot)
+            with self.assertRaises(QuotaExceeded):
+                check_quota(self.user, [late])
+            check_quota(self.user, [late + timedelta(hours=2)])
+
+    def test_quota_check_is_a_fixed_number_of_queries(self):
+        """Test every quota is counted in one query however many bookings the user has"""
+        from .quotas import check_quota
+
+        from .tenancy import current_venue_id, get_venue_timezone
+
+        for slot in self.evening:
+            Booking.objects.create(user=self.user, time_slot=slot)
+        # The venue's timezone is cached per process after the first read
+        get_venue_timezone(current_venue_id())
+        with self.assertNumQueries(2):
+            check_quota(self.user, [self.noon.time_start])
+
+    def test_moving_a_booked_slot_moves_its_quota_time(self):
+        """Test the booking's copy of the start time follows the slot"""
+        booking = Booking.objects.create(user=self.user, time_slot=self.evening[0])
+        self.evening[0].status = 'booked'
+        self.evening[0].time_start += timedelta(days=3)
+        self.evening[0].save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.slot_start, self.evening[0].time_start)
+
+    def test_moving_a_booking_to_another_slot_moves_its_quota_time(self):
+        """Test a booking given another slot takes that slot's start, in code and in the admin"""
+        booking = Booking.objects.create(user=self.user, time_slot=self.evening[0])
+        booking = Booking.objects.get(id=booking.id)
+        booking.time_slot_id = self.evening[1].id
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.slot_start, self.evening[1].time_start)
+
+        self.client.login(username='admin', password='adminpass123')
+        response = self.client.post(reverse('admin:bookings_booking_change', args=[booking.id]), {
+            'user': self.user.id, 'time_slot': self.noon.id, 'customer_name': 'Ada', 'customer_phone': '',
+            'customer_email': '', 'party_size': 1, 'notes': '',
+        })
+        self.assertEqual(response.status_code, 302)
+        booking.refresh_from_db()
+        self.assertEqual((booking.time_slot_id, booking.slot_start), (self.noon.id, self.noon.time_start))
@@ -5,14 +5,21 @@ urlpatterns = [
     path('', views.index, name='booking'),
     path('available-time-slots/', views.available_time_slots, name='available_time_slots'),
     path('book-time-slot/', views.book_time_slot, name='book_time_slot'),
+    path('book-time-slots/', views.book_time_slots, name='book_time_slots'),
+    path('book-for-party/', views.book_for_party, name='book_for_party'),
+    path('waitlist/', views.waitlist, name='waitlist'),
     path('user-bookings/', views.user_bookings, name='user_bookings'),
     path('staff-dashboard/', views.staff_dashboard, name='staff_dashboard'),
+    path('staff-analytics/', views.staff_analytics, name='staff_analytics'),
    
     # Staff management URLs
     path('staff-create-slot/', views.staff_create_slot, name='staff_create_slot'),
     path('staff-cancel-booking/', views.staff_cancel_booking, name='staff_cancel_booking'),
     path('staff-book-slot/', views.staff_book_slot, name='staff_book_slot'),
     path('staff-create-template-slots/', views.staff_create_template_slots, name='staff_create_template_slots'),
+    path('staff-import-slots/', views.staff_import_slots, name='staff_import_slots'),
+    path('staff-forecast-slots/', views.staff_forecast_slots, name='staff_forecast_slots'),
+    path('staff-blackouts/', views.staff_blackouts, name='staff_blackouts'),
     
     # Template management and slot deletion URLs
     path('delete-slot/', views.delete_slot, name='delete_slot'),
@@ -20,4 +27,20 @@ urlpatterns = [
     path('get-saved-templates/', views.get_saved_templates, name='get_saved_templates'),
     path('delete-template/', views.delete_template, name='delete_template'),
     path('delete-all-slots-for-day/', views.delete_all_slots_for_day, name='delete_all_slots_for_day'),
+    path('staff-slot-history/<int:slot_id>/', views.staff_slot_history, name='staff_slot_history'),
+
+    # Export URLs
+    path('staff-export-slots/', views.staff_export_slots, name='staff_export_slots'),
+    path('staff-export-bookings/', views.staff_export_bookings, name='staff_export_bookings'),
+    path('calendar/<str:token>.ics', views.user_calendar_feed, name='user_calendar_feed'),
+
+    # Request profiling URLs
+    path('staff-profiles/', views.staff_profiles, name='staff_profiles'),
+    path('staff-profiles/<str:capture_id>/', views.staff_profile_detail, name='staff_profile_detail'),
+    path('staff-profiles/<str:capture_id>.prof', views.staff_profile_download, name='staff_profile_download'),
+
+    # JSON API, versioned by path so v1 clients keep working when v2 arrives
+    path('api/v1/items/', views.api_v1_items, name='api_v1_items'),
+    path('api/v1/slots/', views.api_v1_slots, name='api_v1_slots'),
+    path('api/v1/bookings/', views.api_v1_bookings, name='api_v1_bookings'),
 ]
\ No newline at end of file
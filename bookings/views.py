@@ -1,43 +1,47 @@
 from django.contrib.auth.decorators import user_passes_test
+from django.contrib.auth.models import User
 
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse, Http404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, condition
+from django.urls import reverse
 from django.utils import timezone
 from django.db import transaction
-from datetime import datetime
-from .models import BookingTimeSlot, Booking, BookableItem
+from django.db.models import Count, Max
+from datetime import datetime, timedelta
+from .models import ArchivedBooking, ArchivedSlot, BlackoutWindow, BookingTimeSlot, Booking
+from .idempotency import idempotent
+from .importer import import_slot_rows, import_slots_csv
+from .ratelimit import concurrency_limit, rate_limit
+from .outbox import enqueue_booking_event, enqueue_booking_events
+from . import analytics
+from .assignment import assign_and_book
+from .forecasting import DEFAULT_HEADROOM, create_proposed_slots, propose_schedule, summarize
+from .group_booking import GroupBookingError, book_slots, contiguous_slot_ids
+from .audit import slot_history
+from .concurrency import SlotConflict, conflict_response, expected_version, lock_slot_if_unchanged, update_slot
+from .waitlist import WaitlistError, cancel_booking, join_waitlist, leave_waitlist, user_waitlist
+from .profiling import capture_profile_path, list_captures, load_capture
+from .api import (
+    BOOKING_SERIALIZER, ITEM_SERIALIZER, SLOT_SERIALIZER, api_error, api_response,
+    booking_queryset, item_queryset, keyset_page, parse_api_time, slot_queryset,
+)
+from .blackouts import create_blackout, lift_blackout
+from .catalog import get_catalog
+from .tenancy import venue_staff_required
+from .quotas import QuotaExceeded, check_quota
+from django.utils.dateparse import parse_datetime
+from .exports import (
+    BOOKING_CSV_HEADER, SLOT_CSV_HEADER, booking_csv_rows, booking_ics_events,
+    calendar_feed_token, parse_export_range, slot_csv_rows, slot_ics_events,
+    stream_csv, stream_ics, user_id_from_feed_token, with_archive,
+)
+import csv
+import io
 import json
 
-# Staff dashboard: calendar and slot management
-@user_passes_test(lambda u: u.is_staff)
-def staff_dashboard(request):
-    from .models import BookableItem, BookingTimeSlot, Booking
-    from datetime import timedelta
-    import json
-    message = None
-    # Get all slots for calendar
-    all_slots = BookingTimeSlot.objects.select_related('bookable_item').all()
-    # Prepare slot data for FullCalendar
-    slot_events = []
-    for slot in all_slots:
-        status = 'Booked' if hasattr(slot, 'booking') and Booking.objects.filter(time_slot=slot).exists() else 'Available'
-        slot_events.append({
-            'title': f"{slot.bookable_item.name} ({status})",
-            'start': slot.time_start.strftime('%Y-%m-%dT%H:%M:%S'),
-            'end': (slot.time_start + slot.time_length).strftime('%Y-%m-%dT%H:%M:%S'),
-            'extendedProps': {
-                'status': status,
-                'table': slot.bookable_item.name,
-                'slot_id': slot.id
-            }
-        })
-    return render(request, "staff_dashboard.html", {
-        "slot_events": json.dumps(slot_events),
-        "message": message
-    })
 
 def index(request):
     return render(request, 'index.html')
@@ -45,6 +49,8 @@ def index(request):
 
 @require_http_methods(["GET", "DELETE"])
 @csrf_exempt
+@concurrency_limit()
+@idempotent
 def user_bookings(request):
     """
     Return user's current and future bookings as a partial template.
@@ -77,26 +83,29 @@ def user_bookings(request):
             with transaction.atomic():
                 # Get the time slot before deleting the booking
                 time_slot = booking.time_slot
-                
-                # Delete the booking
-                booking.delete()
-                
-                # Update the time slot status back to available
-                time_slot.status = 'available'
-                time_slot.save()
+                # The slot goes to the head of its waitlist, if anyone is waiting
+                handed_over = cancel_booking(booking, time_slot, expected_version(data))
             
             return JsonResponse({
                 'success': True,
                 'message': 'Booking cancelled successfully!',
                 'slot_time': time_slot.time_start.strftime('%Y-%m-%d %H:%M'),
-                'bookable_item': time_slot.bookable_item.name
+                'bookable_item': time_slot.bookable_item.name,
+                'handed_to_waitlist': handed_over is not None
             })
             
+        except SlotConflict as e:
+            return conflict_response(e)
         except json.JSONDecodeError:
             return JsonResponse({
                 'success': False,
                 'error': 'Invalid JSON data'
             }, status=400)
+        except ValueError as e:
+            return JsonResponse({
+                'success': False,
+                'error': str(e)
+            }, status=400)
         except Exception as e:
             return JsonResponse({
                 'success': False,
@@ -110,10 +119,14 @@ def user_bookings(request):
     ).select_related('time_slot__bookable_item').order_by('time_slot__time_start')
     
     return render(request, 'user-bookings.html', {
-        'user_bookings': get_user_bookings
+        'user_bookings': get_user_bookings,
+        'calendar_feed_url': request.build_absolute_uri(
+            reverse('user_calendar_feed', args=[calendar_feed_token(request.user)])
+        ),
     })
 
 
+@rate_limit('availability')
 def available_time_slots(request):
     # Get date from query parameter, default to today if not provided
     date_str = request.GET.get('date')
@@ -124,21 +137,30 @@ def available_time_slots(request):
             filter_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         except ValueError:
             # If date format is invalid, default to today
-            filter_date = timezone.now().date()
+            filter_date = timezone.localdate()
     else:
         # Default to today if no date parameter provided
-        filter_date = timezone.now().date()
+        filter_date = timezone.localdate()
     
-    slots = BookingTimeSlot.objects.filter(time_start__date=filter_date)
+    # local_date is the venue's calendar date, so this is an indexed equality
+    # lookup. Items come from the process catalog rather than a join.
+    catalog = get_catalog()
+    slots = list(BookingTimeSlot.objects.filter(local_date=filter_date))
+    for slot in slots:
+        slot.bookable_item = catalog.item(slot.bookable_item_id)
+    slots.sort(key=lambda slot: (slot.local_minute, slot.bookable_item.name))
     return render(request, 'available-time-slots.html', {
         'slots': slots,
         'selected_date': filter_date
     })
 
 
+@rate_limit('book')
 @login_required
 @require_http_methods(["GET", "POST"])
 @csrf_exempt
+@concurrency_limit()
+@idempotent
 def book_time_slot(request):
     """
     Handle booking a time slot via AJAX request.
@@ -165,24 +187,253 @@ def book_time_slot(request):
         
         # Use transaction to ensure atomicity
         with transaction.atomic():
+            # Quotas are checked before the slot is touched
+            check_quota(request.user, [time_slot.time_start])
+
+            # Claim the slot first: if anyone changed it since it was read,
+            # nothing is written
+            update_slot(time_slot, expected_version(data), status='booked')
+
             # Create the booking
             booking = Booking.objects.create(
                 user=request.user,
-                time_slot=time_slot
+                time_slot=time_slot,
+                customer_name=request.user.get_full_name() or request.user.username,
+                customer_email=request.user.email
             )
-            
-            # Update the time slot status
-            time_slot.status = 'booked'
-            time_slot.save()
+            enqueue_booking_event('booking.confirmed', booking, time_slot)
         
         return JsonResponse({
             'success': True,
             'message': 'Booking confirmed successfully!',
             'booking_id': booking.id,
             'slot_time': time_slot.time_start.strftime('%Y-%m-%d %H:%M'),
-            'bookable_item': time_slot.bookable_item.name
+            'bookable_item': time_slot.bookable_item.name,
+            'version': time_slot.version
         })
         
+    except SlotConflict as e:
+        return conflict_response(e)
+    except QuotaExceeded as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'quota': e.quota
+        }, status=403)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'An error occurred: {str(e)}'
+        }, status=500)
+
+@rate_limit('book')
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+@concurrency_limit()
+@idempotent
+def book_time_slots(request):
+    """
+    Book several slots in one all-or-nothing request: either a list of
+    slot_ids, or bookable_item_id + start (ISO datetime) + duration
+    (minutes) for a back-to-back run on one item.
+    """
+    try:
+        data = json.loads(request.body)
+        try:
+            party_size = int(data.get('party_size', 1))
+        except (TypeError, ValueError):
+            party_size = 0
+        if party_size < 1:
+            return JsonResponse({
+                'success': False,
+                'error': 'Party size must be a positive whole number'
+            }, status=400)
+
+        if data.get('slot_ids') is not None:
+            slot_ids = [int(slot_id) for slot_id in data['slot_ids']]
+        elif data.get('bookable_item_id'):
+            time_start = parse_datetime(data.get('start') or '')
+            if time_start is None:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'start must be an ISO 8601 datetime'
+                }, status=400)
+            if timezone.is_naive(time_start):
+                time_start = timezone.make_aware(time_start)
+            duration = timedelta(minutes=int(data.get('duration', 60)))
+            slot_ids = contiguous_slot_ids(int(data['bookable_item_id']), time_start, duration)
+        else:
+            return JsonResponse({
+                'success': False,
+                'error': 'Either slot_ids or bookable_item_id, start and duration are required'
+            }, status=400)
+
+        bookings = book_slots(request.user, slot_ids, party_size=party_size, notes=data.get('notes', ''))
+        return JsonResponse({
+            'success': True,
+            'message': f'{len(bookings)} bookings confirmed successfully!',
+            'group': str(bookings[0].group),
+            'booking_ids': [booking.id for booking in bookings],
+            'slots': [{
+                'slot_id': booking.time_slot.id,
+                'slot_time': booking.time_slot.time_start.strftime('%Y-%m-%d %H:%M'),
+                'bookable_item': booking.time_slot.bookable_item.name
+            } for booking in bookings]
+        })
+
+    except GroupBookingError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e),
+            'slot_ids': e.slot_ids
+        }, status=e.status)
+    except (json.JSONDecodeError, TypeError, ValueError):
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'An error occurred: {str(e)}'
+        }, status=500)
+
+@rate_limit('book')
+@login_required
+@require_http_methods(["POST"])
+@csrf_exempt
+@concurrency_limit()
+@idempotent
+def book_for_party(request):
+    """
+    Book a table for party_size people at start (ISO datetime). The
+    smallest free table that seats the party is chosen, or failing that
+    the smallest group of adjacent free tables.
+    """
+    try:
+        data = json.loads(request.body)
+        try:
+            party_size = int(data.get('party_size', 0))
+        except (TypeError, ValueError):
+            party_size = 0
+        if party_size < 1:
+            return JsonResponse({
+                'success': False,
+                'error': 'Party size must be a positive whole number'
+            }, status=400)
+
+        time_start = parse_datetime(data.get('start') or '')
+        if time_start is None:
+            return JsonResponse({
+                'success': False,
+                'error': 'start must be an ISO 8601 datetime'
+            }, status=400)
+        if timezone.is_naive(time_start):
+            time_start = timezone.make_aware(time_start)
+
+        bookings = assign_and_book(request.user, party_size, time_start, notes=data.get('notes', ''))
+        return JsonResponse({
+            'success': True,
+            'message': 'Booking confirmed successfully!',
+            'group': str(bookings[0].group),
+            'booking_ids': [booking.id for booking in bookings],
+            'slot_time': bookings[0].time_slot.time_start.strftime('%Y-%m-%d %H:%M'),
+            'bookable_items': [booking.time_slot.bookable_item.name for booking in bookings]
+        })
+
+    except GroupBookingError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except Exception as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'An error occurred: {str(e)}'
+        }, status=500)
+
+@rate_limit('book')
+@login_required
+@require_http_methods(["GET", "POST", "DELETE"])
+@csrf_exempt
+def waitlist(request):
+    """
+    Wait for a booked time slot instead of polling for it: POST slot_id
+    (plus optional party_size and notes) to join, DELETE slot_id to leave,
+    GET to list your places in line. If the booking is cancelled the slot is
+    booked for the first person waiting and they are emailed.
+    """
+    try:
+        if request.method == 'GET':
+            return JsonResponse({
+                'success': True,
+                'entries': [{
+                    'slot_id': entry.time_slot_id,
+                    'slot_time': entry.time_slot.time_start.strftime('%Y-%m-%d %H:%M'),
+                    'bookable_item': entry.time_slot.bookable_item.name,
+                    'party_size': entry.party_size,
+                    'position': position
+                } for entry, position in user_waitlist(request.user)]
+            })
+
+        data = json.loads(request.body)
+        slot_id = data.get('slot_id')
+        if not slot_id:
+            return JsonResponse({
+                'success': False,
+                'error': 'Slot ID is required'
+            }, status=400)
+
+        if request.method == 'DELETE':
+            if not leave_waitlist(request.user, slot_id):
+                return JsonResponse({
+                    'success': False,
+                    'error': 'You are not on the waitlist for this time slot'
+                }, status=404)
+            return JsonResponse({
+                'success': True,
+                'message': 'You have left the waitlist'
+            })
+
+        try:
+            party_size = int(data.get('party_size', 1))
+        except (TypeError, ValueError):
+            party_size = 0
+        if party_size < 1:
+            return JsonResponse({
+                'success': False,
+                'error': 'Party size must be a positive whole number'
+            }, status=400)
+
+        entry, position = join_waitlist(request.user, slot_id, party_size=party_size, notes=data.get('notes', ''))
+        return JsonResponse({
+            'success': True,
+            'message': f'You are number {position} on the waitlist',
+            'slot_id': entry.time_slot_id,
+            'position': position
+        })
+
+    except WaitlistError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=e.status)
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
@@ -196,7 +447,7 @@ def book_time_slot(request):
 
 # Staff dashboard view.
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @csrf_exempt
 @require_http_methods(["POST"])
 def staff_create_slot(request):
@@ -218,14 +469,12 @@ def staff_create_slot(request):
                 'error': 'Table name, date, and start time are required'
             }, status=400)
         
-        # Get or create the bookable item
-        bookable_item, created = BookableItem.objects.get_or_create(
-            name=table_name,
-            defaults={
-                'capacity': 1,
-                'info': f'Created via staff dashboard',
-                'is_active': True
-            }
+        # Get or create the bookable item, by name from the process catalog
+        bookable_item, created = get_catalog().get_or_create(
+            table_name,
+            capacity=1,
+            info='Created via staff dashboard',
+            is_active=True
         )
         
         # Parse the datetime
@@ -233,7 +482,7 @@ def staff_create_slot(request):
             # Combine date and time
             datetime_str = f"{date_str}T{start_time}"
             start_datetime = datetime.fromisoformat(datetime_str)
-            # Make timezone aware if needed
+            # Make timezone aware in the venue's timezone (activated by VenueMiddleware)
             if timezone.is_naive(start_datetime):
                 start_datetime = timezone.make_aware(start_datetime)
         except ValueError:
@@ -284,9 +533,11 @@ def staff_create_slot(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @csrf_exempt
 @require_http_methods(["DELETE"])
+@concurrency_limit()
+@idempotent
 def staff_cancel_booking(request):
     """
     Staff can cancel any user's booking
@@ -315,23 +566,27 @@ def staff_cancel_booking(request):
         
         # Use transaction to ensure atomicity
         with transaction.atomic():
-            # Delete the booking
-            booking.delete()
-            
-            # Update the time slot status back to available
-            time_slot.status = 'available'
-            time_slot.save()
+            handed_over = cancel_booking(booking, time_slot, expected_version(data))
         
         return JsonResponse({
             'success': True,
-            'message': 'Booking cancelled successfully'
+            'message': 'Booking cancelled successfully',
+            'handed_to_waitlist': handed_over is not None,
+            'version': time_slot.version
         })
         
+    except SlotConflict as e:
+        return conflict_response(e)
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -339,9 +594,11 @@ def staff_cancel_booking(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @csrf_exempt
 @require_http_methods(["POST"])
+@concurrency_limit()
+@idempotent
 def staff_book_slot(request):
     """
     Staff can book a slot for walk-in customers or phone bookings
@@ -349,13 +606,23 @@ def staff_book_slot(request):
     try:
         data = json.loads(request.body)
         slot_id = data.get('slot_id')
-        customer_name = data.get('customer_name', 'Walk-in Customer')
+        customer_name = (data.get('customer_name') or 'Walk-in Customer').strip()
         
         if not slot_id:
             return JsonResponse({
                 'success': False,
                 'error': 'Slot ID is required'
             }, status=400)
+
+        try:
+            party_size = int(data.get('party_size', 1))
+        except (TypeError, ValueError):
+            party_size = 0
+        if party_size < 1:
+            return JsonResponse({
+                'success': False,
+                'error': 'Party size must be a positive whole number'
+            }, status=400)
         
         # Get the time slot
         time_slot = get_object_or_404(BookingTimeSlot, id=slot_id)
@@ -369,29 +636,43 @@ def staff_book_slot(request):
         
         # Use transaction to ensure atomicity
         with transaction.atomic():
+            # Claim the slot first, so a stale dashboard can't book over a
+            # change someone else made
+            update_slot(time_slot, expected_version(data), status='booked')
+
             # Create the booking (staff books on behalf of customer)
             booking = Booking.objects.create(
                 user=request.user,  # Staff member who made the booking
                 time_slot=time_slot,
-                notes=f'Booked by staff for: {customer_name}'
+                customer_name=customer_name,
+                customer_phone=(data.get('customer_phone') or '').strip(),
+                customer_email=(data.get('customer_email') or '').strip(),
+                party_size=party_size,
+                notes=data.get('notes', '')
             )
-            
-            # Update the time slot status
-            time_slot.status = 'booked'
-            time_slot.save()
+            # The booking's user is the staff member, so only webhooks apply
+            enqueue_booking_event('booking.confirmed', booking, time_slot, notify_user=False)
         
         return JsonResponse({
             'success': True,
             'message': f'Slot booked for {customer_name}',
             'booking_id': booking.id,
-            'customer_name': customer_name
+            'customer_name': customer_name,
+            'version': time_slot.version
         })
         
+    except SlotConflict as e:
+        return conflict_response(e)
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -399,43 +680,47 @@ def staff_book_slot(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
-def staff_dashboard(request):
-    from .models import BookableItem, BookingTimeSlot, Booking
-    import json
-    
-    # Get all slots for calendar
-    all_slots = BookingTimeSlot.objects.select_related('bookable_item').all()
-    
-
-    # Prepare slot data for FullCalendar and slot_dates for calendar dots
+def _dashboard_slot_events(slots):
+    """
+    Build FullCalendar events from one values() query. The booking's
+    customer_name column is joined in directly, so there is no per-slot
+    booking or user lookup, and item names come from the process catalog.
+    Whether a slot is booked comes from its status.
+    """
+    catalog = get_catalog()
+    rows = slots.values(
+        'id', 'time_start', 'time_length', 'bookable_item_id', 'status', 'version',
+        'booking__customer_name'
+    )
     slot_events = []
     slot_dates_set = set()
-    for slot in all_slots:
-        booking = Booking.objects.filter(time_slot=slot).first()
-        is_booked = booking is not None
-        status = 'Booked' if is_booked else 'Available'
-
-        customer_name = None
-        if booking:
-            if 'Booked by staff for:' in booking.notes:
-                customer_name = booking.notes.replace('Booked by staff for:', '').strip()
-            else:
-                customer_name = booking.user.username
-
+    for row in rows:
+        # Show times in the venue's timezone, activated by VenueMiddleware
+        row['time_start'] = timezone.localtime(row['time_start'])
+        item_name = catalog.item(row['bookable_item_id']).name
+        is_booked = row['status'] == 'booked'
+        status = 'Booked' if is_booked else ('Blocked' if row['status'] == 'blocked' else 'Available')
         slot_events.append({
-            'title': f"{slot.bookable_item.name} ({status})",
-            'start': slot.time_start.strftime('%Y-%m-%dT%H:%M:%S'),
-            'end': (slot.time_start + slot.time_length).strftime('%Y-%m-%dT%H:%M:%S'),
+            'title': f"{item_name} ({status})",
+            'start': row['time_start'].strftime('%Y-%m-%dT%H:%M:%S'),
+            'end': (row['time_start'] + row['time_length']).strftime('%Y-%m-%dT%H:%M:%S'),
             'extendedProps': {
                 'status': status,
-                'table': slot.bookable_item.name,
-                'slot_id': slot.id,
+                'table': item_name,
+                'slot_id': row['id'],
+                'version': row['version'],
                 'is_booked': is_booked,
-                'booking_user': customer_name if customer_name else (booking.user.username if booking else None)
+                'booking_user': row['booking__customer_name'] if is_booked else None
             }
         })
-        slot_dates_set.add(slot.time_start.strftime('%Y-%m-%d'))
+        slot_dates_set.add(row['time_start'].strftime('%Y-%m-%d'))
+    return slot_events, slot_dates_set
+
+
+@venue_staff_required
+def staff_dashboard(request):
+    # Prepare slot data for FullCalendar and slot_dates for calendar dots
+    slot_events, slot_dates_set = _dashboard_slot_events(BookingTimeSlot.objects.all())
 
     return render(request, "staff_dashboard.html", {
         "slot_events": json.dumps(slot_events),
@@ -444,7 +729,7 @@ def staff_dashboard(request):
 
 # Add these new functions to your existing views.py file
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @csrf_exempt
 @require_http_methods(["POST"])
 def staff_create_template_slots(request):
@@ -461,71 +746,19 @@ def staff_create_template_slots(request):
                 'error': 'No slots data provided'
             }, status=400)
         
-        created_slots = []
-        skipped_slots = []
-        
         # Use transaction to ensure all slots are created or none
         with transaction.atomic():
-            for slot_data in slots_data:
-                table_name = slot_data.get('table', '').strip()
-                date_str = slot_data.get('date')
-                start_time = slot_data.get('start_time')
-                duration_minutes = slot_data.get('duration', 60)
-                
-                if not all([table_name, date_str, start_time]):
-                    continue  # Skip invalid slots
-                
-                # Get or create the bookable item
-                bookable_item, created = BookableItem.objects.get_or_create(
-                    name=table_name,
-                    defaults={
-                        'capacity': 1,
-                        'info': f'Created via staff template',
-                        'is_active': True
-                    }
-                )
-                
-                # Parse the datetime
-                try:
-                    datetime_str = f"{date_str}T{start_time}"
-                    start_datetime = datetime.fromisoformat(datetime_str)
-                    if timezone.is_naive(start_datetime):
-                        start_datetime = timezone.make_aware(start_datetime)
-                except ValueError:
-                    continue  # Skip invalid datetime
-                
-                # Create duration
-                from datetime import timedelta
-                duration = timedelta(minutes=int(duration_minutes))
-                
-                # Check if slot already exists at this time
-                existing_slot = BookingTimeSlot.objects.filter(
-                    bookable_item=bookable_item,
-                    time_start=start_datetime
-                ).first()
-                
-                if existing_slot:
-                    skipped_slots.append(f"{table_name} at {start_time}")
-                    continue
-                
-                # Create the new slot
-                new_slot = BookingTimeSlot.objects.create(
-                    bookable_item=bookable_item,
-                    time_start=start_datetime,
-                    time_length=duration,
-                    status='available'
-                )
-                created_slots.append(new_slot)
-        
-        message = f'Created {len(created_slots)} slots successfully'
-        if skipped_slots:
-            message += f'. Skipped {len(skipped_slots)} existing slots'
+            result = import_slot_rows(slots_data, item_info='Created via staff template')
+        
+        message = f'Created {result.created} slots successfully'
+        if result.skipped:
+            message += f'. Skipped {result.skipped} existing slots'
         
         return JsonResponse({
             'success': True,
             'message': message,
-            'created_count': len(created_slots),
-            'skipped_count': len(skipped_slots)
+            'created_count': result.created,
+            'skipped_count': result.skipped
         })
         
     except json.JSONDecodeError:
@@ -540,7 +773,45 @@ def staff_create_template_slots(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
+@csrf_exempt
+@require_http_methods(["POST"])
+def staff_import_slots(request):
+    """
+    Staff can upload a CSV of slots (columns: table, date, start_time,
+    duration, optional status). The file is parsed row by row and inserted
+    in chunks; existing slots are skipped and invalid rows reported.
+    """
+    upload = request.FILES.get('file')
+    if not upload:
+        return JsonResponse({
+            'success': False,
+            'error': 'A CSV file is required'
+        }, status=400)
+
+    try:
+        text_file = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        result = import_slots_csv(text_file, item_info='Created via staff import')
+    except (UnicodeDecodeError, csv.Error) as e:
+        return JsonResponse({
+            'success': False,
+            'error': f'Could not read CSV file: {str(e)}'
+        }, status=400)
+
+    message = f'Created {result.created} slots successfully'
+    if result.skipped:
+        message += f'. Skipped {result.skipped} existing slots'
+    if result.error_count:
+        message += f'. {result.error_count} rows had errors'
+
+    return JsonResponse({
+        'success': True,
+        'message': message,
+        **result.as_dict()
+    })
+
+
+@venue_staff_required
 @csrf_exempt
 @require_http_methods(["DELETE"])
 def delete_slot(request):
@@ -562,12 +833,16 @@ def delete_slot(request):
         
         # Use transaction to ensure atomicity
         with transaction.atomic():
-            # Check if there's a booking and delete it first
+            # Lock the slot unless it changed since it was read, so its
+            # booking can't change before it is deleted
+            time_slot = lock_slot_if_unchanged(time_slot, expected_version(data))
+            
+            # Check if there's a booking and tell its holder
             booking = Booking.objects.filter(time_slot=time_slot).first()
             if booking:
-                booking.delete()
+                enqueue_booking_event('booking.cancelled', booking, time_slot)
             
-            # Delete the time slot
+            # Delete the time slot, and the booking with it
             time_slot.delete()
         
         return JsonResponse({
@@ -575,11 +850,18 @@ def delete_slot(request):
             'message': 'Slot deleted successfully'
         })
         
+    except SlotConflict as e:
+        return conflict_response(e)
     except json.JSONDecodeError:
         return JsonResponse({
             'success': False,
             'error': 'Invalid JSON data'
         }, status=400)
+    except ValueError as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
     except Exception as e:
         return JsonResponse({
             'success': False,
@@ -587,7 +869,7 @@ def delete_slot(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @csrf_exempt  
 @require_http_methods(["POST"])
 def save_template(request):
@@ -646,7 +928,7 @@ def save_template(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @require_http_methods(["GET"])
 def get_saved_templates(request):
     """
@@ -667,7 +949,7 @@ def get_saved_templates(request):
         }, status=500)
 
 
-@user_passes_test(lambda u: u.is_staff)
+@venue_staff_required
 @csrf_exempt
 @require_http_methods(["DELETE"])
 def delete_template(request):
@@ -714,13 +996,14 @@ def delete_template(request):
         }, status=500)
 
 
-from django.http import JsonResponse
-from django.views.decorators.http import require_http_methods
-import json
-from .models import BookingTimeSlot, Booking  # Import the correct model names
-
+@venue_staff_required
+@csrf_exempt
 @require_http_methods(["DELETE"])
 def delete_all_slots_for_day(request):
+    """
+    Staff can delete every time slot on one day of the venue's calendar,
+    and the bookings on them, whose holders are told they were cancelled
+    """
     try:
         data = json.loads(request.body)
         date = data.get('date')
@@ -728,20 +1011,22 @@ def delete_all_slots_for_day(request):
         if not date:
             return JsonResponse({'success': False, 'error': 'Date is required'})
 
-
-        from datetime import datetime
-
         # Parse the date string (assuming format: YYYY-MM-DD)
         target_date = datetime.strptime(date, '%Y-%m-%d').date()
 
-        # Get all time slots for that date
-        slots_to_delete = BookingTimeSlot.objects.filter(
-            time_start__date=target_date
-        )
-
-        deleted_count = slots_to_delete.count()
+        with transaction.atomic():
+            # Lock the day's slots in the venue's timezone, so no booking
+            # lands on one between telling its holder and deleting it
+            slot_ids = list(
+                BookingTimeSlot.objects.select_for_update().filter(local_date=target_date).values_list('id', flat=True)
+            )
+            bookings = Booking.objects.filter(time_slot_id__in=slot_ids).select_related(
+                'user', 'time_slot__bookable_item'
+            )
+            enqueue_booking_events('booking.cancelled', [(booking, booking.time_slot) for booking in bookings])
 
-        slots_to_delete.delete()
+            deleted_count = len(slot_ids)
+            BookingTimeSlot.objects.filter(id__in=slot_ids).delete()
 
         return JsonResponse({
             'success': True, 
@@ -749,4 +1034,413 @@ def delete_all_slots_for_day(request):
         })
 
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)})
\ No newline at end of file
+        return JsonResponse({'success': False, 'error': str(e)})
+
+@venue_staff_required
+@require_http_methods(["GET"])
+def staff_slot_history(request, slot_id):
+    """
+    Staff can see everything that happened to a time slot, including after
+    it was deleted or archived, rebuilt from the audit log.
+    """
+    history = slot_history(slot_id, venue_id=request.venue_id)
+    if not history:
+        raise Http404('No history for this time slot')
+    actor_ids = {entry['actor_id'] for entry in history if entry['actor_id'] is not None}
+    usernames = dict(User.objects.filter(id__in=actor_ids).values_list('id', 'username'))
+    return JsonResponse({
+        'success': True,
+        'slot_id': slot_id,
+        'state': history[-1]['state'],
+        'events': [{
+            'event': entry['event'],
+            'at': entry['at'].isoformat(),
+            'booking_id': entry['booking_id'],
+            'actor': usernames.get(entry['actor_id']),
+            'state': entry['state']
+        } for entry in history]
+    })
+
+
+def _export_filters(request):
+    """
+    Read the shared export query parameters: start, end (YYYY-MM-DD, inclusive),
+    item (bookable item id, repeatable) and status (slot status, repeatable).
+    """
+    range_start, range_end = parse_export_range(request.GET.get('start'), request.GET.get('end'))
+    item_ids = [int(item_id) for item_id in request.GET.getlist('item')]
+    statuses = request.GET.getlist('status')
+    valid_statuses = {choice for choice, _ in BookingTimeSlot.STATUS_CHOICES}
+    if not set(statuses) <= valid_statuses:
+        raise ValueError(f'Status must be one of: {", ".join(sorted(valid_statuses))}')
+    return range_start, range_end, item_ids, statuses
+
+
+def _export_response(request, kind, csv_header, csv_rows, ics_events, rows):
+    export_format = request.GET.get('format', 'csv')
+    filename = f"{kind}-{timezone.now().strftime('%Y%m%d%H%M%S')}"
+    if export_format == 'ics':
+        response = StreamingHttpResponse(
+            stream_ics(ics_events(rows, request.get_host()), f'{kind.title()} export'),
+            content_type='text/calendar; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.ics"'
+    else:
+        response = StreamingHttpResponse(
+            stream_csv(csv_header, csv_rows(rows)),
+            content_type='text/csv; charset=utf-8'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{filename}.csv"'
+    return response
+
+
+@venue_staff_required
+@require_http_methods(["GET"])
+def staff_export_slots(request):
+    """
+    Stream slots in a date range as CSV (default) or iCalendar (?format=ics).
+    """
+    try:
+        range_start, range_end, item_ids, statuses = _export_filters(request)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    slots = BookingTimeSlot.objects.filter(
+        time_start__gte=range_start,
+        time_start__lt=range_end
+    ).select_related('bookable_item', 'booking__user').order_by('time_start', 'id')
+    if item_ids:
+        slots = slots.filter(bookable_item_id__in=item_ids)
+    if statuses:
+        slots = slots.filter(status__in=statuses)
+
+    # Slots moved out by archive_slots are still part of the report
+    archived = ArchivedSlot.objects.filter(
+        time_start__gte=range_start,
+        time_start__lt=range_end
+    ).select_related('booking__user').order_by('time_start', 'id')
+    if item_ids:
+        archived = archived.filter(bookable_item_id__in=item_ids)
+    if statuses:
+        archived = archived.filter(status__in=statuses)
+
+    rows = with_archive(slots, archived, key=lambda slot: (slot.time_start, slot.id))
+    return _export_response(request, 'slots', SLOT_CSV_HEADER, slot_csv_rows, slot_ics_events, rows)
+
+
+@venue_staff_required
+@require_http_methods(["GET"])
+def staff_export_bookings(request):
+    """
+    Stream bookings in a date range as CSV (default) or iCalendar (?format=ics).
+    """
+    try:
+        range_start, range_end, item_ids, statuses = _export_filters(request)
+    except ValueError as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    bookings = Booking.objects.filter(
+        time_slot__time_start__gte=range_start,
+        time_slot__time_start__lt=range_end
+    ).select_related('time_slot__bookable_item', 'user').order_by('time_slot__time_start', 'id')
+    if item_ids:
+        bookings = bookings.filter(time_slot__bookable_item_id__in=item_ids)
+    if statuses:
+        bookings = bookings.filter(time_slot__status__in=statuses)
+
+    archived = ArchivedBooking.objects.filter(
+        time_slot__time_start__gte=range_start,
+        time_slot__time_start__lt=range_end
+    ).select_related('time_slot', 'user').order_by('time_slot__time_start', 'id')
+    if item_ids:
+        archived = archived.filter(time_slot__bookable_item_id__in=item_ids)
+    if statuses:
+        archived = archived.filter(time_slot__status__in=statuses)
+
+    rows = with_archive(bookings, archived, key=lambda booking: (booking.time_slot.time_start, booking.id))
+    return _export_response(request, 'bookings', BOOKING_CSV_HEADER, booking_csv_rows, booking_ics_events, rows)
+
+
+def _calendar_feed_bookings(user_id):
+    # Keep a month of history so recently finished bookings don't vanish from calendars
+    return Booking.objects.filter(
+        user_id=user_id,
+        time_slot__time_start__gte=timezone.now() - timedelta(days=30)
+    )
+
+
+def _calendar_feed_etag(request, token):
+    user_id = user_id_from_feed_token(token)
+    if user_id is None:
+        return None
+    summary = _calendar_feed_bookings(user_id).aggregate(
+        count=Count('id'),
+        last_updated=Max('updated_at'),
+        slot_last_updated=Max('time_slot__updated_at')
+    )
+    return f"{user_id}-{summary['count']}-{summary['last_updated']}-{summary['slot_last_updated']}"
+
+
+@require_http_methods(["GET", "HEAD"])
+@condition(etag_func=_calendar_feed_etag)
+def user_calendar_feed(request, token):
+    """
+    Per-user iCalendar subscription feed. The token in the URL identifies the
+    user, so calendar apps can poll it without a session. Supports
+    If-None-Match so unchanged feeds answer 304 without rendering.
+    """
+    user_id = user_id_from_feed_token(token)
+    if user_id is None:
+        raise Http404('Calendar feed not found')
+
+    bookings = _calendar_feed_bookings(user_id).select_related(
+        'time_slot__bookable_item', 'user'
+    ).order_by('time_slot__time_start')
+    response = StreamingHttpResponse(
+        stream_ics(booking_ics_events(bookings, request.get_host()), 'My bookings'),
+        content_type='text/calendar; charset=utf-8'
+    )
+    response['Content-Disposition'] = 'inline; filename="bookings.ics"'
+    return response
+
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_http_methods(["GET"])
+def staff_profiles(request):
+    """
+    List stored request profiles, newest first. Captures are made by
+    ProfilingMiddleware for ?_profile=1 requests and sampled slow requests.
+    """
+    return render(request, 'staff_profiles.html', {'captures': list_captures()})
+
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_http_methods(["GET"])
+def staff_profile_detail(request, capture_id):
+    """
+    Show one capture's SQL log and top functions by cumulative time.
+    """
+    capture = load_capture(capture_id)
+    if capture is None:
+        raise Http404('Profile not found')
+    return render(request, 'staff_profile_detail.html', {'capture': capture})
+
+
+@user_passes_test(lambda u: u.is_superuser)
+@require_http_methods(["GET"])
+def staff_profile_download(request, capture_id):
+    """
+    Download a capture's binary pstats file for snakeviz, pstats, etc.
+    """
+    path = capture_profile_path(capture_id)
+    if path is None:
+        raise Http404('Profile not found')
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{capture_id}.prof')
+
+
+@rate_limit('api')
+@require_http_methods(["GET"])
+def api_v1_items(request):
+    """
+    JSON list of active bookable items. Supports fields=, limit= and cursor=.
+    """
+    try:
+        payload = keyset_page(item_queryset(request), ITEM_SERIALIZER, request, 'name')
+    except ValueError as e:
+        return api_error(str(e))
+    return api_response(payload)
+
+
+@rate_limit('api')
+@require_http_methods(["GET"])
+def api_v1_slots(request):
+    """
+    JSON list of slots starting from now (or from=) up to to=, optionally
+    filtered by status= and item=. Supports fields=, limit=, cursor= and
+    shape=rows.
+    """
+    try:
+        payload = keyset_page(slot_queryset(request), SLOT_SERIALIZER, request, 'time_start', parse_datetime)
+    except ValueError as e:
+        return api_error(str(e))
+    return api_response(payload)
+
+
+@rate_limit('api')
+@require_http_methods(["GET"])
+def api_v1_bookings(request):
+    """
+    JSON list of the logged in user's bookings by slot start time.
+    """
+    if not request.user.is_authenticated:
+        return api_error('Authentication required', status=401)
+    try:
+        payload = keyset_page(
+            booking_queryset(request), BOOKING_SERIALIZER, request, 'time_slot__time_start', parse_datetime
+        )
+    except ValueError as e:
+        return api_error(str(e))
+    return api_response(payload)
+
+
+ANALYTICS_WEEKS_AHEAD = 4
+
+
+@venue_staff_required
+@require_http_methods(["GET"])
+def staff_analytics(request):
+    """
+    Utilization, peak hours, lead time and cancellation charts for the last
+    ?weeks= weeks (default 8) and the next four. Reads only the rollup
+    tables, never the raw slots and bookings.
+    """
+    try:
+        weeks = min(max(int(request.GET.get('weeks', 8)), 1), 52)
+    except ValueError:
+        weeks = 8
+    this_week = analytics.week_start(timezone.localdate())
+    since = this_week - timedelta(weeks=weeks - 1)
+    until = this_week + timedelta(weeks=ANALYTICS_WEEKS_AHEAD, days=-1)
+    week_starts = [since + timedelta(weeks=number) for number in range(weeks + ANALYTICS_WEEKS_AHEAD)]
+
+    utilization = {}
+    for item_name, week, booked_minutes, slot_minutes in analytics.utilization_by_item_week(since, until):
+        cells = utilization.setdefault(item_name, {})
+        cells[week] = round(100 * booked_minutes / slot_minutes) if slot_minutes else None
+    utilization_rows = [
+        (item_name, [cells.get(week) for week in week_starts]) for item_name, cells in utilization.items()
+    ]
+
+    by_hour = analytics.bookings_by_hour(since, until)
+    busiest = max((booked for booked, _ in by_hour.values()), default=0)
+    peak_hours = [
+        (hour, booked, slots, round(100 * booked / busiest) if busiest else 0)
+        for hour, (booked, slots) in sorted(by_hour.items())
+    ]
+
+    weekly = [
+        {
+            'week': week,
+            'booked': booked,
+            'cancelled': cancelled,
+            'cancellation_rate': round(100 * cancelled / (booked + cancelled)) if booked + cancelled else None,
+            'lead_hours': round(lead_minutes / booked / 60, 1) if booked else None,
+        }
+        for week, booked, cancelled, lead_minutes in analytics.weekly_totals(since, until)
+    ]
+
+    return render(request, 'staff_analytics.html', {
+        'weeks': weeks,
+        'week_starts': week_starts,
+        'this_week': this_week,
+        'utilization_rows': utilization_rows,
+        'peak_hours': peak_hours,
+        'weekly': weekly,
+    })
+
+
+@venue_staff_required
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def staff_forecast_slots(request):
+    """
+    Forecast how many slots to open each hour from booking history. GET
+    previews the proposal for ?start=YYYY-MM-DD&days=N; POST with the same
+    fields as JSON creates the slots.
+    """
+    try:
+        params = json.loads(request.body) if request.method == 'POST' else request.GET
+        start_str = params.get('start')
+        start_date = datetime.strptime(start_str, '%Y-%m-%d').date() if start_str else timezone.localdate()
+        days = int(params.get('days', 7))
+        headroom = float(params.get('headroom', DEFAULT_HEADROOM))
+        if not 1 <= days <= 62:
+            raise ValueError('days must be between 1 and 62')
+        if not 0 <= headroom <= 2:
+            raise ValueError('headroom must be between 0 and 2')
+    except (TypeError, ValueError, json.JSONDecodeError) as e:
+        return JsonResponse({'success': False, 'error': str(e)}, status=400)
+
+    proposal = propose_schedule(start_date, days, headroom=headroom)
+    response = {
+        'success': True,
+        'start': start_date.isoformat(),
+        'days': days,
+        'slot_count': len(proposal),
+        'slots_per_hour': summarize(proposal),
+    }
+    if request.method == 'POST':
+        with transaction.atomic():
+            result = create_proposed_slots(proposal)
+        response.update(result.as_dict())
+    return JsonResponse(response)
+
+
+@venue_staff_required
+@csrf_exempt
+@require_http_methods(["GET", "POST", "DELETE"])
+def staff_blackouts(request):
+    """
+    Take items out of service for a while. POST item_ids, start and end
+    (ISO dates or datetimes) and an optional reason: the available slots in
+    the window are blocked in one go and the bookings that clash are
+    returned. DELETE blackout_id lifts the window again. GET lists the
+    windows that are still in force.
+    """
+    if request.method == 'GET':
+        windows = BlackoutWindow.objects.filter(lifted_at__isnull=True).prefetch_related('items')
+        return JsonResponse({
+            'success': True,
+            'blackouts': [{
+                'blackout_id': window.id,
+                'reason': window.reason,
+                'start': window.starts_at.isoformat(),
+                'end': window.ends_at.isoformat(),
+                'bookable_items': [item.name for item in window.items.all()]
+            } for window in windows]
+        })
+
+    try:
+        data = json.loads(request.body)
+        if request.method == 'DELETE':
+            window = BlackoutWindow.objects.filter(id=data.get('blackout_id'), lifted_at__isnull=True).first()
+            if window is None:
+                return JsonResponse({
+                    'success': False,
+                    'error': 'No blackout in force with that id'
+                }, status=404)
+            unblocked = lift_blackout(window)
+            return JsonResponse({
+                'success': True,
+                'message': f'Blackout lifted, {unblocked} slots available again',
+                'unblocked_count': unblocked
+            })
+
+        if not data.get('start') or not data.get('end'):
+            raise ValueError('start and end are required')
+        item_ids = [int(item_id) for item_id in data.get('item_ids') or []]
+        window, blocked, clashes = create_blackout(
+            item_ids,
+            parse_api_time(data['start'], 'start'),
+            parse_api_time(data['end'], 'end'),
+            reason=(data.get('reason') or '').strip(),
+            user=request.user
+        )
+        return JsonResponse({
+            'success': True,
+            'message': f'{blocked} slots blocked, {len(clashes)} bookings clash',
+            'blackout_id': window.id,
+            'blocked_count': blocked,
+            'clashes': clashes
+        })
+
+    except json.JSONDecodeError:
+        return JsonResponse({
+            'success': False,
+            'error': 'Invalid JSON data'
+        }, status=400)
+    except (TypeError, ValueError) as e:
+        return JsonResponse({
+            'success': False,
+            'error': str(e)
+        }, status=400)
@@ -0,0 +1,160 @@
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .concurrency import update_slot
+from .models import Booking, BookingTimeSlot, WaitlistEntry
+from .outbox import enqueue_booking_event
+from .quotas import QuotaExceeded, check_quota
+
+
+class WaitlistError(Exception):
+    """A waitlist change that can't be made; nothing has been written."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def queue_position(entry):
+    """1-based place of ``entry`` in its slot's queue."""
+    ahead = WaitlistEntry.objects.filter(time_slot_id=entry.time_slot_id).filter(
+        Q(priority__gt=entry.priority)
+        | Q(priority=entry.priority, created_at__lt=entry.created_at)
+        | Q(priority=entry.priority, created_at=entry.created_at, id__lt=entry.id)
+    )
+    return ahead.count() + 1
+
+
+def join_waitlist(user, slot_id, party_size=1, notes=''):
+    """
+    Queue ``user`` for a booked slot. Returns (entry, position). Raises
+    WaitlistError if the slot can be booked directly, has started, the
+    user already holds or is waiting for it, or is at a booking quota.
+    """
+    with transaction.atomic():
+        # Quotas lock the user's row, so check them before taking the slot lock
+        slot_start = BookingTimeSlot.objects.filter(id=slot_id).values_list('time_start', flat=True).first()
+        if slot_start is not None:
+            try:
+                check_quota(user, [slot_start])
+            except QuotaExceeded as e:
+                raise WaitlistError(str(e), status=403)
+
+        # Lock the slot so a cancellation can't hand it over mid-join
+        time_slot = (
+            BookingTimeSlot.objects.select_for_update(of=('self',))
+            .select_related('bookable_item')
+            .filter(id=slot_id)
+            .first()
+        )
+        if time_slot is None:
+            raise WaitlistError('Time slot not found', status=404)
+        if time_slot.time_start <= timezone.now():
+            raise WaitlistError('This time slot has already started')
+        if time_slot.status == 'available':
+            raise WaitlistError('This time slot is available, book it directly', status=409)
+        if time_slot.status != 'booked':
+            raise WaitlistError('This time slot is not open for booking', status=409)
+        if party_size > time_slot.bookable_item.capacity:
+            raise WaitlistError(f'{time_slot.bookable_item.name} seats at most {time_slot.bookable_item.capacity}')
+        if Booking.objects.filter(time_slot=time_slot, user=user).exists():
+            raise WaitlistError('You already hold this booking', status=409)
+        if WaitlistEntry.objects.filter(time_slot=time_slot, user=user).exists():
+            raise WaitlistError('You are already on the waitlist for this time slot', status=409)
+
+        entry = WaitlistEntry.objects.create(
+            user=user, time_slot=time_slot, party_size=party_size, notes=notes
+        )
+        return entry, queue_position(entry)
+
+
+def leave_waitlist(user, slot_id):
+    """Remove ``user`` from a slot's waitlist. Returns whether they were on it."""
+    deleted, _ = WaitlistEntry.objects.filter(time_slot_id=slot_id, user=user).delete()
+    return deleted > 0
+
+
+def user_waitlist(user):
+    """
+    The user's upcoming waitlist entries with their queue positions, worked
+    out from one query over the queues they are in.
+    """
+    entries = list(
+        WaitlistEntry.objects.filter(user=user, time_slot__time_start__gt=timezone.now())
+        .select_related('time_slot__bookable_item')
+        .order_by('time_slot__time_start')
+    )
+    queues = {}
+    for slot_id, user_id in (
+        WaitlistEntry.objects.filter(time_slot_id__in={entry.time_slot_id for entry in entries})
+        .order_by('time_slot_id', '-priority', 'created_at', 'id')
+        .values_list('time_slot_id', 'user_id')
+    ):
+        queues.setdefault(slot_id, []).append(user_id)
+    return [(entry, queues[entry.time_slot_id].index(user.id) + 1) for entry in entries]
+
+
+def release_slot(time_slot, expected=None):
+    """
+    Pass a slot whose booking has just been deleted to the first user in
+    its waitlist still within their booking quotas, or make it available
+    if there is none or it has already started. Users over a quota keep
+    their place. Slots in a blackout window are blocked instead. Call
+    inside the cancelling transaction: the slot never shows as available
+    in between, so there is nothing for other clients to race for.
+    Returns the new booking, or None. Raises SlotConflict, rolling the
+    cancellation back, if the slot changed since it was read.
+    """
+    # Lock the slot first, the same order join_waitlist takes its locks in
+    BookingTimeSlot.objects.select_for_update(of=('self',)).filter(id=time_slot.id).first()
+    if time_slot.blackout_id is not None:
+        update_slot(time_slot, expected, status='blocked')
+        return None
+    entry = None
+    if time_slot.time_start > timezone.now():
+        queue = (
+            WaitlistEntry.objects.select_for_update(of=('self',))
+            .select_related('user')
+            .filter(time_slot=time_slot)
+            .order_by('-priority', 'created_at', 'id')
+        )
+        for candidate in queue:
+            try:
+                # The slot is locked already, so leave the user's row alone
+                check_quota(candidate.user, [time_slot.time_start], lock_user=False)
+            except QuotaExceeded:
+                continue
+            entry = candidate
+            break
+    if entry is None:
+        update_slot(time_slot, expected, status='available')
+        return None
+
+    # Still booked, but by someone else: the version moves on all the same
+    update_slot(time_slot, expected, status='booked')
+    user = entry.user
+    booking = Booking.objects.create(
+        user=user,
+        time_slot=time_slot,
+        customer_name=user.get_full_name() or user.username,
+        customer_email=user.email,
+        party_size=entry.party_size,
+        notes=entry.notes,
+        slot_start=time_slot.time_start,
+    )
+    entry.delete()
+    enqueue_booking_event('booking.waitlist_allocated', booking, time_slot)
+    return booking
+
+
+def cancel_booking(booking, time_slot=None, expected=None):
+    """
+    Cancel ``booking`` and hand its slot to the waitlist. Call inside
+    transaction.atomic(). Returns the booking the slot went to, or None if
+    it became available.
+    """
+    time_slot = time_slot or booking.time_slot
+    enqueue_booking_event('booking.cancelled', booking, time_slot)
+    booking.delete()
+    return release_slot(time_slot, expected)
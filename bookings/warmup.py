@@ -0,0 +1,74 @@
+import logging
+import os
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template.loader import get_template
+from django.urls import get_resolver
+
+logger = logging.getLogger(__name__)
+
+# Templates outside bookings/templates that customer pages extend or render
+DEFAULT_WARMUP_TEMPLATES = ['base.html', 'account/login.html', 'account/signup.html']
+
+
+def warmup_templates():
+    """Every page template in bookings/templates plus WARMUP_TEMPLATES."""
+    template_dir = os.path.join(apps.get_app_config('bookings').path, 'templates')
+    names = sorted(name for name in os.listdir(template_dir) if name.endswith('.html'))
+    return getattr(settings, 'WARMUP_TEMPLATES', DEFAULT_WARMUP_TEMPLATES) + names
+
+
+def warm_templates():
+    # Compiled templates stay in the cached template loader for the life of
+    # the process, so later renders skip reading and parsing the files
+    for name in warmup_templates():
+        get_template(name)
+
+
+def warm_url_resolver():
+    # Importing the URLconf pulls in every view module, and the allauth
+    # provider registry; reverse_dict builds the reverse lookup tables
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+
+def warm_database():
+    for alias in connections:
+        connections[alias].ensure_connection()
+
+
+def warm_venue():
+    from .catalog import get_catalog
+    from .models import Venue
+    from .tenancy import get_venue_timezone, use_venue
+
+    venue_id = Venue.default_id()
+    get_venue_timezone(venue_id)
+    with use_venue(venue_id):
+        get_catalog()
+
+
+def warm_up(database=True):
+    """
+    Do the work a cold worker would otherwise do on its first requests.
+    Returns the seconds spent on each step. Steps that fail are logged and
+    skipped: a worker that is slow on its first request is better than one
+    that doesn't start.
+    """
+    steps = [('templates', warm_templates), ('urls', warm_url_resolver)]
+    if database:
+        steps += [('database', warm_database), ('venue', warm_venue)]
+
+    timings = {}
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Warm-up step %s failed", name)
+        timings[name] = time.perf_counter() - start
+    return timings
@@ -0,0 +1,35 @@
+"""
+Gunicorn settings. Gunicorn reads ./gunicorn.conf.py automatically, so the
+Procfile's `gunicorn white_label_booking.wsgi` picks these up.
+
+With preload_app the master imports Django and warms templates and URLs
+once; forked workers share that memory and only open their own database
+connection before accepting traffic. Set GUNICORN_PRELOAD=False to load
+the app in each worker instead (needed for `--reload`).
+"""
+import os
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True') == 'True'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        from bookings.warmup import warm_up
+
+        timings = warm_up(database=False)
+        server.log.info("Warmed up master in %.3fs %s", sum(timings.values()), timings)
+
+
+def post_fork(server, worker):
+    # Never share a database connection the master might have opened
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    from bookings.warmup import warm_up
+
+    timings = warm_up(database=True)
+    worker.log.info("Warmed up worker %s in %.3fs %s", worker.pid, sum(timings.values()), timings)
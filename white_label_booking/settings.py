@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 import os
+from datetime import timedelta
 from pathlib import Path
 import dj_database_url
 if os.path.isfile('env.py'):
@@ -32,7 +33,15 @@ SECRET_KEY = os.environ.get('SECRET_KEY')
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.environ.get('DEBUG', 'False') == 'True'
 
-ALLOWED_HOSTS = ['.herokuapp.com', '127.0.0.1',]
+# Venues are served on subdomains of VENUE_BASE_DOMAIN (cafe.example.com)
+# and on their own custom domains. Django rejects any host not allowed here
+# with a 400 before the venue is resolved, so list custom domains in
+# EXTRA_ALLOWED_HOSTS (comma separated) when adding them to a venue.
+VENUE_BASE_DOMAIN = os.environ.get('VENUE_BASE_DOMAIN', '').strip('.')
+ALLOWED_HOSTS = ['.herokuapp.com', '127.0.0.1']
+if VENUE_BASE_DOMAIN:
+    ALLOWED_HOSTS.append(f'.{VENUE_BASE_DOMAIN}')
+ALLOWED_HOSTS += [host.strip() for host in os.environ.get('EXTRA_ALLOWED_HOSTS', '').split(',') if host.strip()]
 
 
 # Application definition
@@ -65,11 +74,14 @@ MIDDLEWARE = [
     "whitenoise.middleware.WhiteNoiseMiddleware",
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
+    'bookings.middleware.VenueMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bookings.middleware.AuditActorMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     "allauth.account.middleware.AccountMiddleware",
+    'bookings.profiling.ProfilingMiddleware',
 ]
 
 if DEBUG:
@@ -125,9 +137,15 @@ if USE_SQLITE:
         }
     }
 else:
+    # Persistent connections, so the one each gunicorn worker opens while
+    # warming up (see gunicorn.conf.py) is reused by its requests
     DATABASES = {
-        'default': dj_database_url.parse(os.environ.get("DATABASE_URL"))
+        'default': dj_database_url.parse(
+            os.environ.get("DATABASE_URL"),
+            conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', 60))
+        )
     }
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -183,3 +201,88 @@ if DEBUG:
 
 if os.environ.get("NPM_BIN_PATH"):
     NPM_BIN_PATH = os.environ.get("NPM_BIN_PATH")
+
+# How long a stored response is replayed for a repeated Idempotency-Key header.
+# Expired keys are removed with `python manage.py purge_idempotency_keys`.
+IDEMPOTENCY_KEY_TTL = timedelta(hours=int(os.environ.get('IDEMPOTENCY_KEY_TTL_HOURS', 24)))
+
+# Shared cache for rate limiting and other cross-worker state. REDIS_URL is
+# required in production: without it each worker gets its own in-memory
+# cache, so the item catalog is reloaded on every request and the booking
+# write concurrency cap is off (`manage.py check --deploy` warns). Set
+# CACHE_IS_SHARED=True to keep them on a single-process server.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+    if os.environ.get('CACHE_IS_SHARED'):
+        CACHE_IS_SHARED = os.environ.get('CACHE_IS_SHARED') == 'True'
+
+# Token bucket limits for the booking endpoints: tokens refilled per second
+# and bucket size, applied per client IP and per logged in user.
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT_ENABLED', 'True') == 'True'
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.environ.get('RATE_LIMIT_TRUST_FORWARDED_FOR', 'False') == 'True'
+RATE_LIMITS = {
+    'book': {'rate': 0.5, 'burst': 10},
+    'availability': {'rate': 5, 'burst': 60},
+    'api': {'rate': 10, 'burst': 120},
+}
+# Maximum booking/cancellation requests processed at once across all workers;
+# needs the shared cache above
+BOOKING_WRITE_CONCURRENCY = int(os.environ.get('BOOKING_WRITE_CONCURRENCY', 50))
+
+# Most bookings one customer may hold: starting on one day, in one week, and
+# not yet started. Combined tables for one party count once, back-to-back
+# slots once each; staff are exempt. Set a limit to None to lift it.
+BOOKING_QUOTAS = {
+    'per_day': int(os.environ.get('BOOKING_QUOTA_PER_DAY', 4)),
+    'per_week': int(os.environ.get('BOOKING_QUOTA_PER_WEEK', 10)),
+    'active': int(os.environ.get('BOOKING_QUOTA_ACTIVE', 20)),
+}
+
+# Booking side effects are written to the outbox table and delivered by
+# `python manage.py run_outbox_worker`. Set BOOKING_WEBHOOK_URL to also POST
+# booking events to an external system.
+BOOKING_WEBHOOK_URL = os.environ.get('BOOKING_WEBHOOK_URL')
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 8))
+
+# Reminders are queued this long before a booked slot starts by
+# `python manage.py run_reminder_scheduler`
+BOOKING_REMINDER_LEAD = timedelta(hours=int(os.environ.get('BOOKING_REMINDER_LEAD_HOURS', 24)))
+# How often, in seconds, the scheduler picks up bookings made or cancelled
+# in the web workers
+REMINDER_SYNC_SECONDS = float(os.environ.get('REMINDER_SYNC_SECONDS', 5))
+
+# Requests are matched to a venue by custom domain or subdomain; anything
+# unmatched is served by the venue with this slug.
+DEFAULT_VENUE_SLUG = os.environ.get('DEFAULT_VENUE_SLUG', 'default')
+
+# `python manage.py archive_slots` (run daily from the scheduler) moves slots
+# that started longer ago than this into the archive tables
+ARCHIVE_SLOTS_AFTER = timedelta(days=int(os.environ.get('ARCHIVE_SLOTS_AFTER_DAYS', 90)))
+
+# Audit log of slot and booking changes. Events are buffered per process and
+# written in one insert per AUDIT_BATCH_SIZE events or AUDIT_FLUSH_SECONDS,
+# whichever comes first; `python manage.py prune_audit_log` (run daily)
+# deletes events older than AUDIT_RETENTION
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', 200))
+AUDIT_FLUSH_SECONDS = float(os.environ.get('AUDIT_FLUSH_SECONDS', 2))
+AUDIT_RETENTION = timedelta(days=int(os.environ.get('AUDIT_RETENTION_DAYS', 365)))
+
+# Request profiling. Superusers add ?_profile=1 (or an X-Profile: 1 header)
+# to profile a request; PROFILE_SLOW_SAMPLE_RATE of all requests are also
+# profiled and kept when slower than PROFILE_SLOW_REQUEST_MS. Only the newest
+# PROFILE_CAPTURE_LIMIT captures are kept. Browse them at /staff-profiles/.
+PROFILE_CAPTURE_DIR = os.environ.get('PROFILE_CAPTURE_DIR', os.path.join(BASE_DIR, 'profiles'))
+PROFILE_CAPTURE_LIMIT = int(os.environ.get('PROFILE_CAPTURE_LIMIT', 50))
+PROFILE_SLOW_REQUEST_MS = int(os.environ.get('PROFILE_SLOW_REQUEST_MS', 1000))
+PROFILE_SLOW_SAMPLE_RATE = float(os.environ.get('PROFILE_SLOW_SAMPLE_RATE', 0))